@@ -0,0 +1,31 @@
+"""Add composite run_logs index for keyset pagination
+
+Revision ID: 5b2e9c41d7f3
+Revises: 3420b791a6a9
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9c41d7f3'
+down_revision: Union[str, None] = '3420b791a6a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_run_logs_run_id_timestamp_id', 'run_logs', ['run_id', 'timestamp', 'id'], unique=False)
+    # The composite index starts with run_id, so the single-column index is redundant
+    op.drop_index(op.f('ix_run_logs_run_id'), table_name='run_logs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_run_logs_run_id'), 'run_logs', ['run_id'], unique=False)
+    op.drop_index('ix_run_logs_run_id_timestamp_id', table_name='run_logs')
@@ -0,0 +1,33 @@
+"""Add run listing indexes on (runnable_id, created_at) and (status, created_at)
+
+Revision ID: 9d4f6a2c8e15
+Revises: 5b2e9c41d7f3
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6a2c8e15'
+down_revision: Union[str, None] = '5b2e9c41d7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_runs_runnable_id_created_at', 'runs', ['runnable_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_runs_status_created_at', 'runs', ['status', 'created_at', 'id'], unique=False)
+    # The composite index starts with runnable_id, so the single-column index is redundant
+    op.drop_index(op.f('ix_runs_runnable_id'), table_name='runs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_runs_runnable_id'), 'runs', ['runnable_id'], unique=False)
+    op.drop_index('ix_runs_status_created_at', table_name='runs')
+    op.drop_index('ix_runs_runnable_id_created_at', table_name='runs')
@@ -0,0 +1,28 @@
+"""Add run listing index on (user_id, created_at)
+
+Revision ID: c7e1b3f9a204
+Revises: 9d4f6a2c8e15
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1b3f9a204'
+down_revision: Union[str, None] = '9d4f6a2c8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_runs_user_id_created_at', 'runs', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_runs_user_id_created_at', table_name='runs')
@@ -0,0 +1,77 @@
+"""Add knowledge sync state: file hashes, chunk hashes and bucket watermarks
+
+Revision ID: e4a9c2d7b6f1
+Revises: c7e1b3f9a204
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c2d7b6f1'
+down_revision: Union[str, None] = 'c7e1b3f9a204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('file_metadata', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('file_metadata', sa.Column('s3_etag', sa.String(length=255), nullable=True))
+    op.add_column('file_metadata', sa.Column('processing_status', sa.String(length=20), server_default='pending', nullable=False))
+    op.add_column('file_metadata', sa.Column('processing_error', sa.Text(), nullable=True))
+    op.add_column('file_metadata', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    op.add_column('file_metadata', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_file_metadata_bucket_id_s3_key', 'file_metadata', ['bucket_id', 's3_key'], unique=False)
+
+    op.create_table('knowledge_chunks',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('bucket_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('file_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('vector_doc_id', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['bucket_id'], ['content_buckets.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['file_id'], ['file_metadata.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id', 'content_hash', name='uq_knowledge_chunks_file_id_content_hash')
+    )
+    op.create_index(op.f('ix_knowledge_chunks_bucket_id'), 'knowledge_chunks', ['bucket_id'], unique=False)
+    op.create_index(op.f('ix_knowledge_chunks_file_id'), 'knowledge_chunks', ['file_id'], unique=False)
+
+    op.create_table('bucket_sync_state',
+    sa.Column('bucket_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('watermark', sa.DateTime(), nullable=True),
+    sa.Column('config_hash', sa.String(length=64), nullable=True),
+    sa.Column('last_started_at', sa.DateTime(), nullable=True),
+    sa.Column('last_completed_at', sa.DateTime(), nullable=True),
+    sa.Column('files_seen', sa.Integer(), nullable=False),
+    sa.Column('files_changed', sa.Integer(), nullable=False),
+    sa.Column('files_deleted', sa.Integer(), nullable=False),
+    sa.Column('chunks_embedded', sa.Integer(), nullable=False),
+    sa.Column('chunks_deleted', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['bucket_id'], ['content_buckets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bucket_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('bucket_sync_state')
+    op.drop_index(op.f('ix_knowledge_chunks_file_id'), table_name='knowledge_chunks')
+    op.drop_index(op.f('ix_knowledge_chunks_bucket_id'), table_name='knowledge_chunks')
+    op.drop_table('knowledge_chunks')
+    op.drop_index('ix_file_metadata_bucket_id_s3_key', table_name='file_metadata')
+    op.drop_column('file_metadata', 'deleted_at')
+    op.drop_column('file_metadata', 'processed_at')
+    op.drop_column('file_metadata', 'processing_error')
+    op.drop_column('file_metadata', 'processing_status')
+    op.drop_column('file_metadata', 's3_etag')
+    op.drop_column('file_metadata', 'content_hash')
@@ -5,6 +5,7 @@ from mindloom.app.api.v1.endpoints import teams
 from mindloom.app.api.v1.endpoints import runs
 from mindloom.app.api.v1.endpoints import auth
 from mindloom.app.api.v1.endpoints import content_buckets
+from mindloom.app.api.v1.endpoints import tools
 
 api_router = APIRouter()
 
@@ -13,6 +14,7 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Auth"])
 api_router.include_router(agents.router, prefix="/agents", tags=["Agents"])
 api_router.include_router(teams.router, prefix="/teams", tags=["Teams"])
 api_router.include_router(runs.router, prefix="/runs", tags=["Runs"])
+api_router.include_router(tools.router, prefix="/tools", tags=["Tools"])
 
 # Include the new content buckets router
 api_router.include_router(
@@ -1,20 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import List, Optional
 import uuid
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
-from mindloom.app.models.agent import Agent, AgentCreate, AgentUpdate, AgentORM
+from mindloom.app.models.agent import Agent, AgentCreate, AgentUpdate, AgentORM, ToolConfig
 from mindloom.app.models.content_bucket import ContentBucketORM
 from mindloom.app.models.user import User
 from mindloom.dependencies import get_db, get_current_user
+from mindloom.services.agents import invalidate_agent_blueprint
+from mindloom.services.exceptions import ConfigurationError
+from mindloom.tools import tool_registry
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 # Define potential error responses
 not_found_response = {status.HTTP_404_NOT_FOUND: {"description": "Agent not found"}}
-bad_bucket_response = {status.HTTP_400_BAD_REQUEST: {"description": "Invalid Content Bucket ID(s) provided"}}
+bad_bucket_response = {status.HTTP_400_BAD_REQUEST: {"description": "Invalid Content Bucket ID(s) or tool configuration provided"}}
+
+
+def _validate_tool_configs(tools: Optional[List[ToolConfig]]) -> None:
+    """Rejects unknown tools and tool parameters that do not match the toolkit's constructor."""
+    for tool in tools or []:
+        try:
+            tool_registry.validate(tool.name, tool.config)
+        except ConfigurationError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 
 @router.post(
     "/",
@@ -29,7 +43,9 @@ async def create_agent(agent_in: AgentCreate, current_user: User = Depends(get_c
 
     - **agent_in**: Agent details including name, configuration, and optional content bucket IDs.
     - **Returns**: The newly created agent object.
+    - **Raises**: `HTTPException` (400) if a tool is unknown or its `config` does not match the tool's parameters.
     """
+    _validate_tool_configs(agent_in.tools)
     new_id = uuid.uuid4()
     # Extract agent data from request, excluding fields not present in ORM and any potential owner_id to prevent duplicates
     agent_data = agent_in.model_dump(exclude={'content_bucket_ids', 'owner_id'})
@@ -127,6 +143,7 @@ async def update_agent(
     - **Returns**: The updated agent object.
     - **Raises**: `HTTPException` (404) if the agent is not found.
     - **Raises**: `HTTPException` (400) if invalid `content_bucket_ids` are provided.
+    - **Raises**: `HTTPException` (400) if a tool is unknown or its `config` does not match the tool's parameters.
     """
     statement = select(AgentORM).where(AgentORM.id == agent_id).options(selectinload(AgentORM.content_buckets))
     result = await db.execute(statement)
@@ -134,6 +151,7 @@ async def update_agent(
     if agent is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
 
+    _validate_tool_configs(agent_in.tools)
     update_data = agent_in.model_dump(exclude_unset=True)
     content_bucket_ids = update_data.pop('content_bucket_ids', None) # Handle specifically
 
@@ -157,7 +175,10 @@ async def update_agent(
     # Update other fields
     for key, value in update_data.items():
         setattr(agent, key, value)
+    # Bump the version explicitly: bucket-only changes do not touch the agents row
+    agent.updated_at = datetime.utcnow()
     await db.commit()
+    invalidate_agent_blueprint(agent_id)
     await db.refresh(agent, attribute_names=['content_buckets']) # Refresh the relationship
     # Return the ORM model
     return agent # Return ORM instance
@@ -186,6 +207,7 @@ async def delete_agent(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     await db.delete(agent)
     await db.commit()
+    invalidate_agent_blueprint(agent_id)
     return None # FastAPI handles the 204 No Content response
 
 # --- Agent-Content Bucket Association Endpoints --- #
@@ -227,7 +249,9 @@ async def associate_agent_content_bucket(
     # Add association if not already present
     if bucket not in agent.content_buckets:
         agent.content_buckets.append(bucket)
+        agent.updated_at = datetime.utcnow() # New blueprint version for running executors
         await db.commit()
+        invalidate_agent_blueprint(agent_id)
         await db.refresh(agent, attribute_names=['content_buckets'])
 
     return agent # Return updated ORM instance
@@ -264,7 +288,9 @@ async def dissociate_agent_content_bucket(
 
     if bucket_to_remove:
         agent.content_buckets.remove(bucket_to_remove)
+        agent.updated_at = datetime.utcnow() # New blueprint version for running executors
         await db.commit()
+        invalidate_agent_blueprint(agent_id)
         await db.refresh(agent, attribute_names=['content_buckets'])
     # If bucket wasn't associated, no error, just return current state
     # If bucket ID itself doesn't exist, we could 404, but maybe unnecessary
@@ -12,6 +12,7 @@ from mindloom.app.models.content_bucket import (
     ContentBucketUpdate,
 )
 from mindloom.app.models.file_metadata import FileMetadata
+import mindloom.services.redis as redis_service
 from mindloom.services.content_buckets import ContentBucketService
 from mindloom.services.exceptions import ServiceError
 
@@ -52,6 +53,22 @@ async def read_content_buckets(
         logger.exception(f"Unexpected error reading content buckets: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
 
+@router.get("/ingestion/stats", response_model=Dict[str, Any])
+async def read_ingestion_stats() -> Dict[str, Any]:
+    """
+    Retrieve ingestion queue and embedding cache statistics.
+
+    - **queue**: Ingestion queue depth (`length`, `pending`, `waiting`) and worker count (`consumers`).
+    - **embedding_cache**: Cache hits per tier (`hits_redis`, `hits_postgres`), `misses`, `stored` and tier `errors`, summed over all processes.
+    """
+    try:
+        queue_stats = await redis_service.ingestion_queue_stats()
+        cache_stats = await redis_service.embedding_cache_stats()
+    except Exception as e:
+        logger.error(f"Error reading ingestion stats: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingestion statistics are unavailable.")
+    return {"queue": queue_stats, "embedding_cache": cache_stats}
+
 @router.get("/{bucket_id}", response_model=ContentBucket)
 async def read_content_bucket(
     bucket_id: uuid.UUID,
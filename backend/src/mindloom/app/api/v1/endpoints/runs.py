@@ -1,110 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from typing import List, Dict, Optional, Any, AsyncGenerator
+from typing import List, Dict, Optional, Any, AsyncGenerator, Tuple
 import uuid
 from datetime import datetime
 import asyncio
 import json # For serializing input_data
 import os # For potential env vars
 import logging # Add logging
+import re
 
-from kubernetes import client, config
 from sqlalchemy.ext.asyncio import AsyncSession # Import AsyncSession
 
-from mindloom.app.models.run import Run, RunCreate, RunStatus
+from mindloom.app.models.run import Run, RunCreate, RunStatus, RunLog, RunLogPage, LogLevel, RunSummaryPage
 from mindloom.dependencies import get_current_user
 from mindloom.app.models.user import User
 from mindloom.services.agents import AgentService # Keep for potential validation
 from mindloom.services.teams import TeamService     # Keep for potential validation
 from mindloom.core.config import settings
-from mindloom.db.session import get_async_db_session
-from mindloom.services.runs import run_service # Import the service instance
+from mindloom.db.session import get_async_db_session, async_session_maker
+from mindloom.services.runs import run_service, encode_keyset_cursor, decode_keyset_cursor # Import the service instance
 from mindloom.app.models.run import Run as RunSchema # Import Pydantic schema
 from mindloom.services import redis as redis_service # Import Redis service
-
-# --- Kubernetes Configuration --- 
-# Load Kubernetes configuration
-try:
-    if os.getenv('KUBERNETES_SERVICE_HOST'):
-        config.load_incluster_config()
-        print("Loaded in-cluster Kubernetes config")
-    else:
-        config.load_kube_config()
-        print("Loaded local Kube config")
-    K8S_BATCH_V1_API = client.BatchV1Api()
-    K8S_NAMESPACE = settings.KUBERNETES_NAMESPACE # Expect KUBERNETES_NAMESPACE in settings
-    print(f"Kubernetes client initialized for namespace: {K8S_NAMESPACE}")
-except Exception as e:
-    print(f"Error loading Kubernetes config: {e}. Job creation will fail.")
-    K8S_BATCH_V1_API = None
-    K8S_NAMESPACE = 'default' # Fallback or raise?
+from mindloom.services import kubernetes as kubernetes_service
+from mindloom.services.pubsub import pubsub_multiplexer, DROP_NEWEST, DROP_OLDEST
+from mindloom.services.exceptions import JobSubmissionError
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 # Get a logger instance (can be configured further in main app setup)
 logger = logging.getLogger(__name__)
 
-async def _stream_run_results(run_id: str) -> AsyncGenerator[str, None]:
-    """Async generator to subscribe to Redis and yield SSE messages for a run."""
-    channel_name = f"run_results:{run_id}"
-    redis_client = None
-    pubsub = None
-    try:
-        # Get Redis client from the service
-        redis_client = await redis_service.get_client()
-        # Create pubsub object
-        pubsub = redis_client.pubsub()
-        await pubsub.subscribe(channel_name)
-        logger.info(f"Subscribed to Redis channel: {channel_name}")
+# Statuses after which a run writes no more results
+_TERMINAL_STATUSES = {RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELLED}
+
+# Redis stream entry IDs, as sent back by clients in `Last-Event-ID`
+_STREAM_ENTRY_ID = re.compile(r"^\d+(-\d+)?$")
 
+
+async def _iter_run_results(
+    run_id: str, last_event_id: str = "0", idle_timeout: float = 15.0
+) -> AsyncGenerator[Optional[Tuple[str, str]], None]:
+    """
+    Push-based iterator over a run's result stream, starting after `last_event_id`.
+
+    Yields (entry_id, json_data) pairs as soon as the executor's wake-up arrives through the
+    shared Pub/Sub multiplexer, and yields None whenever `idle_timeout` seconds pass without
+    new results, so callers can send heartbeats or check the client. Each idle tick also
+    re-reads the stream, in case a wake-up was lost while the Pub/Sub connection reconnected.
+    Stops after the run's end event, or with a synthesized end event when the run has finished
+    but its end event is gone (the stream expired or was trimmed) or was never written.
+    """
+    stream_key = redis_service.run_results_key(run_id)
+    # Subscribe before reading the backlog so no wake-up is missed in between
+    subscription = await pubsub_multiplexer.subscribe(stream_key, max_queue=1, policy=DROP_NEWEST)
+    try:
         while True:
-            # Listen for messages with a timeout to allow checking connection
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if message is not None and message["type"] == "message":
+            entries = await redis_service.read_run_results(run_id, last_id=last_event_id)
+            for entry_id, data_str in entries:
+                last_event_id = entry_id
+                yield entry_id, data_str
+
+                # Check if this is the end message
                 try:
-                    # Assuming message['data'] is the JSON string from run_executor
-                    data_str = message['data'] # Already decoded by redis_service pool
-                    # Format as SSE message
-                    sse_message = f"data: {data_str}\n\n"
-                    yield sse_message
+                    data_obj = json.loads(data_str)
+                    if isinstance(data_obj, dict) and data_obj.get("event") == "end":
+                        logger.info(f"Received end event for {stream_key}, closing stream.")
+                        return # Generator finishes
+                except json.JSONDecodeError:
+                    pass # Ignore if data isn't valid JSON for the 'end' check
+
+            if not entries and await subscription.get(timeout=idle_timeout) is None:
+                end_event = await _missing_end_event(run_id, stream_key)
+                if end_event is not None:
+                    # Results written since the last read still go out before the end
+                    if not await redis_service.read_run_results(run_id, last_id=last_event_id, count=1):
+                        logger.info(f"Run {run_id} finished without an end event in {stream_key}, closing stream.")
+                        yield last_event_id, json.dumps(end_event)
+                        return
+                    continue
+                yield None
+    finally:
+        await pubsub_multiplexer.unsubscribe(subscription)
 
-                    # Check if this is the end message
-                    try:
-                        data_obj = json.loads(data_str)
-                        if isinstance(data_obj, dict) and data_obj.get("event") == "end":
-                            logger.info(f"Received end event for {channel_name}, closing stream.")
-                            break # Exit the loop, generator finishes
-                    except json.JSONDecodeError:
-                        pass # Ignore if data isn't valid JSON for the 'end' check
-
-                except Exception as e:
-                    logger.error(f"Error processing message from {channel_name}: {e}", exc_info=True)
-                    # Optional: yield an error event to the client
-                    yield f"event: error\ndata: {{\"error\": \"Error processing stream message\"}}\n\n"
-
-            # Optional: Add a small sleep if no message to prevent tight loop on timeout
-            elif message is None:
-                 await asyncio.sleep(0.1)
+
+async def _missing_end_event(run_id: str, stream_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the end event to send for a run that will write no more results: one that has
+    finished or no longer exists. Returns None while the run may still produce results.
+    """
+    stream_exists = await redis_service.exists(stream_key)
+    # The request's session is closed once the response starts, so the check opens its own
+    async with async_session_maker() as session:
+        run_status = await run_service.get_run_status(db=session, run_id=uuid.UUID(run_id))
+    if run_status is None:
+        return {"event": "end", "status": None, "error": "Run not found"}
+    if run_status in _TERMINAL_STATUSES:
+        event = {"event": "end", "status": RunStatus(run_status).value}
+        if not stream_exists:
+            event["detail"] = "Result stream expired"
+        return event
+    return None
+
+
+async def _stream_run_results(
+    run_id: str, last_event_id: str = "0", request: Optional[Request] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Async generator that replays a run's result stream from `last_event_id` and tails it live as SSE.
+
+    Each chunk is sent with its stream entry ID as the SSE `id`, so a reconnecting client can
+    resume with `Last-Event-ID`. Starting from "0" replays every chunk the run has produced.
+    While the run is quiet, a heartbeat comment is sent every SSE_HEARTBEAT_INTERVAL seconds to
+    keep proxies from closing the connection, and the stream stops once the client has gone away.
+    """
+    stream_key = redis_service.run_results_key(run_id)
+    results = _iter_run_results(run_id, last_event_id, idle_timeout=settings.SSE_HEARTBEAT_INTERVAL)
+    try:
+        logger.info(f"Streaming {stream_key} from entry {last_event_id}")
+        async for result in results:
+            if result is None:
+                if request is not None and await request.is_disconnected():
+                    logger.info(f"Client disconnected from {stream_key}.")
+                    break
+                yield ": heartbeat\n\n"
+                continue
+            entry_id, data_str = result
+            # Format as SSE message
+            yield f"id: {entry_id}\ndata: {data_str}\n\n"
 
     except asyncio.CancelledError:
-        logger.info(f"Run result streaming cancelled for {channel_name}.")
+        logger.info(f"Run result streaming cancelled for {stream_key}.")
     except Exception as e:
-        logger.error(f"Error during Redis subscription/listen for {channel_name}: {e}", exc_info=True)
+        logger.error(f"Error reading result stream {stream_key}: {e}", exc_info=True)
         # Optional: yield an error event to the client
         try:
             yield f"event: error\ndata: {{\"error\": \"Stream disconnected due to server error\"}}\n\n"
         except Exception:
             pass # Ignore if yield fails after error
     finally:
-        logger.info(f"Cleaning up stream for {channel_name}.")
-        if pubsub:
-            try:
-                await pubsub.unsubscribe(channel_name)
-                # Note: pubsub doesn't have a close() method in the asyncio client
-                # The connection is managed by the Redis client itself
-                logger.info(f"Unsubscribed from channel {channel_name}")
-            except Exception as unsub_err:
-                logger.error(f"Error unsubscribing from channel {channel_name}: {unsub_err}")
+        logger.info(f"Cleaning up stream for {stream_key}.")
+        await results.aclose()
+
+
+async def _check_run_queue_capacity() -> None:
+    """Rejects new runs with 503 while the run queue is at RUN_QUEUE_MAX_LENGTH."""
+    try:
+        queue_length = await redis_service.run_queue_length()
+    except Exception as e:
+        logger.error(f"Error reading run queue length: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Run queue is unavailable. Cannot schedule run.",
+        )
+    if queue_length >= settings.RUN_QUEUE_MAX_LENGTH:
+        logger.warning(f"Run queue is full ({queue_length} runs); rejecting new run.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many runs are queued. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+
+async def _enqueue_run(
+    db: AsyncSession,
+    run_id: uuid.UUID,
+    runnable_type: str,
+    runnable_id: uuid.UUID,
+    input_variables: Optional[Dict[str, Any]],
+) -> None:
+    """Adds the run to the run queue stream for the warm executor worker pool."""
+    payload = {
+        "run_id": str(run_id),
+        "runnable_type": runnable_type,
+        "runnable_id": str(runnable_id),
+        "input_data": input_variables or {},
+    }
+    try:
+        await redis_service.enqueue_run(payload)
+        logger.info(f"Queued Run {run_id} for the executor pool.")
+    except Exception as e:
+        logger.error(f"Error queueing Run {run_id} for execution: {e}")
+        try:
+            await run_service.update_run_status(
+                db=db,
+                run_id=run_id,
+                status=RunStatus.FAILED,
+                output_data={"error": f"Failed to queue run for execution: {e}"}
+            )
+        except Exception as db_err:
+            logger.error(f"Failed to mark Run {run_id} as FAILED after queue error: {db_err}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Run queue is unavailable. Cannot schedule run.",
+        )
+
+
+async def _launch_run_job(
+    db: AsyncSession,
+    run_id: uuid.UUID,
+    runnable_type: str,
+    runnable_id: uuid.UUID,
+    input_variables: Optional[Dict[str, Any]],
+) -> None:
+    """Launches a dedicated Kubernetes Job for the run (RUN_EXECUTION_MODE=job)."""
+    job = kubernetes_service.build_run_job(run_id, runnable_type, runnable_id, input_variables)
+    try:
+        # Submitted from the Kubernetes service's thread pool, so the event loop never waits on the API server
+        await kubernetes_service.submit_job(job)
+    except JobSubmissionError as e:
+        logger.error(f"Error launching Kubernetes Job for Run {run_id}: {e}")
+        # Attempt to mark the DB run as FAILED if Job creation fails
+        try:
+            await run_service.update_run_status(
+                db=db,
+                run_id=run_id,
+                status=RunStatus.FAILED,
+                output_data={"error": str(e)}
+            )
+            logger.info(f"Marked Run {run_id} as FAILED in database due to Job creation error.")
+        except Exception as db_err:
+            logger.error(f"Failed to mark Run {run_id} as FAILED after Job creation error: {db_err}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to launch run execution job: {e}",
+        )
 
 
 @router.post(
@@ -116,11 +235,14 @@ async def _stream_run_results(run_id: str) -> AsyncGenerator[str, None]:
 )
 async def create_run(
     run_in: RunCreate,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_db_session) # Inject DB session
 ) -> StreamingResponse:
     """
-    Start a new run for an agent or team by launching a Kubernetes Job.
+    Start a new run for an agent or team.
+    The run is queued for the executor worker pool, or launched as a dedicated
+    Kubernetes Job when RUN_EXECUTION_MODE is 'job'.
     Returns a Server-Sent Events stream with run results.
     """
     # Basic validation (can be enhanced later)
@@ -129,6 +251,10 @@ async def create_run(
 
     # TODO: Validate runnable_id exists using AgentService/TeamService if needed
 
+    # Shed load before recording the run if the executor pool is already saturated
+    if settings.RUN_EXECUTION_MODE != "job":
+        await _check_run_queue_capacity()
+
     # 1. Create Run record in DB with PENDING status
     try:
         db_run = await run_service.create_run(
@@ -136,174 +262,176 @@ async def create_run(
             runnable_id=run_in.runnable_id,
             runnable_type=run_in.runnable_type,
             input_variables=run_in.input_variables,
-            # user_id=current_user.id # Pass user ID if available from auth
+            user_id=current_user.id,
         )
         run_id = db_run.id # Use the ID generated by the database
-        print(f"Created Run {run_id} in database with status PENDING.")
+        logger.info(f"Created Run {run_id} in database with status PENDING.")
     except Exception as e:
-         # Log the error appropriately
-        print(f"Error creating run record in database: {e}")
+        logger.error(f"Error creating run record in database: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to create run record in database.")
 
 
-    if not K8S_BATCH_V1_API:
-        # Update status to FAILED if K8s client failed to init
-        await run_service.update_run_status(
-            db=db,
-            run_id=run_id,
-            status=RunStatus.FAILED,
-            output_data={"error": "Kubernetes client not initialized. Cannot create job."}
-        )
-        print(f"Marked Run {run_id} as FAILED in database due to K8s client initialization error.")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Kubernetes client not available. Cannot schedule run."
-        )
+    # 2. Hand the run to an executor
+    if settings.RUN_EXECUTION_MODE == "job":
+        await _launch_run_job(db, run_id, run_in.runnable_type, run_in.runnable_id, run_in.input_variables)
+    else:
+        await _enqueue_run(db, run_id, run_in.runnable_type, run_in.runnable_id, run_in.input_variables)
 
-    # 2. Define Kubernetes Job
-    job_name = f"mindloom-run-{run_id}"
-    namespace = settings.KUBERNETES_NAMESPACE
-
-    redis_host = os.getenv('REDIS_HOST', 'redis')
-    redis_port = int(os.getenv('REDIS_PORT', 6379))
-    redis_password = os.getenv('REDIS_PASSWORD', '')
-    redis_url = f"redis://:{redis_password}@{redis_host}:{redis_port}"
-
-    # Prepare environment variables for the executor pod
-    env_vars = [
-        client.V1EnvVar(name="RUN_ID", value=str(run_id)),
-        client.V1EnvVar(name="RUNNABLE_TYPE", value=run_in.runnable_type),
-        client.V1EnvVar(name="RUNNABLE_ID", value=str(run_in.runnable_id)),
-        client.V1EnvVar(name="INPUT_DATA", value=json.dumps(run_in.input_variables or {})),
-        # Assuming DATABASE_URL and REDIS_URL are needed by the executor
-        # These should ideally come from Secrets or a ConfigMap in a real setup
-        client.V1EnvVar(name="DATABASE_URL", value=settings.DATABASE_URL.unicode_string()),
-        client.V1EnvVar(name="REDIS_URL", value=redis_url),
-        client.V1EnvVar(name="OPENAI_API_KEY", value=settings.OPENAI_API_KEY),
-        # Add other necessary env vars (e.g., API keys via Secrets)
-        # client.V1EnvVar(name="OPENAI_API_KEY", value_from=client.V1EnvVarSource(secret_key_ref=client.V1SecretKeySelector(name="mindloom-secrets", key="openai-api-key"))),
-    ]
-
-    # Define the container for the Job
-    container = client.V1Container(
-        name="run-executor",
-        image=settings.KUBERNETES_EXECUTOR_IMAGE, # Use image from settings
-        command=["uv", "run", "/app/src/mindloom/execution/run_executor.py"], # Command to run the script
-        env=env_vars,
-        image_pull_policy="IfNotPresent", # Or "Always" if using :latest tag
-        # Add resource requests/limits
-        # resources=client.V1ResourceRequirements(
-        #     requests={"cpu": "100m", "memory": "256Mi"},
-        #     limits={"cpu": "500m", "memory": "512Mi"},
-        # ),
-    )
+    # Return StreamingResponse
+    return StreamingResponse(_stream_run_results(str(run_id), request=request), media_type="text/event-stream")
 
-    # Define the Pod template spec
-    template = client.V1PodTemplateSpec(
-        metadata=client.V1ObjectMeta(labels={"app": "mindloom-run-executor", "run_id": str(run_id)}),
-        spec=client.V1PodSpec(
-            restart_policy="Never", # Jobs should not restart pods on failure
-            containers=[container],
-            # Add imagePullSecrets for GitHub Container Registry
-            image_pull_secrets=[client.V1LocalObjectReference(name="ghcr-creds")],
-            # Consider serviceAccountName if specific permissions are needed for the pod
-            # service_account_name="mindloom-executor-sa"
-        ),
-    )
 
-    # Define the Job spec
-    job_spec = client.V1JobSpec(
-        template=template,
-        backoff_limit=1, # Number of retries before marking job as failed
-        ttl_seconds_after_finished=3600 # Auto-cleanup finished jobs after 1 hour
-    )
+@router.get("/", response_model=RunSummaryPage, tags=["Runs"])
+async def read_runs(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    runnable_id: Optional[uuid.UUID] = None, # Optional filter by agent/team
+    runnable_type: Optional[str] = Query(None, pattern="^(agent|team)$"), # Optional filter by type
+    run_status: Optional[RunStatus] = Query(None, alias="status"), # Optional filter by status
+    user_id: Optional[uuid.UUID] = None,     # Optional filter by initiating user
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_db_session)
+) -> RunSummaryPage:
+    """
+    Search runs, newest first, returning a page of run summaries.
+
+    - **cursor**: `next_cursor` from the previous page; omit it to start with the newest run.
+    - **created_after** / **created_before**: Only runs created in `[created_after, created_before)`.
+    - **include_total**: Add `total_estimate`, an approximate count of matching runs taken from
+      planner statistics rather than `COUNT(*)`.
+    """
+    before = None
+    if cursor:
+        try:
+            before = decode_keyset_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Define the Job object
-    job = client.V1Job(
-        api_version="batch/v1",
-        kind="Job",
-        metadata=client.V1ObjectMeta(name=job_name, labels={"app": "mindloom-run", "run_id": str(run_id)}),
-        spec=job_spec,
+    filters = dict(
+        runnable_id=runnable_id,
+        runnable_type=runnable_type,
+        status=run_status,
+        user_id=user_id,
+        created_after=created_after,
+        created_before=created_before,
     )
+    runs_list = await run_service.get_runs(db=db, before=before, limit=limit, **filters)
 
-    # 3. Create the Kubernetes Job
-    try:
-        print(f"Creating Kubernetes Job '{job_name}' in namespace '{namespace}'...")
-        job_response = K8S_BATCH_V1_API.create_namespaced_job(body=job, namespace=namespace)
-        print(f"Kubernetes Job created successfully. Job status: {job_response.status}")
-    except client.ApiException as e:
-        print(f"Error creating Kubernetes Job: {e.status} - {e.reason}")
-        print(f"Body: {e.body}")
-        # Attempt to mark the DB run as FAILED if Job creation fails
-        try:
-            await run_service.update_run_status(
-                db=db,
-                run_id=run_id,
-                status=RunStatus.FAILED,
-                output_data={"error": f"Failed to create Kubernetes Job: {e.reason}"}
-            )
-            print(f"Marked Run {run_id} as FAILED in database due to Job creation error.")
-        except Exception as db_err:
-             print(f"Failed to mark Run {run_id} as FAILED after Job creation error: {db_err}")
+    next_cursor = None
+    if len(runs_list) == limit:
+        next_cursor = encode_keyset_cursor(runs_list[-1]["created_at"], runs_list[-1]["id"])
+    total_estimate = await run_service.estimate_run_count(db=db, **filters) if include_total else None
+    return RunSummaryPage(items=runs_list, next_cursor=next_cursor, total_estimate=total_estimate)
 
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to launch run execution job: {e.reason}",
-        )
-    except Exception as e:
-         # Catch other potential errors during job creation setup
-         print(f"Unexpected error preparing or creating Kubernetes Job: {e}")
-         # Attempt to mark the DB run as FAILED
-         try:
-             await run_service.update_run_status(
-                 db=db,
-                 run_id=run_id,
-                 status=RunStatus.FAILED,
-                 output_data={"error": f"Unexpected error during Job creation: {e}"}
-             )
-             print(f"Marked Run {run_id} as FAILED in database due to unexpected Job creation error.")
-         except Exception as db_err:
-              print(f"Failed to mark Run {run_id} as FAILED after unexpected Job creation error: {db_err}")
-         raise HTTPException(
-             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-             detail="An unexpected error occurred while launching the run execution job.",
-         )
 
+@router.get("/queue/stats", response_model=Dict[str, Any], tags=["Runs"])
+async def read_run_queue_stats() -> Dict[str, Any]:
+    """
+    Retrieve run queue depth and executor statistics.
 
-    # Return StreamingResponse
-    return StreamingResponse(_stream_run_results(str(run_id)), media_type="text/event-stream")
+    - **length**: Runs in the queue, waiting or in flight.
+    - **pending**: Runs claimed by an executor but not yet finished.
+    - **waiting**: Runs not yet claimed by any executor.
+    - **consumers**: Executor workers registered on the queue.
+    """
+    try:
+        stats = await redis_service.run_queue_stats()
+    except Exception as e:
+        logger.error(f"Error reading run queue stats: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Run queue is unavailable.")
+    return {**stats, "max_length": settings.RUN_QUEUE_MAX_LENGTH}
 
 
-@router.get("/", response_model=List[RunSchema], tags=["Runs"])
-async def read_runs(
-    skip: int = 0,
-    limit: int = 100,
-    runnable_id: Optional[uuid.UUID] = None, # Optional filter by agent/team
-    status: Optional[RunStatus] = None       # Optional filter by status
-) -> List[Run]:
+@router.get(
+    "/{run_id}/results",
+    tags=["Runs"],
+    summary="Replay and tail run results (SSE)",
+    response_description="A stream of Server-Sent Events containing run results."
+)
+async def stream_run_results(
+    run_id: uuid.UUID,
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db_session)
+) -> StreamingResponse:
     """
-    Retrieve a list of runs, with optional filtering.
+    Stream a run's results as Server-Sent Events.
+
+    Replays every result chunk from the start of the run, or only those after the
+    `Last-Event-ID` header sent by a reconnecting client, then tails new chunks until the run ends.
     """
-    runs_list = await run_service.get_runs(
-        db=get_async_db_session(),
-        skip=skip,
-        limit=limit,
-        runnable_id=runnable_id,
-        status=status
+    if last_event_id is not None and not _STREAM_ENTRY_ID.match(last_event_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID header.")
+    run = await run_service.get_run(db=db, run_id=run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return StreamingResponse(
+        _stream_run_results(str(run_id), last_event_id or "0", request=request),
+        media_type="text/event-stream",
     )
 
-    # Apply sorting (e.g., newest first)
-    runs_list.sort(key=lambda r: r.created_at, reverse=True)
 
-    return runs_list
+async def _stream_run_logs_ndjson(
+    run_id: uuid.UUID, after: Optional[Tuple[datetime, uuid.UUID]], levels: Optional[List[LogLevel]]
+) -> AsyncGenerator[str, None]:
+    """Streams every matching log entry of a run as newline-delimited JSON, one keyset page at a time."""
+    # The request's session is closed once the response starts, so the stream opens its own
+    async with async_session_maker() as session:
+        async for log in run_service.iter_run_logs(session, run_id, after=after, levels=levels):
+            yield RunLog.model_validate(log).model_dump_json() + "\n"
+
+
+@router.get(
+    "/{run_id}/logs",
+    response_model=RunLogPage,
+    tags=["Runs"],
+    summary="Read persisted run logs",
+    response_description="A page of log entries, or all of them as NDJSON when format=ndjson.",
+)
+async def read_run_logs(
+    run_id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    level: Optional[List[LogLevel]] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Retrieve a run's persisted logs in chronological order.
+
+    - **cursor**: `next_cursor` from the previous page; omit it to start at the first entry.
+    - **limit**: Maximum entries per page (JSON format only).
+    - **level**: Only return these levels; may be repeated (`?level=warning&level=error`).
+    - **format**: `json` for one page, or `ndjson` to stream every entry after the cursor.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_keyset_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not await run_service.run_exists(db=db, run_id=run_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_run_logs_ndjson(run_id, after, level), media_type="application/x-ndjson"
+        )
+
+    logs = await run_service.get_run_logs(db=db, run_id=run_id, after=after, levels=level, limit=limit)
+    next_cursor = encode_keyset_cursor(logs[-1].timestamp, logs[-1].id) if len(logs) == limit else None
+    return RunLogPage(items=logs, next_cursor=next_cursor)
 
 
 @router.get("/{run_id}", response_model=RunSchema, tags=["Runs"])
-async def read_run(run_id: uuid.UUID) -> Run:
+async def read_run(run_id: uuid.UUID, db: AsyncSession = Depends(get_async_db_session)) -> Run:
     """
     Retrieve a specific run by ID.
     """
-    run = await run_service.get_run(db=get_async_db_session(), run_id=run_id)
+    run = await run_service.get_run(db=db, run_id=run_id)
     if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     return run
@@ -319,56 +447,40 @@ async def websocket_log_stream(websocket: WebSocket, run_id: uuid.UUID):
     """Provides a WebSocket endpoint to stream logs for a specific run_id."""
     await websocket.accept()
     channel_name = f"run_logs:{run_id}"
-    pubsub = None
-    redis_client = None
+    subscription = None
     listener_task = None
 
     try:
-        # Get Redis client and pubsub
+        # Register with the shared Pub/Sub multiplexer instead of opening a connection per client
         try:
-            redis_client = await redis_service.get_client()
-            if not redis_client:
-                logger.error(f"Could not get Redis client for run {run_id} logs.")
-                await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Redis service not available")
-                return
-            pubsub = redis_client.pubsub()
-            await pubsub.subscribe(channel_name)
+            subscription = await pubsub_multiplexer.subscribe(channel_name, max_queue=1000, policy=DROP_OLDEST)
             logger.info(f"WebSocket client connected and subscribed to Redis channel: {channel_name}")
         except Exception as e:
             logger.error(f"Error connecting to Redis or subscribing to {channel_name}: {e}", exc_info=True)
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Failed to subscribe to log channel")
             return
 
-        # Task to listen to Redis and forward messages
-        async def redis_listener(ws: WebSocket, ps: redis_service.redis.client.PubSub):
+        # Task to forward messages from this client's queue
+        async def redis_listener(ws: WebSocket, sub):
             try:
-                async for message in ps.listen():
-                    if message is not None and message["type"] == "message":
-                        try:
-                            # Assuming message['data'] is bytes containing JSON string from RedisPubSubHandler
-                            log_data_str = message['data'].decode('utf-8')
-                            await ws.send_text(log_data_str)
-                        except WebSocketDisconnect:
-                            logger.info(f"WebSocket client disconnected while sending from {channel_name}.")
-                            break # Exit listener loop
-                        except Exception as send_err:
-                             logger.error(f"Error sending log message via WebSocket for {channel_name}: {send_err}", exc_info=True)
-                             break # Exit loop on send error
+                async for log_data_str in sub:
+                    try:
+                        # Already decoded JSON string from RedisPubSubHandler
+                        await ws.send_text(log_data_str)
+                    except WebSocketDisconnect:
+                        logger.info(f"WebSocket client disconnected while sending from {channel_name}.")
+                        break # Exit listener loop
+                    except Exception as send_err:
+                         logger.error(f"Error sending log message via WebSocket for {channel_name}: {send_err}", exc_info=True)
+                         break # Exit loop on send error
             except asyncio.CancelledError:
                  logger.info(f"Redis listener task cancelled for {channel_name}.")
-            except Exception as listen_err:
-                 # Log redis-py specific errors if possible
-                 logger.error(f"Error in Redis listener for {channel_name}: {listen_err}", exc_info=True)
-                 # Attempt to close WebSocket gracefully on listener error
-                 try:
-                    await ws.close(code=status.WS_1011_INTERNAL_ERROR, reason="Log stream disconnected")
-                 except Exception:
-                     pass # Ignore errors during closing
             finally:
+                if sub.dropped:
+                    logger.warning(f"Dropped {sub.dropped} log messages for a slow WebSocket client on {channel_name}.")
                 logger.info(f"Redis listener task concluding for {channel_name}.")
-                # Ensure unsubscribe happens in the main finally block
 
-        listener_task = asyncio.create_task(redis_listener(websocket, pubsub))
+        listener_task = asyncio.create_task(redis_listener(websocket, subscription))
 
         # Keep connection open by listening for client messages (or disconnect)
         try:
@@ -379,10 +491,6 @@ async def websocket_log_stream(websocket: WebSocket, run_id: uuid.UUID):
         except WebSocketDisconnect:
              logger.info(f"WebSocket client initiated disconnect for {channel_name}.")
 
-        # Wait for the listener task to finish if it hasn't already (e.g., if disconnect happened)
-        if listener_task and not listener_task.done():
-            await listener_task
-
     except WebSocketDisconnect:
         # This catches disconnects that happen before the receive_text loop starts
         logger.info(f"WebSocket client disconnected early for {channel_name}.")
@@ -405,15 +513,9 @@ async def websocket_log_stream(websocket: WebSocket, run_id: uuid.UUID):
             except Exception as task_wait_err:
                  logger.error(f"Error waiting for cancelled listener task {channel_name}: {task_wait_err}")
 
-        # Unsubscribe and clean up PubSub
-        if pubsub:
-            try:
-                await pubsub.unsubscribe(channel_name)
-                # Close the pubsub connection object itself
-                await pubsub.close()
-                logger.info(f"Unsubscribed and closed pubsub for Redis channel: {channel_name}")
-            except Exception as unsub_err:
-                logger.error(f"Error unsubscribing/closing pubsub for {channel_name}: {unsub_err}")
-        
+        # Release this client's subscription; the channel is unsubscribed once no clients remain
+        if subscription:
+            await pubsub_multiplexer.unsubscribe(subscription)
+
         # WebSocket should be closed by FastAPI or handled in exception blocks
         logger.info(f"WebSocket cleanup finished for {channel_name}.")
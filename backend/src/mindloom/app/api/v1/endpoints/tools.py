@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from typing import Any, List
+
+from mindloom.app.models.tool import ToolInfo, ToolParameterInfo
+from mindloom.dependencies import get_current_user
+from mindloom.tools import tool_registry
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+def _json_default(value: Any) -> Any:
+    """Keeps parameter defaults JSON-serializable; other values are shown as their repr."""
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return repr(value)
+
+
+@router.get("/", response_model=List[ToolInfo], tags=["Tools"])
+async def read_tools() -> List[ToolInfo]:
+    """
+    Lists the tools available to agents, with the parameters each accepts in its `config`.
+
+    Tools whose client library is not installed in this deployment are not listed.
+    """
+    return [
+        ToolInfo(
+            name=spec.name,
+            description=spec.description,
+            source=spec.source,
+            parameters=[
+                ToolParameterInfo(
+                    name=param.name,
+                    type=param.annotation,
+                    required=param.required,
+                    default=_json_default(param.default),
+                )
+                for param in spec.parameters.values()
+            ],
+            accepts_extra_parameters=spec.accepts_extra_kwargs,
+        )
+        for spec in tool_registry.list_tools()
+    ]
@@ -7,3 +7,5 @@ from mindloom.db.association_tables import team_agent_association # noqa: F401
 from mindloom.app.models.content_bucket import ContentBucketORM # noqa: F401
 from mindloom.app.models.file_metadata import FileMetadataORM # noqa: F401
 from mindloom.app.models.agent_content_bucket import agent_content_bucket_association # noqa: F401
+from mindloom.app.models.knowledge_sync import KnowledgeChunkORM, BucketSyncStateORM # noqa: F401
+from mindloom.app.models.embedding_cache import EmbeddingCacheORM # noqa: F401
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, Integer, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from mindloom.db.base_class import Base
+
+# --- SQLAlchemy ORM Model ---
+
+class EmbeddingCacheORM(Base):
+    """A cached embedding: one row per embedder identity and SHA-256 of the embedded text."""
+    __tablename__ = "embedding_cache"
+
+    embedder_key: Mapped[str] = mapped_column(String(255), primary_key=True) # Provider, model and dimensions
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=False) # float32 array
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True) # Drives LRU eviction
+
+    def __repr__(self):
+        return f"<EmbeddingCache(embedder='{self.embedder_key}', hash='{self.text_hash[:12]}')>"
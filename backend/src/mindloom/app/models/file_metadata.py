@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, ForeignKey, BigInteger
+from sqlalchemy import String, Text, DateTime, ForeignKey, BigInteger, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from pydantic import BaseModel, Field
@@ -19,7 +19,6 @@ class FileMetadataBase(BaseModel):
     size_bytes: Optional[int] = Field(None, description="Size of the file in bytes")
     # Using last_modified from S3 or upload time might be simpler than reliable hashing initially
     last_modified: datetime = Field(..., description="Last modified timestamp (from S3 or upload time)")
-    # content_hash: Optional[str] = Field(None, description="Optional hash (e.g., MD5, SHA256) of the file content")
     bucket_id: uuid.UUID = Field(..., description="ID of the content bucket this file belongs to")
 
 class FileMetadataCreate(FileMetadataBase):
@@ -32,6 +31,10 @@ class FileMetadataUpdate(BaseModel):
 class FileMetadata(FileMetadataBase):
     id: uuid.UUID
     created_at: datetime
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the file content when it was last synced")
+    processing_status: Optional[str] = Field(None, description="Knowledge sync status: pending, processing, processed, error or deleted_from_s3")
+    processing_error: Optional[str] = Field(None, description="Error from the last failed sync of this file")
+    processed_at: Optional[datetime] = Field(None, description="When the file's chunks were last synced to the vector store")
 
     class Config:
         from_attributes = True
@@ -48,7 +51,13 @@ class FileMetadataORM(Base):
     content_type: Mapped[str | None] = mapped_column(String(100))
     size_bytes: Mapped[int | None] = mapped_column(BigInteger) # Use BigInteger for potentially large files
     last_modified: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
-    # content_hash: Mapped[str | None] = mapped_column(String(64)) # e.g., SHA256
+    # Knowledge sync state, maintained by mindloom.services.knowledge_sync
+    content_hash: Mapped[str | None] = mapped_column(String(64)) # SHA-256 of the synced content
+    s3_etag: Mapped[str | None] = mapped_column(String(255)) # ETag seen at the last sync, checked before downloading
+    processing_status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending", server_default="pending")
+    processing_error: Mapped[str | None] = mapped_column(Text)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime) # Set when the file is tombstoned
 
     bucket_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("content_buckets.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -56,5 +65,10 @@ class FileMetadataORM(Base):
     # Relationship: Many-to-One with ContentBucket
     bucket = relationship("ContentBucketORM", back_populates="files")
 
+    __table_args__ = (
+        # Sync engine: look up a bucket's files by key
+        Index("ix_file_metadata_bucket_id_s3_key", "bucket_id", "s3_key"),
+    )
+
     def __repr__(self):
         return f"<FileMetadata(id={self.id}, filename='{self.filename}', key='{self.s3_key}')>"
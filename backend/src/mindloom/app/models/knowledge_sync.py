@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+from pydantic import BaseModel, Field
+
+from mindloom.db.base_class import Base
+
+# --- Pydantic Schemas ---
+
+class BucketSyncState(BaseModel):
+    bucket_id: uuid.UUID
+    watermark: Optional[datetime] = Field(None, description="Newest S3 LastModified seen by the last completed sync")
+    last_started_at: Optional[datetime] = None
+    last_completed_at: Optional[datetime] = None
+    files_seen: int = Field(0, description="Files listed in S3 by the last sync")
+    files_changed: int = Field(0, description="Files whose chunks were re-synced")
+    files_deleted: int = Field(0, description="Files tombstoned because they left S3")
+    chunks_embedded: int = Field(0, description="Chunks embedded and written to the vector store")
+    chunks_deleted: int = Field(0, description="Chunks removed from the vector store")
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# --- SQLAlchemy ORM Models ---
+
+class KnowledgeChunkORM(Base):
+    """A chunk of a file that is stored in its bucket's vector store, keyed by content hash."""
+    __tablename__ = "knowledge_chunks"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    bucket_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("content_buckets.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    file_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("file_metadata.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False) # First position of the chunk in the file
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False) # SHA-256 of the chunk text
+    vector_doc_id: Mapped[str] = mapped_column(String(255), nullable=False) # Document ID in the vector store
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("file_id", "content_hash", name="uq_knowledge_chunks_file_id_content_hash"),
+    )
+
+    def __repr__(self):
+        return f"<KnowledgeChunk(file_id={self.file_id}, index={self.chunk_index}, hash='{self.content_hash[:12]}')>"
+
+
+class BucketSyncStateORM(Base):
+    """Watermark and counters of the last knowledge sync of a content bucket."""
+    __tablename__ = "bucket_sync_state"
+
+    bucket_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("content_buckets.id", ondelete="CASCADE"), primary_key=True
+    )
+    watermark: Mapped[datetime | None] = mapped_column(DateTime)
+    # Fingerprint of the embedder, vector store and chunking settings; a change re-embeds the bucket
+    config_hash: Mapped[str | None] = mapped_column(String(64))
+    last_started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    last_completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    files_seen: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    files_changed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    files_deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_embedded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text)
+
+    def __repr__(self):
+        return f"<BucketSyncState(bucket_id={self.bucket_id}, watermark={self.watermark})>"
@@ -41,9 +41,29 @@ class Run(RunBase):
     class Config:
         from_attributes = True
 
+class RunSummary(BaseModel):
+    """Lightweight run representation for listings; omits input and output payloads."""
+    id: uuid.UUID = Field(..., description="Unique identifier for the run")
+    runnable_id: uuid.UUID = Field(..., description="ID of the Agent or Team being run")
+    runnable_type: str = Field(..., description="Type of runnable ('agent' or 'team')")
+    status: RunStatus = Field(..., description="Current status of the run")
+    created_at: datetime = Field(..., description="Timestamp when the run was created")
+    started_at: Optional[datetime] = Field(None, description="Timestamp when the run started execution")
+    ended_at: Optional[datetime] = Field(None, description="Timestamp when the run finished (completed, failed, or cancelled)")
+    user_id: Optional[uuid.UUID] = Field(None, description="ID of the user who started the run")
+
+    class Config:
+        from_attributes = True
+
+class RunSummaryPage(BaseModel):
+    """A page of runs, newest first."""
+    items: List[RunSummary] = Field(..., description="Runs in this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; None when there are no more runs")
+    total_estimate: Optional[int] = Field(None, description="Approximate number of matching runs, when requested")
+
 # --- SQLAlchemy ORM Model --- #
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLAlchemyEnum, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLAlchemyEnum, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
@@ -66,7 +86,7 @@ class RunORM(Base):
     output_data: Mapped[dict | None] = mapped_column(JSON)
 
     # Store runnable details directly
-    runnable_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    runnable_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False) # Indexed by ix_runs_runnable_id_created_at
     runnable_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True) # 'agent' or 'team'
 
     # Foreign Keys
@@ -74,10 +94,19 @@ class RunORM(Base):
     user_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"))
 
     # Relationships
-    user = relationship(UserORM, back_populates="runs", lazy="selectin")
-    logs = relationship("RunLogORM", back_populates="run", cascade="all, delete-orphan", lazy="selectin") # Relationship to logs
+    # Never loaded implicitly: use selectinload(RunORM.user) when needed, and read logs
+    # page by page through RunService.get_run_logs (a run can have 100k+ log rows)
+    user = relationship(UserORM, back_populates="runs", lazy="raise")
+    logs = relationship("RunLogORM", back_populates="run", cascade="all, delete-orphan", lazy="raise") # Relationship to logs
     artifacts = relationship("RunArtifactORM", back_populates="run", cascade="all, delete-orphan") # Relationship to artifacts
 
+    __table_args__ = (
+        # Serve run listings filtered by runnable or status, newest first, with keyset pagination
+        Index("ix_runs_runnable_id_created_at", "runnable_id", "created_at", "id"),
+        Index("ix_runs_status_created_at", "status", "created_at", "id"),
+        Index("ix_runs_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Run(id={self.id}, runnable_id={self.runnable_id}, type='{self.runnable_type}', status='{self.status}')>"
 
@@ -114,6 +143,11 @@ class RunLog(RunLogBase):
     class Config:
         from_attributes = True
 
+class RunLogPage(BaseModel):
+    """A page of run log entries in (timestamp, id) order."""
+    items: List[RunLog] = Field(..., description="Log entries in this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; None when there are no more entries")
+
 # --- SQLAlchemy ORM Model for Run Log --- #
 
 from sqlalchemy import Text # Import Text type
@@ -128,12 +162,17 @@ class RunLogORM(Base):
     message: Mapped[str] = mapped_column(Text, nullable=False)
     log_metadata: Mapped[dict | None] = mapped_column(JSON)
 
-    # Foreign Key to Run
-    run_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("runs.id"), nullable=False, index=True)
+    # Foreign Key to Run (indexed by ix_run_logs_run_id_timestamp_id below)
+    run_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("runs.id"), nullable=False)
 
     # Relationship to Run
     run = relationship("RunORM", back_populates="logs")
 
+    __table_args__ = (
+        # Serves keyset pagination of a run's logs in (timestamp, id) order
+        Index("ix_run_logs_run_id_timestamp_id", "run_id", "timestamp", "id"),
+    )
+
     def __repr__(self):
         return f"<RunLog(id={self.id}, run_id={self.run_id}, level='{self.level}')>"
 
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+
+class ToolParameterInfo(BaseModel):
+    """A configuration parameter accepted by a tool."""
+    name: str = Field(..., description="Parameter name, used as a key in the tool's `config`")
+    type: Optional[str] = Field(None, description="Type annotation of the parameter, if declared")
+    required: bool = Field(..., description="Whether the parameter must be provided")
+    default: Optional[Any] = Field(None, description="Default value used when the parameter is omitted")
+
+class ToolInfo(BaseModel):
+    """A tool that can be added to an agent's `tools` list."""
+    name: str = Field(..., description="Tool name to use in an agent's tool config (e.g. 'GithubTools')")
+    description: Optional[str] = Field(None, description="Short description of the tool")
+    source: str = Field(..., description="Module or entry point the tool was loaded from")
+    parameters: List[ToolParameterInfo] = Field(default_factory=list, description="Parameters accepted in the tool's `config`")
+    accepts_extra_parameters: bool = Field(False, description="Whether parameters beyond those listed are accepted")
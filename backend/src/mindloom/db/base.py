@@ -12,3 +12,5 @@ from mindloom.app.models.agent import AgentScheduleORM # noqa # Import the SQLAl
 from mindloom.app.models.agent import AgentVariableORM # noqa # Import the SQLAlchemy AgentVariable model
 from mindloom.app.models.run import RunLogORM # noqa # Import the SQLAlchemy RunLog model
 from mindloom.app.models.run import RunArtifactORM # noqa # Import the SQLAlchemy RunArtifact model
+from mindloom.app.models.knowledge_sync import KnowledgeChunkORM, BucketSyncStateORM # noqa # Import the SQLAlchemy knowledge sync models
+from mindloom.app.models.embedding_cache import EmbeddingCacheORM # noqa # Import the SQLAlchemy EmbeddingCache model
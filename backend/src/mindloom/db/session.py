@@ -1,25 +1,121 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from mindloom.core.config import settings
 
+# Counters for the engine's connection pool, exposed via the /health/db-pool endpoint
+pool_stats: Dict[str, Any] = {
+    "connects": 0,       # New DBAPI connections opened
+    "checkouts": 0,      # Connections handed out to sessions
+    "checkins": 0,       # Connections returned to the pool
+    "invalidations": 0,  # Connections discarded after an error or failed pre-ping
+    "waits": 0,          # Checkouts that had to wait for a connection to be returned
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+    "timeouts": 0,       # Checkouts that gave up after DB_POOL_TIMEOUT
+}
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how often and how long checkouts wait for a free connection."""
+
+    def _do_get(self):
+        # With no idle connection and overflow exhausted, the checkout blocks until a checkin
+        must_wait = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        if not must_wait:
+            return super()._do_get()
+        pool_stats["waits"] += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_stats["wait_time_total"] += waited
+            pool_stats["wait_time_max"] = max(pool_stats["wait_time_max"], waited)
+
+
+def _engine_options() -> Dict[str, Any]:
+    """Build pool arguments for the configured DB_POOL_MODE."""
+    if settings.DB_POOL_MODE == "null":
+        # PgBouncer transaction pooling: PgBouncer owns the pool, and prepared statements
+        # cannot be cached because consecutive transactions may land on different servers.
+        return {
+            "poolclass": NullPool,
+            "connect_args": {"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+        }
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            # asyncpg's own statement cache and SQLAlchemy's prepared statement cache
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    }
+
+
 # Create the SQLAlchemy asynchronous engine
-# The engine manages the connection pool.
-# Default pool class is QueuePool. We can customize pool_size, max_overflow etc. if needed.
+# The engine manages the connection pool, sized from settings (see DB_POOL_* in core/config.py).
 engine = create_async_engine(
-    settings.DATABASE_URL.unicode_string(), 
-    poolclass=NullPool
-    # pool_size=5,  # Default is 5 - Not applicable for NullPool
-    # max_overflow=10 # Default is 10 - Not applicable for NullPool
+    settings.DATABASE_URL.unicode_string(),
+    **_engine_options()
     # echo=True # Uncomment for debugging SQL queries
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats["connects"] += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats["checkouts"] += 1
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats["checkins"] += 1
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats["invalidations"] += 1
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """Return the pool's configuration, current usage and cumulative counters."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"mode": settings.DB_POOL_MODE, "pool_class": pool.__class__.__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        })
+    status.update(pool_stats)
+    return status
+
+
 # Create an asynchronous session maker
 # expire_on_commit=False prevents attributes from being expired after commit,
 # which is useful in async contexts.
 async_session_maker = async_sessionmaker(
-    bind=engine, 
-    expire_on_commit=False, 
+    bind=engine,
+    expire_on_commit=False,
     class_=AsyncSession
 )
 
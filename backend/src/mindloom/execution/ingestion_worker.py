@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+
+# Import the Redis service for the ingestion queue
+import mindloom.services.redis as redis_service
+
+# Import settings
+from mindloom.core.config import settings
+
+# Import DB setup functions
+from mindloom.db.session import async_session_maker
+from mindloom.app.models.content_bucket import ContentBucketORM
+from mindloom.execution.stream_consumer import StreamConsumerWorker, StreamQueue, run_until_signalled
+from mindloom.services.knowledge_ingestion import KnowledgeIngestionService, request_bucket_ingestion
+from mindloom.services.embedding_cache import embedding_cache
+from mindloom.services.document_parsing import document_parsing_service
+
+logger = logging.getLogger("ingestion_worker")
+
+
+INGESTION_QUEUE = StreamQueue(
+    name="ingestion queue",
+    claim=redis_service.claim_ingestions,
+    reclaim=redis_service.reclaim_stale_ingestions,
+    heartbeat=redis_service.heartbeat_ingestions,
+    delivery_count=redis_service.ingestion_delivery_count,
+    ack=redis_service.ack_ingestion,
+)
+
+
+class IngestionWorker(StreamConsumerWorker):
+    """
+    Long-lived worker that loads Content Bucket documents into their vector stores.
+
+    Claims buckets from the Redis ingestion queue stream (filled on upload, on delete and by
+    the periodic sync) and ingests up to `concurrency` of them at the same time, so agents
+    never load knowledge on the run path. A bucket is synced by one worker at a time, under
+    a Redis lock renewed by the heartbeat. Entries are acknowledged once ingested or failed;
+    entries held by a worker that stops heartbeating are reclaimed after
+    `INGESTION_CLAIM_IDLE_MS`, and dropped after `INGESTION_MAX_DELIVERIES`.
+    """
+    def __init__(self, concurrency: int = settings.INGESTION_CONCURRENCY, consumer_name: str = None):
+        super().__init__(
+            INGESTION_QUEUE,
+            logger,
+            concurrency=concurrency,
+            claim_idle_ms=settings.INGESTION_CLAIM_IDLE_MS,
+            max_deliveries=settings.INGESTION_MAX_DELIVERIES,
+            consumer_name=consumer_name,
+        )
+        self.sync_interval = settings.INGESTION_SYNC_INTERVAL
+        self._locks: Dict[str, str] = {} # Lock key -> token, for the buckets being synced
+
+    async def handle(self, entry_id: str, payload: Dict[str, Any], deliveries: int):
+        """Ingests a single queued bucket."""
+        try:
+            bucket_id = uuid.UUID(str(payload["bucket_id"]))
+        except (KeyError, ValueError, TypeError) as e:
+            logger.error(f"Discarding malformed ingestion payload {payload}: {e}")
+            return
+        try:
+            await self._ingest(bucket_id, payload.get("reason"))
+        except Exception as e:
+            # The next upload or scheduled sync retries the bucket
+            logger.error(f"Ingestion of bucket {bucket_id} failed: {e}", exc_info=True)
+
+    async def _ingest(self, bucket_id: uuid.UUID, reason: Optional[str]):
+        """
+        Syncs a bucket under its ingestion lock, so one bucket is never synced twice at once.
+        A request that finds the bucket locked is left to the lock holder, which queues the
+        bucket again once its sync finishes.
+        """
+        resync_key = redis_service.ingestion_resync_key(bucket_id)
+        # Flag the request before trying the lock, so a holder releasing it in between still sees it
+        await redis_service.set(resync_key, reason or "queued", ex=redis_service.REDIS_KEY_TTL)
+        # Clear the marker, so uploads from now on queue the bucket again
+        await redis_service.delete(redis_service.ingestion_pending_key(bucket_id))
+
+        lock_key = redis_service.ingestion_lock_key(bucket_id)
+        token = uuid.uuid4().hex
+        # The lock outlives a dead worker no longer than its reclaimable queue entry
+        if not await redis_service.acquire_lock(lock_key, token, self.claim_idle_ms):
+            logger.info(f"Bucket {bucket_id}: Sync already in progress; it will run again once that finishes.")
+            return
+        self._locks[lock_key] = token
+        try:
+            # This sync covers every request made so far
+            await redis_service.delete(resync_key)
+            started = time.monotonic()
+            async with async_session_maker() as session:
+                ingested = await KnowledgeIngestionService(session).ingest_bucket(bucket_id)
+            if ingested:
+                logger.info(f"Bucket {bucket_id}: Ingested in {time.monotonic() - started:.1f}s ({reason}).")
+        finally:
+            self._locks.pop(lock_key, None)
+            await redis_service.release_lock(lock_key, token)
+            if await redis_service.delete(resync_key):
+                await request_bucket_ingestion(bucket_id, "resync")
+
+    async def heartbeat(self):
+        """Heartbeats the queue entries in flight and renews the locks of the buckets being synced."""
+        await super().heartbeat()
+        for lock_key, token in list(self._locks.items()):
+            if not await redis_service.renew_lock(lock_key, token, self.claim_idle_ms):
+                logger.warning(f"Lost ingestion lock {lock_key} while syncing; another worker may sync the bucket too.")
+
+    async def drop(self, entry_id: str, payload: Dict[str, Any], deliveries: int):
+        """Drops a bucket that keeps getting redelivered, so the next upload can queue it again."""
+        logger.error(f"Dropping ingestion of bucket {payload.get('bucket_id')} after {deliveries} deliveries.")
+        await redis_service.delete(redis_service.ingestion_pending_key(payload.get("bucket_id")))
+
+    def background_tasks(self):
+        return [self._schedule_syncs()] if self.sync_interval > 0 else []
+
+    async def _schedule_syncs(self):
+        """
+        Queues every S3 bucket once per `INGESTION_SYNC_INTERVAL`, picking up files that reached
+        S3 without going through the upload endpoint, and prunes the embedding cache. Only the
+        worker that takes the schedule key in an interval does so.
+        """
+        while True:
+            try:
+                if await redis_service.set_if_absent(
+                    redis_service.INGESTION_SCHEDULE_KEY, self.consumer_name, ex=self.sync_interval
+                ):
+                    async with async_session_maker() as session:
+                        result = await session.execute(
+                            select(ContentBucketORM.id).where(ContentBucketORM.bucket_type == 'S3')
+                        )
+                        bucket_ids = result.scalars().all()
+                    for bucket_id in bucket_ids:
+                        await request_bucket_ingestion(bucket_id, "scheduled")
+                    logger.info(f"Scheduled sync queued {len(bucket_ids)} bucket(s).")
+                    if settings.EMBEDDING_CACHE_ENABLED:
+                        pruned = await asyncio.to_thread(embedding_cache.prune)
+                        logger.info(f"Pruned {pruned} embedding cache row(s).")
+            except Exception as e:
+                logger.warning(f"Scheduling bucket syncs failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def shutdown(self):
+        await asyncio.to_thread(document_parsing_service.shutdown)
+        embedding_cache.close()
+
+
+async def main():
+    """Entrypoint for the ingestion worker deployment."""
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=sys.stdout,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+    await run_until_signalled(IngestionWorker())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    sys.exit(0)
@@ -0,0 +1,260 @@
+import abc
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import threading
+import traceback
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+# Import the Redis service for publishing logs
+import mindloom.services.redis as redis_service
+from mindloom.app.models.run import LogLevel, RunLogORM
+from mindloom.db.session import async_session_maker
+
+# Records below this level are dropped first when the buffer is saturated
+LOW_PRIORITY_MAX_LEVEL = logging.INFO
+
+
+class BufferedAsyncHandler(logging.Handler, abc.ABC):
+    """
+    Base class for logging handlers that ship records to an async sink in batches.
+
+    `emit` only builds a payload and appends it to a bounded in-memory buffer; a single
+    background flusher task drains the buffer in order, in batches of up to `batch_size`,
+    whenever a batch fills up or every `flush_interval` seconds. When the buffer is full,
+    DEBUG/INFO records are dropped before WARNING and above, and drops are counted per level.
+    Call `aclose()` to stop the flusher and flush everything that is still buffered.
+
+    Subclasses implement `build_payload` and `send_batch`.
+    """
+    def __init__(
+        self,
+        level=logging.NOTSET,
+        max_buffer: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.25,
+    ):
+        super().__init__(level=level)
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Entries are (sequence, payload); sequence numbers restore emit order across both tiers
+        self._low: Deque[Tuple[int, Any]] = deque()
+        self._high: Deque[Tuple[int, Any]] = deque()
+        self._sequence = itertools.count()
+        self._buffer_lock = threading.Lock() # emit can be called from worker threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+        self.dropped: Counter = Counter() # Level name -> records dropped due to a full buffer
+        self.failed = 0 # Records lost because the sink raised
+
+    @abc.abstractmethod
+    def build_payload(self, record: logging.LogRecord) -> Any:
+        """Captures everything needed from the record at emit time. Must be cheap."""
+
+    @abc.abstractmethod
+    async def send_batch(self, payloads: List[Any]) -> None:
+        """Writes one batch of payloads to the sink."""
+
+    def start(self):
+        """Starts the background flusher on the running event loop."""
+        if self._flusher is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._flusher = self._loop.create_task(self._flush_loop())
+
+    def _buffered(self) -> int:
+        return len(self._low) + len(self._high)
+
+    def emit(self, record: logging.LogRecord):
+        """Buffers the record for the flusher; never awaits or does I/O."""
+        try:
+            payload = self.build_payload(record)
+        except Exception:
+            self.handleError(record) # Log internal handler errors safely
+            return
+
+        low_priority = record.levelno <= LOW_PRIORITY_MAX_LEVEL
+        with self._buffer_lock:
+            if self._buffered() >= self.max_buffer:
+                if low_priority or not self._low:
+                    self.dropped[record.levelname] += 1
+                    return
+                # Make room for the more important record by evicting the oldest low-priority one
+                _, evicted = self._low.popleft()
+                self.dropped[self._payload_level(evicted)] += 1
+            entry = (next(self._sequence), payload)
+            (self._low if low_priority else self._high).append(entry)
+            batch_ready = self._buffered() >= self.batch_size
+
+        if batch_ready and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _payload_level(self, payload: Any) -> str:
+        """Level name of a buffered payload, used for drop counters."""
+        return payload.get("level", "UNKNOWN") if isinstance(payload, dict) else "UNKNOWN"
+
+    def _take_batch(self) -> List[Any]:
+        """Removes up to `batch_size` buffered payloads, oldest first across both tiers."""
+        batch = []
+        with self._buffer_lock:
+            while len(batch) < self.batch_size and (self._low or self._high):
+                if not self._high or (self._low and self._low[0][0] < self._high[0][0]):
+                    batch.append(self._low.popleft()[1])
+                else:
+                    batch.append(self._high.popleft()[1])
+        return batch
+
+    async def flush_async(self):
+        """Sends every buffered record to the sink."""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                await self.send_batch(batch)
+            except Exception as e:
+                # Report sink errors on stderr to avoid loops if the logger uses this handler
+                self.failed += len(batch)
+                print(f"{self.__class__.__name__}: failed to send {len(batch)} log records: {e}", file=sys.stderr)
+
+    async def _flush_loop(self):
+        """Flushes whenever a batch is ready or the flush interval elapses."""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush_async()
+
+    async def aclose(self):
+        """Stops the flusher and performs a final flush of everything still buffered."""
+        if self._flusher is not None:
+            # Let the flusher finish its current batch rather than cancelling it mid-send
+            self._closing = True
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush_async()
+        if self.dropped or self.failed:
+            print(
+                f"{self.__class__.__name__}: dropped {dict(self.dropped)} records on a full buffer, "
+                f"{self.failed} failed to send.",
+                file=sys.stderr,
+            )
+        self.close()
+
+
+class RedisPubSubHandler(BufferedAsyncHandler):
+    """
+    A logging handler that publishes log records to a Redis Pub/Sub channel.
+    Records are pipelined to Redis in batches by the background flusher.
+    """
+    def __init__(self, run_id: uuid.UUID, level=logging.NOTSET, **buffer_options: Any):
+        super().__init__(level=level, **buffer_options)
+        self.run_id = run_id
+        self.channel_name = f"run_logs:{self.run_id}"
+        # Assumes redis_service.initialize_async() was called successfully before instantiation.
+
+    def build_payload(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Captures the record as a dictionary; JSON encoding happens in the flusher."""
+        log_data = {
+            "timestamp": record.created, # epoch float
+            "level": record.levelname,
+            "message": record.getMessage(), # Get formatted message
+            "name": record.name,
+            "run_id": str(self.run_id),
+        }
+        # Add exception info if present
+        if record.exc_info:
+            log_data["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+             log_data["stack_info"] = self.formatStack(record.stack_info)
+        return log_data
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Formats the log record into a JSON string."""
+        return json.dumps(self.build_payload(record))
+
+    def formatException(self, exc_info):
+        """
+        Format and return the specified exception information as a string.
+        This is used by the base class's format method when an exception
+        tuple is provided.
+        """
+        # Use traceback module for standard exception formatting
+        return "".join(traceback.format_exception(*exc_info)) if exc_info else ""
+
+    async def send_batch(self, payloads: List[Dict[str, Any]]) -> None:
+        """Publishes a batch of records in a single pipelined round-trip."""
+        if not redis_service.client:
+            raise ConnectionError("Redis client not available for handler")
+        async with redis_service.client.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.publish(self.channel_name, json.dumps(payload, default=str))
+            await pipe.execute()
+
+
+class RunLogDBHandler(BufferedAsyncHandler):
+    """
+    A logging handler that persists log records to the `run_logs` table.
+    Records are written by the background flusher as one multi-row INSERT per batch,
+    so logging never waits on the database.
+    """
+    def __init__(
+        self,
+        run_id: uuid.UUID,
+        level=logging.NOTSET,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        **buffer_options: Any,
+    ):
+        super().__init__(level=level, batch_size=batch_size, flush_interval=flush_interval, **buffer_options)
+        self.run_id = run_id
+
+    def build_payload(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Captures the record as a `run_logs` row; the level name is kept for drop counters."""
+        log_metadata: Dict[str, Any] = {"name": record.name}
+        if record.exc_info:
+            log_metadata["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        if record.stack_info:
+            log_metadata["stack_info"] = self.formatStack(record.stack_info)
+        return {
+            "id": uuid.uuid4(),
+            "run_id": self.run_id,
+            "timestamp": datetime.utcfromtimestamp(record.created),
+            "level": record.levelname,
+            "levelno": record.levelno,
+            "message": record.getMessage(),
+            "log_metadata": log_metadata,
+        }
+
+    @staticmethod
+    def _log_level(levelno: int) -> LogLevel:
+        """Maps a logging level number onto LogLevel; custom levels round down to a standard one."""
+        for level in (logging.CRITICAL, logging.ERROR, logging.WARNING, logging.INFO):
+            if levelno >= level:
+                return LogLevel(logging.getLevelName(level).lower())
+        return LogLevel.DEBUG
+
+    async def send_batch(self, payloads: List[Dict[str, Any]]) -> None:
+        """Inserts a batch of records in a single statement and transaction."""
+        rows = []
+        for payload in payloads:
+            row = dict(payload)
+            row["level"] = self._log_level(row.pop("levelno"))
+            rows.append(row)
+        async with async_session_maker() as session:
+            # SQLAlchemy batches an executemany insert into multi-row INSERT ... VALUES statements
+            await session.execute(insert(RunLogORM), rows)
+            await session.commit()
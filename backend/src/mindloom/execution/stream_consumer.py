@@ -0,0 +1,193 @@
+import abc
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+# Import the Redis service for the queue streams
+import mindloom.services.redis as redis_service
+
+Entry = Tuple[str, Dict[str, Any]] # (stream entry ID, payload)
+
+
+@dataclass(frozen=True)
+class StreamQueue:
+    """The Redis service helpers of one queue stream and its consumer group."""
+    name: str # Used in log messages, e.g. "run queue"
+    claim: Callable[..., Awaitable[List[Entry]]] # (consumer, count, block_ms) -> new entries
+    reclaim: Callable[..., Awaitable[List[Entry]]] # (consumer, min_idle_ms, count) -> stale entries
+    heartbeat: Callable[[str, List[str]], Awaitable[None]] # (consumer, entry IDs)
+    delivery_count: Callable[[str], Awaitable[int]]
+    ack: Callable[[str], Awaitable[None]]
+
+
+class StreamConsumerWorker(abc.ABC):
+    """
+    Long-lived worker that claims entries from a Redis queue stream through a consumer group
+    and handles up to `concurrency` of them at the same time.
+
+    An entry is only claimed once there is a free slot to handle it, and is acknowledged once
+    `handle` returns or raises. Entries in flight are heartbeated; entries held by a worker that
+    stops heartbeating are reclaimed by the others after `claim_idle_ms`, and passed to `drop`
+    instead of `handle` once delivered more than `max_deliveries` times. On `stop`, the worker
+    stops claiming and drains the entries in flight.
+
+    Subclasses implement `handle` and `drop`, and may add `background_tasks` and `shutdown`.
+    """
+    def __init__(
+        self,
+        queue: StreamQueue,
+        logger: logging.Logger,
+        concurrency: int,
+        claim_idle_ms: int,
+        max_deliveries: int,
+        consumer_name: Optional[str] = None,
+        log_extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.queue = queue
+        self.logger = logger
+        self.concurrency = max(1, concurrency)
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.log_extra = log_extra or {}
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._in_flight: Set[str] = set() # Stream entry IDs currently being handled
+        self._stopping = asyncio.Event()
+        self._next_reclaim = 0.0
+
+    @abc.abstractmethod
+    async def handle(self, entry_id: str, payload: Dict[str, Any], deliveries: int) -> None:
+        """Handles one claimed entry; `deliveries` is 0 for a fresh claim. The entry is acknowledged afterwards."""
+
+    @abc.abstractmethod
+    async def drop(self, entry_id: str, payload: Dict[str, Any], deliveries: int) -> None:
+        """Gives up on an entry delivered more than `max_deliveries` times. The entry is acknowledged afterwards."""
+
+    def background_tasks(self) -> List[Coroutine]:
+        """Coroutines to run next to the claim loop, cancelled once it has drained."""
+        return []
+
+    async def shutdown(self) -> None:
+        """Releases the worker's resources after draining, before the Redis connection is closed."""
+
+    def stop(self):
+        """Stops claiming new entries. Entries in flight are allowed to finish."""
+        if not self._stopping.is_set():
+            self.logger.info(f"Shutdown requested, draining in-flight {self.queue.name} entries...", extra=self.log_extra)
+            self._stopping.set()
+
+    async def _ack(self, entry_id: str, log_extra: Optional[Dict[str, Any]] = None):
+        try:
+            await self.queue.ack(entry_id)
+        except Exception as e:
+            self.logger.error(f"Failed to acknowledge {self.queue.name} entry {entry_id}: {e}", extra=log_extra or self.log_extra)
+
+    async def _process(self, entry_id: str, payload: Dict[str, Any], deliveries: int):
+        """Handles an entry, acknowledges it and releases its slot."""
+        try:
+            await self.handle(entry_id, payload, deliveries)
+        except Exception as e:
+            self.logger.error(f"Unexpected error handling {self.queue.name} entry {entry_id}: {e}", exc_info=True, extra=self.log_extra)
+        finally:
+            await self._ack(entry_id)
+            self._in_flight.discard(entry_id)
+            self._slots.release()
+
+    async def _heartbeat(self):
+        """Periodically resets the idle time of in-flight entries so other workers do not reclaim them."""
+        interval = max(self.claim_idle_ms / 3000, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                self.logger.warning(f"{self.queue.name.capitalize()} heartbeat failed: {e}", extra=self.log_extra)
+
+    async def heartbeat(self):
+        """One heartbeat; subclasses extend it to renew whatever else they hold while handling entries."""
+        await self.queue.heartbeat(self.consumer_name, list(self._in_flight))
+
+    async def _claim(self):
+        """
+        Claims one entry: a stale entry from a dead worker if it is time to check, otherwise a new one.
+        Returns ((entry_id, payload) or None, delivery count), where a fresh claim counts as 0.
+        """
+        if time.monotonic() >= self._next_reclaim:
+            self._next_reclaim = time.monotonic() + self.claim_idle_ms / 1000
+            reclaimed = await self.queue.reclaim(self.consumer_name, self.claim_idle_ms, count=1)
+            if reclaimed:
+                # Check again straight away, there may be more left behind
+                self._next_reclaim = 0.0
+                entry_id, _ = reclaimed[0]
+                return reclaimed[0], await self.queue.delivery_count(entry_id)
+        # Keep the block time below the client's socket_timeout
+        claimed = await self.queue.claim(self.consumer_name, count=1, block_ms=1000)
+        return (claimed[0], 0) if claimed else (None, 0)
+
+    async def run(self):
+        """Claims and handles entries until `stop` is called."""
+        await redis_service.initialize_async()
+        background_tasks = [asyncio.create_task(self._heartbeat())]
+        background_tasks.extend(asyncio.create_task(coroutine) for coroutine in self.background_tasks())
+        self.logger.info(
+            f"Worker {self.consumer_name} on the {self.queue.name} started with concurrency {self.concurrency}.",
+            extra=self.log_extra,
+        )
+
+        while not self._stopping.is_set():
+            # Only claim an entry once there is a free slot to handle it
+            await self._slots.acquire()
+            if self._stopping.is_set():
+                self._slots.release()
+                break
+            try:
+                entry, deliveries = await self._claim()
+            except Exception as e:
+                self._slots.release()
+                self.logger.error(f"Error reading from {self.queue.name}: {e}", extra=self.log_extra)
+                await asyncio.sleep(1)
+                continue
+
+            if entry is None:
+                self._slots.release()
+                continue
+
+            entry_id, payload = entry
+            if deliveries > self.max_deliveries:
+                try:
+                    await self.drop(entry_id, payload, deliveries)
+                except Exception as e:
+                    self.logger.error(f"Failed to drop {self.queue.name} entry {entry_id}: {e}", extra=self.log_extra)
+                await self._ack(entry_id)
+                self._slots.release()
+                continue
+
+            self._in_flight.add(entry_id)
+            task = asyncio.create_task(self._process(entry_id, payload, deliveries))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for task in background_tasks:
+            task.cancel()
+        await self.shutdown()
+        await redis_service.close()
+        self.logger.info(f"Worker on the {self.queue.name} stopped.", extra=self.log_extra)
+
+
+async def run_until_signalled(worker: StreamConsumerWorker):
+    """Runs a worker until SIGTERM or SIGINT, then lets it drain."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass # Signal handlers are not available on every platform
+    await worker.run()
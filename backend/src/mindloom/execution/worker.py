@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+# Import the Redis service for the run queue
+import mindloom.services.redis as redis_service
+
+# Import settings
+from mindloom.core.config import settings
+from mindloom.services.llm_clients import llm_client_pool
+
+# Import DB setup functions
+from mindloom.db.session import async_session_maker
+from mindloom.app.models.run import RunORM, RunStatus
+
+# Reuse the executor's logger setup and run logic
+from mindloom.execution.run_executor import execute_run, logger, _normalize_input_data
+from mindloom.execution.stream_consumer import StreamConsumerWorker, StreamQueue, run_until_signalled
+
+WORKER_LOG_EXTRA = {"run_id": "WORKER"}
+
+
+RUN_QUEUE = StreamQueue(
+    name="run queue",
+    claim=redis_service.claim_runs,
+    reclaim=redis_service.reclaim_stale_runs,
+    heartbeat=redis_service.heartbeat_runs,
+    delivery_count=redis_service.run_delivery_count,
+    ack=redis_service.ack_run,
+)
+
+
+class RunWorker(StreamConsumerWorker):
+    """
+    Long-lived executor that claims runs from the Redis run queue stream and executes them in-process.
+
+    Keeps the Python interpreter, imported libraries, DB engine and Redis connection warm
+    between runs, and executes up to `concurrency` runs at the same time. Runs are only
+    acknowledged once finished; runs held by a worker that stops heartbeating are
+    reclaimed by the others after `RUN_QUEUE_CLAIM_IDLE_MS`.
+    """
+    def __init__(self, concurrency: int = settings.EXECUTOR_CONCURRENCY, consumer_name: str = None):
+        super().__init__(
+            RUN_QUEUE,
+            logger,
+            concurrency=concurrency,
+            claim_idle_ms=settings.RUN_QUEUE_CLAIM_IDLE_MS,
+            max_deliveries=settings.RUN_QUEUE_MAX_DELIVERIES,
+            consumer_name=consumer_name,
+            log_extra=WORKER_LOG_EXTRA,
+        )
+
+    async def drop(self, entry_id: str, payload: Dict[str, Any], deliveries: int):
+        """Marks a run that keeps getting redelivered (e.g. crashes its executor) as FAILED."""
+        log_extra = {"run_id": str(payload.get("run_id", "UNKNOWN"))}
+        logger.error(f"Run delivered {deliveries} times without finishing; marking it FAILED.", extra=log_extra)
+        try:
+            async with async_session_maker() as session:
+                run = await session.get(RunORM, uuid.UUID(str(payload["run_id"])))
+                if run and run.status in (RunStatus.PENDING, RunStatus.RUNNING):
+                    run.status = RunStatus.FAILED
+                    run.ended_at = datetime.utcnow()
+                    run.output_data = {"error": f"Run abandoned after {deliveries} delivery attempts."}
+                    session.add(run)
+                    await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to mark undeliverable run as FAILED: {e}", extra=log_extra)
+
+    async def handle(self, entry_id: str, payload: Dict[str, Any], deliveries: int):
+        """Executes a single queued run payload; execute_run records failures on the run itself."""
+        log_extra = {"run_id": str(payload.get("run_id", "UNKNOWN"))}
+        redelivered = deliveries > 0
+        if redelivered:
+            logger.warning(f"Reclaimed run from an unresponsive executor (delivery {deliveries}).", extra=log_extra)
+        try:
+            run_id = uuid.UUID(str(payload["run_id"]))
+            runnable_id = uuid.UUID(str(payload["runnable_id"]))
+            runnable_type = payload["runnable_type"]
+            input_data = _normalize_input_data(payload.get("input_data") or {}, log_extra)
+            await execute_run(run_id, runnable_id, runnable_type, input_data, redelivered=redelivered)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.error(f"Discarding malformed run payload {payload}: {e}", extra=log_extra)
+        except Exception as e:
+            logger.error(f"Unexpected error executing queued run: {e}", exc_info=True, extra=log_extra)
+
+    async def shutdown(self):
+        await llm_client_pool.close()
+
+
+async def main():
+    """Entrypoint for the executor worker deployment."""
+    await run_until_signalled(RunWorker())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    sys.exit(0)
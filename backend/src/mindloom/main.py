@@ -14,8 +14,13 @@ from botocore.exceptions import ClientError, BotoCoreError
 
 # Internal modules
 from mindloom.core.config import settings
-from mindloom.db.session import engine
+from mindloom.db.session import engine, get_pool_status
 from mindloom.services.redis import initialize_async as init_redis, close as close_redis
+from mindloom.services.kubernetes import close as close_kubernetes
+from mindloom.services.pubsub import pubsub_multiplexer
+from mindloom.services.llm_clients import llm_client_pool
+from mindloom.services.document_parsing import document_parsing_service
+from mindloom.tools import tool_registry
 
 # Configure logging basic setup FIRST
 logging.basicConfig(level=logging.INFO, format='%(levelname)-8s %(name)s: %(message)s')
@@ -108,15 +113,38 @@ async def lifespan(app: FastAPI):
         logger.error(f"An error occurred during Alembic migrations: {exc}")
         raise RuntimeError("Alembic migration check failed") from exc
 
+    # 5. Tool registry -------------------------------------------------------
+    # Import toolkits now rather than on the first agent save or run
+    try:
+        await asyncio.to_thread(tool_registry.discover)
+    except Exception as exc:
+        logger.warning("Tool discovery failed: %s", exc)
+
     logger.info("--- Startup Checks Completed --- ")
     yield # Application runs after this point
     # Shutdown Sequence ------------------------------------------------------
     logger.info("--- Application Shutting Down --- ")
+    try:
+        await pubsub_multiplexer.close()
+    except Exception as exc:
+        logger.warning("Failed to close shared Pub/Sub connection gracefully: %s", exc)
     try:
         await close_redis()
         logger.info("Redis connection closed")
     except Exception as exc:
         logger.warning("Failed to close Redis connection gracefully: %s", exc)
+    try:
+        await close_kubernetes()
+    except Exception as exc:
+        logger.warning("Failed to close Kubernetes client gracefully: %s", exc)
+    try:
+        await llm_client_pool.close()
+    except Exception as exc:
+        logger.warning("Failed to close LLM clients gracefully: %s", exc)
+    try:
+        await asyncio.to_thread(document_parsing_service.shutdown)
+    except Exception as exc:
+        logger.warning("Failed to stop document parsing processes gracefully: %s", exc)
     logger.info("--- Shutdown Cleanup Completed --- ")
 
 
@@ -135,6 +163,11 @@ async def health_check():
     """Check the health of the API."""
     return {"status": "ok"}
 
+@app.get("/health/db-pool", tags=["Health"])
+async def db_pool_health():
+    """Report database connection pool usage: checkouts, waits and overflow."""
+    return get_pool_status()
+
 # Include the v1 API router
 app.include_router(api_v1_router, prefix="/api/v1")
 
@@ -1,11 +1,13 @@
 """
 Provides a wrapper around Agno for handling the lifecycle of agents.
 """
+import asyncio
+import copy
 import uuid
-import importlib
-import inspect
 import os
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Dict, Any, Sequence, Tuple
 from textwrap import dedent
 import logging
 from datetime import datetime, timezone
@@ -39,10 +41,12 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import NoResultFound
 from mindloom.app.models.agent import AgentORM, ToolConfig
+from mindloom.app.models.agent_content_bucket import agent_content_bucket_association
 from mindloom.app.models.content_bucket import ContentBucketORM
 from mindloom.app.models.file_metadata import FileMetadataORM
 from mindloom.core.config import settings
 from mindloom.db.session import get_async_db_session
+from mindloom.services.embeddings import wrap_embedder
 from mindloom.services.exceptions import (
     AgentRunError,
     KnowledgeCreationError,
@@ -57,17 +61,129 @@ from mindloom.services.exceptions import (
 
 # Local utils import
 from .utils import camel_to_snake, get_s3_client, load_document_from_file
+from mindloom.services.llm_clients import llm_client_pool
+from mindloom.services.team_graph import AgentSnapshot, ContentBucketSnapshot, TeamGraphLoader
+from mindloom.tools import tool_registry
 
 # Logging (ensure logger is configured, e.g., logging.getLogger(__name__))
 logger = logging.getLogger(__name__)
 
-def _tool_name_to_module_name(tool_class_name: str) -> str:
-    """Converts a tool class name like 'GithubTools' to its module name 'github'."""
-    if tool_class_name.endswith("Tools"): # Standard convention
-        return tool_class_name[:-len("Tools")].lower()
-    # Fallback for names not ending in 'Tools'
-    logger.warning(f"Tool class name '{tool_class_name}' does not end with 'Tools'. Using full lowercase name for module.")
-    return tool_class_name.lower()
+
+# An agent's updated_at plus the (ID, updated_at) of each of its content buckets, by bucket ID
+BlueprintVersion = Tuple[datetime, Tuple[Tuple[uuid.UUID, Optional[datetime]], ...]]
+
+
+def blueprint_version(
+    agent_updated_at: Optional[datetime], buckets: Iterable[Tuple[uuid.UUID, Optional[datetime]]]
+) -> Optional[BlueprintVersion]:
+    """
+    Returns the version a blueprint is cached under. Buckets are part of it because changing a
+    bucket's embedder or vector store, or linking another one, does not touch the agent row.
+    Agents without `updated_at` have no version and are never cached.
+    """
+    if agent_updated_at is None:
+        return None
+    return agent_updated_at, tuple(sorted(buckets, key=lambda bucket: bucket[0]))
+
+
+def snapshot_blueprint_version(agent: AgentSnapshot) -> Optional[BlueprintVersion]:
+    """The blueprint version of a loaded agent snapshot."""
+    return blueprint_version(agent.updated_at, ((bucket.id, bucket.updated_at) for bucket in agent.content_buckets))
+
+
+@dataclass
+class AgentBlueprint:
+    """
+    Everything needed to create an agent, resolved once per agent version.
+
+    Holds the resolved configuration and the components that are safe to reuse between
+    runs: the model template (using the pooled API clients), toolkits and knowledge bases
+    with their embedders and vector stores. `instantiate` binds a new session and gives the
+    agent its own copies of the model and toolkit functions, which Agno binds to the agent.
+    """
+    agent_id: uuid.UUID
+    version: Optional[BlueprintVersion] # Agent and bucket versions the blueprint was built from
+    name: str
+    agent_params: Dict[str, Any]
+    model: Model
+    tools: List[Toolkit] = field(default_factory=list)
+    knowledge_bases: List[AgentKnowledge] = field(default_factory=list)
+
+    def instantiate(self, session_id: uuid.UUID) -> Agent:
+        """Creates a new Agno agent for `session_id` from this blueprint."""
+        # Agno sets per-run tools, functions and response format on the model, so every agent
+        # gets its own shallow copy; the underlying API client object is shared.
+        model = copy.copy(self.model)
+        model.clear()
+        # Agno takes one knowledge base; an agent linked to several buckets searches them all
+        knowledge = self.knowledge_bases[0] if len(self.knowledge_bases) == 1 else None
+        retriever = self.search_knowledge_bases if len(self.knowledge_bases) > 1 else None
+        return Agent(
+            name=self.name,
+            agent_id=str(self.agent_id), # Pass agent_id explicitly
+            session_id=session_id,
+
+            model=model,
+            tools=[copy_toolkit(toolkit) for toolkit in self.tools],
+            knowledge=knowledge,
+            retriever=retriever,
+            # storage=agno_storage, # Temporarily Disabled
+            **self.agent_params,
+        )
+
+    def search_knowledge_bases(self, query: str, num_documents: Optional[int] = None, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        """Agno retriever returning the best `num_documents` matches from each of the agent's knowledge bases."""
+        references = [
+            document.to_dict()
+            for knowledge_base in self.knowledge_bases
+            for document in knowledge_base.search(query=query, num_documents=num_documents)
+        ]
+        return references or None
+
+
+def copy_toolkit(toolkit: Toolkit) -> Toolkit:
+    """
+    Copies a toolkit for one agent. Agno binds a toolkit's functions to the agent using them,
+    so each agent gets its own function objects; the toolkit's clients and settings are shared.
+    """
+    toolkit_copy = copy.copy(toolkit)
+    toolkit_copy.functions = {
+        # Agno also edits a function's parameter schema in place when preparing it for a model
+        name: function.model_copy(update={"parameters": copy.deepcopy(function.parameters)})
+        for name, function in toolkit.functions.items()
+    }
+    return toolkit_copy
+
+
+# Process-wide blueprint cache, most recently used last
+_blueprint_cache: "OrderedDict[uuid.UUID, AgentBlueprint]" = OrderedDict()
+_blueprint_build_locks: Dict[uuid.UUID, asyncio.Lock] = {}
+
+
+def _cache_agent_blueprint(blueprint: AgentBlueprint) -> None:
+    """Stores a blueprint, evicting the least recently used ones beyond AGENT_BLUEPRINT_CACHE_SIZE."""
+    _blueprint_cache[blueprint.agent_id] = blueprint
+    _blueprint_cache.move_to_end(blueprint.agent_id)
+    while len(_blueprint_cache) > settings.AGENT_BLUEPRINT_CACHE_SIZE:
+        evicted_id, _ = _blueprint_cache.popitem(last=False)
+        _blueprint_build_locks.pop(evicted_id, None)
+
+
+def _blueprint_is_current(blueprint: Optional[AgentBlueprint], version: Optional[BlueprintVersion]) -> bool:
+    """True if `blueprint` was built from agent version `version` (agents without one are never cached)."""
+    return blueprint is not None and version is not None and blueprint.version == version
+
+
+def invalidate_agent_blueprint(agent_id: uuid.UUID) -> None:
+    """
+    Drops an agent's cached blueprint in this process.
+
+    Other processes notice the change through the `updated_at` of the agent or its content
+    buckets on their next instantiation (see `blueprint_version`), so callers that change an
+    agent must also make sure `updated_at` moves.
+    """
+    if _blueprint_cache.pop(agent_id, None) is not None:
+        logger.info(f"Agent {agent_id}: Blueprint cache invalidated.")
 
 
 class AgentService:
@@ -87,106 +203,216 @@ class AgentService:
         session_id: uuid.UUID
     ) -> Agent:
         """
-        Fetches config from DB (including linked Content Buckets) and dynamically
-        creates an Agno agent instance with configured model, tools, knowledge bases,
-        and storage.
+        Creates an Agno agent instance bound to `session_id` from the agent's cached blueprint.
+
+        The blueprint (model, tools, knowledge bases) is built from the DB config on first use
+        and reused until the `updated_at` of the agent or one of its content buckets changes, so
+        a run normally costs a single version query instead of reloading and re-instantiating
+        every component.
+        """
+        result = (await self.create_agno_agent_instances([agent_id], session_id))[agent_id]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def create_agno_agent_instances(
+        self,
+        agent_ids: List[uuid.UUID],
+        session_id: uuid.UUID
+    ) -> Dict[uuid.UUID, Any]:
+        """
+        Creates Agno agent instances bound to `session_id` for several agents.
+
+        One query checks every agent's version and the configs of all agents whose blueprint
+        is missing or stale are loaded together by the TeamGraphLoader, so the DB cost stays
+        the same however many agents are requested.
+
+        Returns:
+            A dict mapping each agent ID to its Agent instance, or to the exception that
+            prevented creating it (ValueError if the agent does not exist).
         """
-        async with self.db as session:
+        agent_ids = list(dict.fromkeys(agent_ids)) # De-duplicate, keeping order
+        blueprints: Dict[uuid.UUID, Any] = {} # AgentBlueprint, or the exception that prevented building it
+
+        result = await self.db.execute(
+            select(AgentORM.id, AgentORM.updated_at, ContentBucketORM.id, ContentBucketORM.updated_at)
+            .outerjoin(agent_content_bucket_association, agent_content_bucket_association.c.agent_id == AgentORM.id)
+            .outerjoin(ContentBucketORM, ContentBucketORM.id == agent_content_bucket_association.c.content_bucket_id)
+            .where(AgentORM.id.in_(agent_ids))
+        )
+        agent_versions: Dict[uuid.UUID, Optional[datetime]] = {}
+        bucket_versions: Dict[uuid.UUID, List[Tuple[uuid.UUID, Optional[datetime]]]] = {}
+        for agent_id, agent_updated_at, bucket_id, bucket_updated_at in result.all():
+            agent_versions[agent_id] = agent_updated_at
+            buckets = bucket_versions.setdefault(agent_id, [])
+            if bucket_id is not None:
+                buckets.append((bucket_id, bucket_updated_at))
+        versions = {
+            agent_id: blueprint_version(agent_updated_at, bucket_versions[agent_id])
+            for agent_id, agent_updated_at in agent_versions.items()
+        }
+
+        stale_ids = []
+        for agent_id in agent_ids:
+            if agent_id not in versions:
+                invalidate_agent_blueprint(agent_id)
+                logger.error(f"Agent configuration not found for agent_id: {agent_id}")
+                blueprints[agent_id] = ValueError(f"Agent configuration not found for agent_id: {agent_id}")
+            elif _blueprint_is_current(_blueprint_cache.get(agent_id), versions[agent_id]):
+                _blueprint_cache.move_to_end(agent_id)
+                blueprints[agent_id] = _blueprint_cache[agent_id]
+                logger.debug(f"Agent {agent_id}: Using cached blueprint (version {versions[agent_id]}).")
+            else:
+                stale_ids.append(agent_id)
+
+        if stale_ids:
             try:
-                # Fetch AgentORM with related data eagerly loaded
-                statement = select(AgentORM).where(AgentORM.id == agent_id)
-                statement = statement.options(
-                    selectinload(AgentORM.variables),
-                    selectinload(AgentORM.content_buckets).selectinload(ContentBucketORM.files) # Eager load buckets and their files
-                )
-                result = await session.execute(statement)
-                agent_orm = result.scalars().one() # Use one() for stricter check
-            except NoResultFound:
-                logging.error(f"Agent configuration not found for agent_id: {agent_id}")
-                raise ValueError(f"Agent configuration not found for agent_id: {agent_id}")
+                snapshots = await TeamGraphLoader(self.db).load_agents(stale_ids)
             except Exception as e:
-                logging.error(f"Error fetching agent configuration for {agent_id}: {e}", exc_info=True)
-                raise
+                logger.error(f"Error fetching agent configurations for {stale_ids}: {e}", exc_info=True)
+                snapshots = {}
+                blueprints.update({agent_id: e for agent_id in stale_ids})
+            blueprints.update(await self._resolve_blueprints(list(snapshots.values())))
+            for agent_id in stale_ids:
+                # Deleted between the version check and the load
+                blueprints.setdefault(agent_id, ValueError(f"Agent configuration not found for agent_id: {agent_id}"))
+
+        return self._instantiate_blueprints(agent_ids, blueprints, session_id)
 
-            # --- Transform Tools Config --- #
-            formatted_tool_configs = []
-            if agent_orm.tools and isinstance(agent_orm.tools, list):
-                logger.info(f"Agent {agent_id}: Found {len(agent_orm.tools)} tool configurations.")
-                for tool_data in agent_orm.tools:
-                    if isinstance(tool_data, dict):
-                        tool_name = tool_data.get('name') # e.g., "GithubTools"
-                        tool_params = tool_data.get('config', {}) # Params for the toolkit's __init__
-                        
-                        if not tool_name:
-                            logger.warning(f"Agent {agent_id}: Skipping tool config due to missing 'name': {tool_data}")
-                            continue
-                        
-                        try:
-                            module_name = _tool_name_to_module_name(tool_name)
-                            module_path = f"mindloom.tools.{module_name}"
-                            formatted_tool_configs.append({
-                                'module_path': module_path,
-                                'class_name': tool_name,
-                                'params': tool_params or {} # Ensure params is a dict
-                            })
-                            logger.debug(f"Agent {agent_id}: Prepared tool config - module={module_path}, class={tool_name}")
-                        except Exception as e:
-                             logger.error(f"Agent {agent_id}: Error processing tool config for '{tool_name}': {e}", exc_info=True)
-                    else:
-                        logger.warning(f"Agent {agent_id}: Skipping invalid tool configuration item (not a dict): {tool_data}")
+    async def create_agno_agent_instances_from_snapshots(
+        self,
+        agents: Sequence[AgentSnapshot],
+        session_id: uuid.UUID
+    ) -> Dict[uuid.UUID, Any]:
+        """
+        Creates Agno agent instances bound to `session_id` from already loaded agent snapshots
+        (e.g. the members of a TeamSnapshot), without querying the database.
+
+        Returns:
+            A dict mapping each agent ID to its Agent instance, or to the exception that
+            prevented creating it.
+        """
+        blueprints = await self._resolve_blueprints(agents)
+        return self._instantiate_blueprints([agent.id for agent in agents], blueprints, session_id)
+
+    async def _resolve_blueprints(self, agents: Sequence[AgentSnapshot]) -> Dict[uuid.UUID, Any]:
+        """
+        Returns each agent's blueprint (or the exception raised building it), reusing cached
+        blueprints of the same version and building the others concurrently.
+        """
+        blueprints: Dict[uuid.UUID, Any] = {}
+        stale = []
+        for agent in agents:
+            blueprint = _blueprint_cache.get(agent.id)
+            if _blueprint_is_current(blueprint, snapshot_blueprint_version(agent)):
+                _blueprint_cache.move_to_end(agent.id)
+                blueprints[agent.id] = blueprint
+                logger.debug(f"Agent {agent.id}: Using cached blueprint (version {agent.updated_at}).")
             else:
-                 logger.info(f"Agent {agent_id}: No tools configured or 'tools' field is not a list.")
-            # --- End Transform Tools Config --- #
+                stale.append(agent)
 
-            # --- Instantiate Components --- #
-            agno_model = None
-            agno_tools = []
-            agno_knowledge_bases = []
-            agno_storage = None
+        built = await asyncio.gather(
+            *(self._rebuild_agent_blueprint(agent) for agent in stale),
+            return_exceptions=True,
+        )
+        blueprints.update((agent.id, blueprint) for agent, blueprint in zip(stale, built))
+        return blueprints
 
+    def _instantiate_blueprints(
+        self,
+        agent_ids: Sequence[uuid.UUID],
+        blueprints: Dict[uuid.UUID, Any],
+        session_id: uuid.UUID
+    ) -> Dict[uuid.UUID, Any]:
+        """Instantiates each agent's blueprint for `session_id`, passing failures through."""
+        instances: Dict[uuid.UUID, Any] = {}
+        for agent_id in agent_ids:
+            blueprint = blueprints[agent_id]
+            if isinstance(blueprint, BaseException):
+                instances[agent_id] = blueprint
+                continue
             try:
-                # 1. Language Model
-                agno_model = self._create_model(agent_orm.llm_config)
-
-                # 1b. Agent-level Embedder (removed - embedder is now created within _create_storage if needed)
-                # embedder_instance = self._create_embedder(agent_orm.embedder_config)
-
-                # 2. Tools (using transformed config)
-                agno_tools = self._create_tools(formatted_tool_configs) 
-
-                # 3. Knowledge Bases
-                # _create_knowledge_bases handles its own embedders internally per bucket
-                agno_knowledge_bases = await self._create_knowledge_bases(agent_orm, session)
-
-                # 4. Storage (Temporarily Disabled for Debugging)
-                # logger.info(f"Agent {agent_id}: Creating storage...")
-                # agno_storage = await self._create_storage(
-                #     agent_orm.storage_config,
-                #     agent_id, # Pass agent_id
-                #     session_id, # Pass session_id
-                # )
-                # logger.info(f"Agent {agent_id}: Storage created: {type(agno_storage).__name__ if agno_storage else 'None'}")
-
-                agent_params = agent_orm.agent_config or {}
-
-                agno_agent = Agent(
-                    name=agent_orm.name,
-                    agent_id=str(agent_id), # Pass agent_id explicitly
-                    session_id=session_id,
-
-                    model=agno_model,
-                    #tools=agno_tools,
-                    #knowledge=agno_knowledge_bases,
-                    # storage=agno_storage, # Temporarily Disabled
-                    **agent_params,
-                )
-
+                instances[agent_id] = blueprint.instantiate(session_id)
                 logger.info(f"Agent {agent_id}: Agno Agent instance created successfully.")
-                return agno_agent
-
             except Exception as e:
                 logger.error(f"Failed to create Agno agent instance for {agent_id}: {e}", exc_info=True)
-                raise
+                instances[agent_id] = e
+        return instances
+
+    async def _rebuild_agent_blueprint(self, agent: AgentSnapshot) -> "AgentBlueprint":
+        """Builds and caches the blueprint for a freshly loaded agent config."""
+        # One build per agent at a time; concurrent runs wait for it and reuse the result
+        async with _blueprint_build_locks.setdefault(agent.id, asyncio.Lock()):
+            blueprint = _blueprint_cache.get(agent.id)
+            if _blueprint_is_current(blueprint, snapshot_blueprint_version(agent)):
+                return blueprint
+            blueprint = await self._build_agent_blueprint(agent)
+            if blueprint.version is not None:
+                _cache_agent_blueprint(blueprint)
+            return blueprint
+
+    async def _build_agent_blueprint(self, agent: AgentSnapshot) -> "AgentBlueprint":
+        """
+        Builds the agent's blueprint from its config snapshot (including linked Content Buckets):
+        configured model, tools, knowledge bases and agent parameters.
+        """
+        agent_id = agent.id
+
+        # --- Transform Tools Config --- #
+        formatted_tool_configs = []
+        if agent.tools and isinstance(agent.tools, list):
+            logger.info(f"Agent {agent_id}: Found {len(agent.tools)} tool configurations.")
+            for tool_data in agent.tools:
+                if isinstance(tool_data, dict):
+                    tool_name = tool_data.get('name') # e.g., "GithubTools"
+                    tool_params = tool_data.get('config', {}) # Params for the toolkit's __init__
+                    
+                    if not tool_name:
+                        logger.warning(f"Agent {agent_id}: Skipping tool config due to missing 'name': {tool_data}")
+                        continue
+                    
+                    formatted_tool_configs.append({
+                        'class_name': tool_name,
+                        'params': tool_params or {} # Ensure params is a dict
+                    })
+                else:
+                    logger.warning(f"Agent {agent_id}: Skipping invalid tool configuration item (not a dict): {tool_data}")
+        else:
+             logger.info(f"Agent {agent_id}: No tools configured or 'tools' field is not a list.")
+        # --- End Transform Tools Config --- #
+
+        # --- Instantiate Components --- #
+        try:
+            # 1. Language Model (template; each agent instance gets its own shallow copy,
+            # all sharing the pooled API clients)
+            agno_model = self._create_model(agent.llm_config)
+
+            # 1b. Agent-level Embedder (removed - embedder is now created within _create_storage if needed)
+            # embedder_instance = self._create_embedder(agent.embedder_config)
+
+            # 2. Tools (using transformed config)
+            agno_tools = self._create_tools(formatted_tool_configs) 
+
+            # 3. Knowledge Bases
+            # _create_knowledge_bases handles its own embedders internally per bucket
+            agno_knowledge_bases = await self._create_knowledge_bases(agent)
+
+            # 4. Storage (Temporarily Disabled for Debugging)
+            # Storage is bound to a session_id, so it would be created per instance, not cached.
+        except Exception as e:
+            logger.error(f"Failed to build blueprint for agent {agent_id}: {e}", exc_info=True)
+            raise
+
+        logger.info(f"Agent {agent_id}: Built blueprint (version {agent.updated_at}).")
+        return AgentBlueprint(
+            agent_id=agent_id,
+            version=snapshot_blueprint_version(agent),
+            name=agent.name,
+            agent_params=dict(agent.agent_config or {}),
+            model=agno_model,
+            tools=agno_tools,
+            knowledge_bases=agno_knowledge_bases,
+        )
 
     def _create_model(self, llm_config: Optional[Dict[str, Any]]) -> Optional[Model]: # Updated return type
         """Creates the Agno LLM instance based on llm_config."""
@@ -238,8 +464,16 @@ class AgentService:
             model_params = {k: v for k, v in model_params.items() if v is not None}
 
             try:
+                 # Reuse the process-wide clients (and connections) for this deployment
+                 clients = llm_client_pool.get_clients(
+                     "azure_openai",
+                     api_key=api_key,
+                     endpoint=azure_endpoint,
+                     deployment=deployment_name,
+                     api_version=api_version or AzureOpenAI.api_version, # Agno's default version
+                 )
                  logger.info(f"Instantiating AzureOpenAI model with endpoint: {azure_endpoint}, deployment: {deployment_name}")
-                 return AzureOpenAI(**model_params)
+                 return AzureOpenAI(**model_params, client=clients.client, async_client=clients.async_client)
             except Exception as e:
                  logger.error(f"Failed to instantiate AzureOpenAI model: {e}", exc_info=True)
                  # Wrap instantiation errors
@@ -258,6 +492,12 @@ class AgentService:
             }
 
             try:
+                # Reuse the process-wide clients (and connections) for this API key and base URL
+                clients = llm_client_pool.get_clients(
+                    "openai", api_key=api_key, endpoint=model_params.get("base_url")
+                )
+                model_params.setdefault("client", clients.client)
+                model_params.setdefault("async_client", clients.async_client)
                 return OpenAI(**model_params)
             except Exception as e:
                 logger.error(f"Failed to instantiate OpenAI model: {e}", exc_info=True)
@@ -269,7 +509,7 @@ class AgentService:
             raise ConfigurationError(f"Unsupported LLM provider: {provider}")
 
     def _create_tools(self, tool_configs: Optional[List[Dict[str, Any]]]) -> List[Toolkit]:
-        """Dynamically imports and instantiates Toolkit classes based on names and config from DB."""
+        """Instantiates Toolkit classes from the tool registry based on names and config from DB."""
         tools_list: List[Toolkit] = []
         if not tool_configs:
             logger.info("No tool configurations provided for agent.")
@@ -277,53 +517,25 @@ class AgentService:
 
         for config in tool_configs:
             class_name = config.get("class_name")
-            module_path = config.get("module_path")
             params = config.get("params", {})
 
-            if not class_name or not module_path:
-                logger.warning(f"Skipping tool config due to missing 'class_name' or 'module_path': {config}")
+            if not class_name:
+                logger.warning(f"Skipping tool config due to missing 'class_name': {config}")
                 continue
 
+            # Unknown tools and invalid parameters raise ConfigurationError; agents are
+            # validated against the registry when saved, so this only catches older configs.
+            spec = tool_registry.validate(class_name, params)
             try:
-                logger.info(f"Loading tool: {class_name} from {module_path}")
-                module = importlib.import_module(module_path)
-                tool_class = getattr(module, class_name)
-
-                # --- Validation Step --- #
-                if not inspect.isclass(tool_class) or not issubclass(tool_class, Toolkit):
-                    logger.error(f"Configuration Error: Loaded class '{class_name}' from '{module_path}' is not a subclass of agno.tools.toolkit.Toolkit.")
-                    raise ConfigurationError(f"Tool class '{class_name}' is not a valid Toolkit subclass.")
-                # --- End Validation --- #
-
-                # Instantiate the toolkit with its parameters
-                try:
-                    tool_instance = tool_class(**params)
-                except TypeError as te:
-                    # Catch errors where params don't match the tool's __init__ signature
-                    logger.error(f"Configuration Error instantiating tool '{class_name}': Parameters {list(params.keys())} likely do not match constructor. Error: {te}", exc_info=True)
-                    raise ConfigurationError(f"Invalid parameters provided for tool '{class_name}': {te}") from te
-                except Exception as e:
-                    # Catch other potential instantiation errors
-                    logger.error(f"Error instantiating tool '{class_name}' with params {params}: {e}", exc_info=True)
-                    raise ToolCreationError(f"Failed to instantiate tool '{class_name}' after loading: {e}") from e
-                    
-                tools_list.append(tool_instance)
-                logger.info(f"Successfully instantiated tool: {class_name}")
-
-            except ImportError:
-                logger.error(f"Failed to import module '{module_path}' for tool '{class_name}'. Check module path.")
-                # Optionally re-raise as ToolCreationError or ConfigurationError
-                raise ToolCreationError(f"Could not import module '{module_path}' for tool '{class_name}'.")
-            except AttributeError:
-                logger.error(f"Class '{class_name}' not found in module '{module_path}'. Check class name.")
-                # Optionally re-raise as ToolCreationError or ConfigurationError
-                raise ToolCreationError(f"Class '{class_name}' not found in module '{module_path}'.")
-            except ConfigurationError: # Re-raise validation or TypeError errors
-                 raise
+                tool_instance = spec.create(params)
+            except ConfigurationError:
+                raise
             except Exception as e:
-                logger.error(f"Failed to instantiate tool '{class_name}' from '{module_path}': {e}", exc_info=True)
-                # Optionally re-raise as ToolCreationError
-                raise ToolCreationError(f"Failed to instantiate tool '{class_name}': {e}")
+                logger.error(f"Error instantiating tool '{class_name}' with params {params}: {e}", exc_info=True)
+                raise ToolCreationError(f"Failed to instantiate tool '{class_name}': {e}") from e
+
+            tools_list.append(tool_instance)
+            logger.info(f"Successfully instantiated tool: {class_name}")
 
         return tools_list
 
@@ -349,7 +561,7 @@ class AgentService:
                 if not api_key:
                     logger.warning(f"OpenAI API key env var '{api_key_env_var}' not set or empty for KB embedder. Embedder may fail.")
                     # Proceeding allows for potential global key usage within Agno, but log clearly
-                embedder = OpenAIEmbedder(api_key=api_key, model=model_id, **config_overrides)
+                embedder = OpenAIEmbedder(api_key=api_key, id=model_id, **config_overrides)
             
             elif provider == "AzureOpenAIEmbedder":
                 # Use helper for Azure setup (from settings)
@@ -359,7 +571,7 @@ class AgentService:
                 embedder = AzureOpenAIEmbedder(
                     api_key=azure_config['api_key'],
                     azure_endpoint=azure_config['endpoint'],
-                    deployment_name=model_id, # Azure uses deployment_name for model_id
+                    azure_deployment=model_id, # Azure uses the deployment name for model_id
                     api_version=azure_config['api_version'],
                     **config_overrides
                 )
@@ -379,9 +591,14 @@ class AgentService:
             raise EmbedderCreationError(f"Failed to create KB embedder {provider}: {e}") from e
             
         logger.info(f"Successfully created knowledge base embedder instance: {type(embedder).__name__ if embedder else 'None'}")
-        return embedder
+        return wrap_embedder(embedder)
 
-    def _create_kb_vector_store(self, vector_db_config: Dict[str, Any], bucket_id: uuid.UUID) -> Optional[VectorDb]:
+    def _create_kb_vector_store(
+        self,
+        vector_db_config: Dict[str, Any],
+        bucket_id: uuid.UUID,
+        embedder: Optional[Embedder] = None
+    ) -> Optional[VectorDb]:
         """Creates the Agno VectorDb instance based on knowledge base vector_db_config."""
         if not vector_db_config or not isinstance(vector_db_config, dict):
             logger.warning(f"Knowledge base vector DB config for bucket {bucket_id} is missing or invalid. Cannot create vector store.")
@@ -402,17 +619,17 @@ class AgentService:
                 collection_name = config_overrides.get("collection_name", f"kb_{bucket_id.hex}")
                 
                 if host and port:
-                     vector_store = ChromaDb(collection_name=collection_name, host=host, port=port, **config_overrides)
+                     vector_store = ChromaDb(collection=collection_name, embedder=embedder, host=host, port=port, **config_overrides)
                 else:
-                     vector_store = ChromaDb(collection_name=collection_name, path=path, **config_overrides)
+                     vector_store = ChromaDb(collection=collection_name, embedder=embedder, path=path, **config_overrides)
             
             elif provider == "PgVector":
-                db_url = self.app_settings.DATABASE_URL # Get DB URL from settings
-                if not db_url:
+                if not self.app_settings.DATABASE_URL:
                      raise ConfigurationError("DATABASE_URL setting is not configured. Required for PgVector.")
+                # PgVector uses a synchronous SQLAlchemy engine, so swap the asyncpg driver for psycopg
+                db_url = self.app_settings.DATABASE_URL.unicode_string().replace("+asyncpg", "+psycopg")
                 table_name = config_overrides.get("table_name", f"kb_{bucket_id.hex}") # Unique table per bucket
-                # Ensure embedder dimensions are passed if needed by PgVector constructor (might vary by Agno version)
-                vector_store = PgVector(table_name=table_name, db_url=db_url, **config_overrides)
+                vector_store = PgVector(table_name=table_name, db_url=db_url, embedder=embedder, **config_overrides)
                 logger.info(f"PgVector configured for table '{table_name}'")
             
             # Add other vector store providers here
@@ -434,88 +651,43 @@ class AgentService:
 
     # --- End Knowledge Base Creation Helpers --- #
 
-    async def _create_knowledge_bases(self, agent_orm: AgentORM, db: AsyncSession) -> List[TextKnowledgeBase]:
+    def create_bucket_vector_store(self, bucket: ContentBucketSnapshot) -> Optional[VectorDb]:
         """
-        Dynamically instantiates KnowledgeBase objects for each linked Content Bucket,
-        configures them with embedders and vector stores, and loads content (e.g., from S3).
+        Creates the vector store holding a Content Bucket's embedded documents, configured
+        with the bucket's embedder (used to embed queries, and documents during ingestion).
+        Returns None if the bucket's embedder or vector store config is unusable.
         """
-        logger.info(f"Agent {agent_orm.id}: Starting knowledge base creation for {len(agent_orm.content_buckets)} linked buckets.")
-        created_knowledge_bases: List[TextKnowledgeBase] = []
+        embedder = self._create_kb_embedder(bucket.embedder_config)
+        if not embedder:
+            logger.error(f"Bucket {bucket.id}: Cannot create vector store without an embedder.")
+            return None
+        return self._create_kb_vector_store(bucket.vector_db_config, bucket.id, embedder=embedder)
 
-        if not agent_orm.content_buckets:
-            logger.info(f"Agent {agent_orm.id}: No content buckets linked. No knowledge bases to create.")
-            return []
+    async def _create_knowledge_bases(self, agent: AgentSnapshot) -> List[AgentKnowledge]:
+        """
+        Attaches the vector store of each linked Content Bucket as a knowledge base.
 
-        # Fetch related buckets if not already loaded (depends on relationship loading strategy)
-        # Assuming agent_orm.content_buckets contains loaded ContentBucketORM instances
-        
-        for bucket_orm in agent_orm.content_buckets:
-            bucket_id = bucket_orm.id
-            logger.info(f"Agent {agent_orm.id}: Processing Content Bucket ID: {bucket_id}, Name: '{bucket_orm.name}', Type: '{bucket_orm.bucket_type}'")
+        Documents are loaded into the vector stores by the ingestion worker when files are
+        uploaded (and on a schedule), so this only connects to the stores: no S3 listing,
+        parsing or embedding happens while an agent is being created.
+        """
+        logger.info(f"Agent {agent.id}: Attaching knowledge bases for {len(agent.content_buckets)} linked buckets.")
+        created_knowledge_bases: List[AgentKnowledge] = []
 
-            knowledge_base = None
+        for bucket in agent.content_buckets:
             try:
-                # 1. Create Embedder for this bucket
-                embedder = self._create_kb_embedder(bucket_orm.embedder_config)
-                if not embedder:
-                    logger.error(f"Agent {agent_orm.id}, Bucket {bucket_id}: Skipping KB creation due to failed embedder setup.")
-                    continue # Skip this bucket if embedder fails
-
-                # 2. Create Vector Store for this bucket
-                vector_store = self._create_kb_vector_store(bucket_orm.vector_db_config, bucket_id)
+                vector_store = self.create_bucket_vector_store(bucket)
                 if not vector_store:
-                    logger.error(f"Agent {agent_orm.id}, Bucket {bucket_id}: Skipping KB creation due to failed vector store setup.")
-                    continue # Skip this bucket if vector store fails
-
-                # 3. Instantiate and Load Knowledge Base based on type
-                if bucket_orm.bucket_type == 'S3':
-                    s3_config = bucket_orm.config
-                    if not isinstance(s3_config, dict):
-                        raise ConfigurationError(f"Bucket {bucket_id}: S3 'config' must be a dictionary.")
-                    
-                    bucket_name = s3_config.get('bucket_name')
-                    prefix = s3_config.get('prefix') # Directory path in S3
-                    
-                    if not bucket_name or not prefix:
-                        raise ConfigurationError(f"Bucket {bucket_id}: S3 config missing required keys 'bucket_name' or 'prefix'. Found: {s3_config.keys()}")
-                    
-                    logger.info(f"Agent {agent_orm.id}, Bucket {bucket_id}: Instantiating S3PDFKnowledgeBase for s3://{bucket_name}/{prefix}")
-                    # TODO: Confirm if S3PDFKnowledgeBase requires AWS credentials setup (e.g., boto3) or if Agno handles it.
-                    # Assuming Agno handles credential chain (env vars, config files, IAM roles)
-                    knowledge_base = S3PDFKnowledgeBase(
-                        bucket_name=bucket_name,
-                        key=prefix, # Agno S3PDFKnowledgeBase might use 'key' for prefix
-                        vector_db=vector_store,
-                        embedder=embedder,
-                        # Pass other relevant params from s3_config if needed by S3PDFKnowledgeBase constructor
-                    )
-                    
-                    # Load documents from S3 - Agno handles download, parse, embed, store
-                    logger.info(f"Agent {agent_orm.id}, Bucket {bucket_id}: Calling knowledge_base.load() to sync S3 content.")
-                    # Use recreate=False to avoid reprocessing unchanged files unless specified otherwise
-                    recreate_flag = s3_config.get("recreate_on_load", False) 
-                    knowledge_base.load(recreate=recreate_flag)
-                    logger.info(f"Agent {agent_orm.id}, Bucket {bucket_id}: S3 load process initiated.")
-                
-                # TODO: Add handlers for other bucket_types (e.g., 'Local', 'URL')
-                # elif bucket_orm.bucket_type == 'Local': ...
-                
-                else:
-                    logger.warning(f"Agent {agent_orm.id}, Bucket {bucket_id}: Unsupported bucket_type '{bucket_orm.bucket_type}'. Cannot create knowledge base.")
-
-                if knowledge_base:
-                    created_knowledge_bases.append(knowledge_base)
-                    logger.info(f"Agent {agent_orm.id}, Bucket {bucket_id}: Successfully created and initiated load for Knowledge Base: {type(knowledge_base).__name__}")
-            
+                    logger.error(f"Agent {agent.id}, Bucket {bucket.id}: Skipping knowledge base due to failed vector store setup.")
+                    continue
+                created_knowledge_bases.append(AgentKnowledge(vector_db=vector_store))
+                logger.info(f"Agent {agent.id}, Bucket {bucket.id}: Attached vector store {type(vector_store).__name__}.")
             except (ConfigurationError, EmbedderCreationError, VectorStoreCreationError) as specific_error:
                 # Log specific configuration/creation errors and continue to next bucket
-                logger.error(f"Agent {agent_orm.id}: Failed to create knowledge base for Bucket {bucket_id} due to error: {specific_error}")
+                logger.error(f"Agent {agent.id}: Failed to create knowledge base for Bucket {bucket.id} due to error: {specific_error}")
             except Exception as e:
-                # Catch-all for unexpected errors during KB creation/loading for a specific bucket
-                logger.error(f"Agent {agent_orm.id}: Unexpected error processing Bucket {bucket_id}: {e}", exc_info=True)
-                # Decide whether to continue to next bucket or raise
+                logger.error(f"Agent {agent.id}: Unexpected error processing Bucket {bucket.id}: {e}", exc_info=True)
 
-        logger.info(f"Agent {agent_orm.id}: Finished knowledge base creation. Instantiated {len(created_knowledge_bases)} knowledge bases.")
         return created_knowledge_bases
 
 
@@ -569,7 +741,7 @@ class AgentService:
 
             try:
                  logger.info(f"Instantiating AzureOpenAIEmbedder with endpoint: {azure_endpoint}, deployment: {deployment_name}")
-                 return AzureOpenAIEmbedder(**embedder_params)
+                 return wrap_embedder(AzureOpenAIEmbedder(**embedder_params))
             except Exception as e:
                  logger.error(f"Failed to instantiate AzureOpenAIEmbedder: {e}", exc_info=True)
                  # Wrap instantiation errors
@@ -586,7 +758,7 @@ class AgentService:
             }
 
             try:
-                return OpenAIEmbedder(**embedder_params)
+                return wrap_embedder(OpenAIEmbedder(**embedder_params))
             except Exception as e:
                 logger.error(f"Failed to instantiate OpenAIEmbedder: {e}", exc_info=True)
                 raise KnowledgeCreationError(f"Failed to instantiate OpenAIEmbedder: {e}") from e
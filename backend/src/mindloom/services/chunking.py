@@ -0,0 +1,202 @@
+"""
+Chunking strategies for Content Bucket ingestion.
+
+A bucket picks how its files are split with a `chunking` entry in its config, e.g.
+`{"chunking": {"strategy": "markdown", "chunk_size": 2000, "overlap": 200}}`:
+
+- `fixed`: agno's FixedSizeChunking, `chunk_size` characters cut at whitespace.
+- `recursive`: agno's RecursiveChunking, cut at the last newline or sentence end.
+- `token`: windows of `chunk_size` tokens of the embedding models' tokenizer (cl100k_base,
+  loaded once per process). `tiktoken` is a dependency; where it is not installed, characters
+  approximate tokens.
+- `markdown`: splits at headings outside code fences, merges small sections up to
+  `chunk_size` characters and splits large ones recursively. Chunks record their heading path.
+
+Missing values default to KNOWLEDGE_CHUNKING_STRATEGY, KNOWLEDGE_CHUNK_SIZE (KNOWLEDGE_CHUNK_TOKENS
+for `token`) and KNOWLEDGE_CHUNK_OVERLAP. Chunk IDs derive from the file and the chunk's content
+hash (`knowledge_sync.chunk_document_id`), so unchanged chunks keep their vectors across syncs.
+"""
+import importlib.util
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.document import Document
+from agno.document.chunking.fixed import FixedSizeChunking
+from agno.document.chunking.recursive import RecursiveChunking
+from agno.document.chunking.strategy import ChunkingStrategy
+
+from mindloom.core.config import settings
+from mindloom.services.exceptions import ConfigurationError
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Token counting and splitting use `tiktoken`, with an estimate where it is not installed
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# Characters assumed per token without tiktoken; English averages about 4, so this errs small
+CHARS_PER_TOKEN_ESTIMATE = 3
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = "cl100k_base"):
+    """The tiktoken encoding used by OpenAI's embedding models, loaded once; None without tiktoken."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in a text, or an upper estimate without tiktoken."""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(text) // CHARS_PER_TOKEN_ESTIMATE + 1
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def _check_sizes(chunk_size: int, overlap: int) -> None:
+    if chunk_size <= 0 or overlap < 0 or overlap >= chunk_size:
+        raise ValueError(f"Invalid parameters: need 0 <= overlap ({overlap}) < chunk size ({chunk_size}).")
+
+
+def _make_chunk(document: Document, content: str, number: int, extra: Optional[Dict[str, Any]] = None) -> Document:
+    meta_data = {**document.meta_data, "chunk": number, "chunk_size": len(content), **(extra or {})}
+    return Document(name=document.name, meta_data=meta_data, content=content)
+
+
+class TokenChunking(ChunkingStrategy):
+    """Splits text into windows of `chunk_size` tokens, consecutive windows sharing `overlap` tokens."""
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 0):
+        _check_sizes(chunk_size, overlap)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk(self, document: Document) -> List[Document]:
+        content = self.clean_text(document.content)
+        tokenizer = get_tokenizer()
+        if tokenizer is None:
+            # Approximate the token budget in characters, cutting at natural break points
+            fallback = RecursiveChunking(
+                chunk_size=self.chunk_size * CHARS_PER_TOKEN_ESTIMATE, overlap=self.overlap * CHARS_PER_TOKEN_ESTIMATE
+            )
+            return fallback.chunk(Document(name=document.name, meta_data=document.meta_data, content=content))
+
+        tokens = tokenizer.encode(content, disallowed_special=())
+        chunks: List[Document] = []
+        for start in range(0, len(tokens), self.chunk_size - self.overlap):
+            text = tokenizer.decode(tokens[start:start + self.chunk_size])
+            chunks.append(_make_chunk(document, text, len(chunks) + 1))
+            if start + self.chunk_size >= len(tokens):
+                break
+        return chunks
+
+
+class MarkdownChunking(ChunkingStrategy):
+    """
+    Splits Markdown at headings, packing consecutive small sections into chunks of up to
+    `chunk_size` characters. Sections larger than that are split recursively with `overlap`.
+    Each chunk's `headings` metadata holds the heading path of its first section.
+    """
+
+    def __init__(self, chunk_size: int = 5000, overlap: int = 0):
+        _check_sizes(chunk_size, overlap)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._splitter = RecursiveChunking(chunk_size=chunk_size, overlap=overlap)
+
+    @staticmethod
+    def _sections(text: str) -> List[Tuple[str, str]]:
+        """Returns (heading path, text) per section; headings inside code fences do not count."""
+        sections: List[Tuple[str, str]] = []
+        headings: List[str] = []
+        path = ""
+        lines: List[str] = []
+        in_fence = False
+        for line in text.splitlines(keepends=True):
+            if _FENCE.match(line):
+                in_fence = not in_fence
+            match = None if in_fence else _HEADING.match(line)
+            if match:
+                if "".join(lines).strip():
+                    sections.append((path, "".join(lines)))
+                lines = []
+                headings = headings[:len(match.group(1)) - 1] + [match.group(2)]
+                path = " > ".join(headings)
+            lines.append(line)
+        if "".join(lines).strip():
+            sections.append((path, "".join(lines)))
+        return sections
+
+    def chunk(self, document: Document) -> List[Document]:
+        chunks: List[Document] = []
+
+        def emit(text: str, path: str):
+            chunks.append(_make_chunk(document, text.strip(), len(chunks) + 1, {"headings": path} if path else None))
+
+        pending, pending_path = "", ""
+        for path, text in self._sections(document.content):
+            if len(text) > self.chunk_size:
+                if pending.strip():
+                    emit(pending, pending_path)
+                pending = ""
+                for piece in self._splitter.chunk(Document(content=text)):
+                    emit(piece.content, path)
+            elif pending and len(pending) + len(text) > self.chunk_size:
+                emit(pending, pending_path)
+                pending, pending_path = text, path
+            else:
+                if not pending:
+                    pending_path = path
+                pending += text
+        if pending.strip():
+            emit(pending, pending_path)
+        return chunks
+
+
+CHUNKING_STRATEGIES = {
+    "fixed": FixedSizeChunking,
+    "recursive": RecursiveChunking,
+    "token": TokenChunking,
+    "markdown": MarkdownChunking,
+}
+
+
+def chunking_config(bucket_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Resolves a bucket config's `chunking` entry against the defaults into
+    {"strategy", "chunk_size", "overlap"} (plus "tokenizer" for `token`).
+    Raises ConfigurationError if it is invalid.
+    """
+    raw = (bucket_config or {}).get("chunking") or {}
+    if not isinstance(raw, dict):
+        raise ConfigurationError("Bucket 'chunking' config must be an object.")
+    strategy = raw.get("strategy", settings.KNOWLEDGE_CHUNKING_STRATEGY)
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ConfigurationError(
+            f"Unknown chunking strategy '{strategy}'. Expected one of: {', '.join(CHUNKING_STRATEGIES)}."
+        )
+    default_size = settings.KNOWLEDGE_CHUNK_TOKENS if strategy == "token" else settings.KNOWLEDGE_CHUNK_SIZE
+    try:
+        chunk_size = int(raw.get("chunk_size", default_size))
+        overlap = int(raw.get("overlap", settings.KNOWLEDGE_CHUNK_OVERLAP))
+    except (TypeError, ValueError):
+        raise ConfigurationError("Chunking 'chunk_size' and 'overlap' must be integers.")
+    if chunk_size <= 0 or overlap < 0 or overlap >= chunk_size:
+        raise ConfigurationError(f"Chunking needs 0 <= overlap ({overlap}) < chunk_size ({chunk_size}).")
+    config: Dict[str, Any] = {"strategy": strategy, "chunk_size": chunk_size, "overlap": overlap}
+    if strategy == "token":
+        # Installing tiktoken changes the chunks, so it is part of the configuration
+        config["tokenizer"] = "cl100k_base" if TIKTOKEN_AVAILABLE else "estimate"
+    return config
+
+
+def create_chunking(config: Dict[str, Any]) -> ChunkingStrategy:
+    """Creates the strategy for a config resolved by `chunking_config`."""
+    return CHUNKING_STRATEGIES[config["strategy"]](chunk_size=config["chunk_size"], overlap=config["overlap"])
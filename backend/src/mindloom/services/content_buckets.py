@@ -18,7 +18,9 @@ from mindloom.app.models.content_bucket import (
     ContentBucketUpdate,
 )
 from mindloom.app.models.file_metadata import FileMetadataORM, FileMetadataCreate
+from mindloom.services.chunking import chunking_config
 from mindloom.services.exceptions import ServiceError
+from mindloom.services.knowledge_ingestion import request_bucket_ingestion
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +84,7 @@ class ContentBucketService:
         
         bucket_id = uuid.uuid4()
         bucket_data = bucket_in.model_dump()
+        chunking_config(bucket_data['config']) # Rejects an invalid chunking strategy before saving
 
         if bucket_in.bucket_type == 'S3':
             s3_path = f"buckets/{bucket_id}/"  
@@ -114,6 +117,9 @@ class ContentBucketService:
             logger.warning(f"Update requested for bucket {bucket_id} but no data provided.")
             return db_bucket 
 
+        if 'config' in update_data:
+            chunking_config(update_data['config']) # Rejects an invalid chunking strategy before saving
+
         logger.debug(f"Applying update data to bucket {bucket_id}: {update_data}")
         for key, value in update_data.items():
             setattr(db_bucket, key, value)
@@ -206,12 +212,15 @@ class ContentBucketService:
             await self.db.commit()
             await self.db.refresh(db_metadata)
             logger.info(f"Successfully created FileMetadata {db_metadata.id} for {safe_filename}")
-            return db_metadata
         except Exception as e:
             await self.db.rollback()
             logger.exception(f"Error creating FileMetadata for {safe_filename} after S3 upload: {e}")
             raise ServiceError(f"Database error saving file metadata: {e}") from e
 
+        # Embed the new file in the background; agents only read the bucket's vector store
+        await request_bucket_ingestion(bucket_id, "upload")
+        return db_metadata
+
     async def list_files(self, bucket_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Lists files within the S3 path associated with the content bucket."""
         logger.info(f"Listing files for bucket {bucket_id}")
@@ -296,7 +305,7 @@ class ContentBucketService:
             # Check if it's a 'NoSuchKey' error - often okay during delete, means already gone
             if e.response['Error']['Code'] == 'NoSuchKey':
                 logger.warning(f"S3 delete object skipped for key {s3_key}: Key does not exist.")
-                # Proceed to delete metadata, as the file isn't in S3 anyway
+                # Proceed, as the file isn't in S3 anyway
                 pass 
             else:
                 logger.exception(f"S3 delete object failed for key {s3_key}: {e}")
@@ -305,23 +314,7 @@ class ContentBucketService:
              logger.exception(f"Unexpected error during S3 delete for key {s3_key}: {e}")
              raise ServiceError(f"An unexpected error occurred during S3 deletion: {e}")
 
-        # 2. Delete metadata from DB (best effort - S3 delete already happened or key didn't exist)
-        try:
-            stmt = delete(FileMetadataORM).where(
-                FileMetadataORM.bucket_id == bucket_id,
-                FileMetadataORM.s3_key == s3_key # Match the exact key we attempted to delete
-            )
-            result = await self.db.execute(stmt)
-            await self.db.commit()
-            if result.rowcount > 0:
-                 logger.info(f"Successfully deleted {result.rowcount} FileMetadata record(s) for key {s3_key}")
-            else:
-                 logger.warning(f"No FileMetadata record found for S3 key {s3_key} in bucket {bucket_id} during delete operation.")
-            return True # Return True as the state (file gone from S3) is achieved
-        except Exception as e:
-            await self.db.rollback()
-            # Log error but don't necessarily raise? S3 file is gone/wasn't there.
-            logger.exception(f"Error deleting FileMetadata for key {s3_key} after S3 operation: {e}")
-            # Depending on strictness, could raise or return False.
-            # Returning True because S3 state is correct. Frontend can check metadata if needed.
-            return True
+        # 2. The knowledge sync tombstones the file's metadata and removes its chunks from the
+        # bucket's vector store; deleting the metadata here would orphan those vectors
+        await request_bucket_ingestion(bucket_id, "delete")
+        return True # Return True as the state (file gone from S3) is achieved
@@ -0,0 +1,181 @@
+"""
+Document parsing off the event loop.
+
+Loaders such as PyPDFLoader and the Unstructured loaders are CPU-bound, so
+`DocumentParsingService` parses and chunks files in a pool of KNOWLEDGE_PARSE_WORKERS spawned
+processes, chunking them with the bucket's strategy (see `chunking`). A parse writes the file's chunks to a JSON-lines spool file and callers read them
+back in windows with `read_chunks`, so neither side holds a whole file's chunks.
+
+Each file gets KNOWLEDGE_PARSE_TIMEOUT seconds: the worker interrupts itself with SIGALRM, and
+if it is stuck in native code and has not returned shortly after, the pool is restarted. The
+address space of each worker is capped at KNOWLEDGE_PARSE_MEMORY_MB, so an oversized file fails
+with a MemoryError instead of exhausting the host. Failures raise `DocumentParsingError`; a
+restart also fails the other files the pool was parsing, which the next sync retries.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from agno.document import Document
+
+from mindloom.core.config import settings
+from mindloom.services.chunking import chunking_config, create_chunking
+from mindloom.services.exceptions import DocumentParsingError
+from mindloom.services.utils import iter_document_sections
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+Chunk = Tuple[str, Dict[str, Any]]
+
+# Seconds past the timeout before a worker stuck in native code is killed
+HARD_TIMEOUT_GRACE_SECONDS = 30
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    """Applies the memory limit in each parse process as it starts."""
+    if memory_limit_mb > 0 and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError()
+
+
+def parse_to_spool(
+    path: str,
+    filename: str,
+    metadata: Dict[str, Any],
+    chunking_options: Dict[str, Any],
+    spool_path: str,
+    timeout: int,
+) -> int:
+    """
+    Parses a file section by section, chunking each as it streams in, and writes the
+    (text, metadata) chunks to `spool_path` as JSON lines. Returns the number of chunks.
+    Runs in a parse process.
+    """
+    use_alarm = timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        chunking = create_chunking(chunking_options)
+        count = 0
+        with open(spool_path, "w", encoding="utf-8") as spool:
+            for section in iter_document_sections(path, filename, metadata):
+                document = Document(content=section.page_content, name=filename, meta_data=dict(section.metadata))
+                for chunk in chunking.chunk(document):
+                    spool.write(json.dumps([chunk.content, chunk.meta_data], default=str) + "\n")
+                    count += 1
+        return count
+    except Exception as e:
+        # Loaders often wrap the errors they hit, so look through the chain for a limit
+        cause = e
+        while cause is not None and not isinstance(cause, (TimeoutError, MemoryError)):
+            cause = cause.__cause__
+        if isinstance(cause, TimeoutError):
+            raise DocumentParsingError(f"Parsing {filename} timed out after {timeout}s.") from None
+        if isinstance(cause, MemoryError):
+            raise DocumentParsingError(f"Parsing {filename} exceeded the parse memory limit.") from None
+        raise
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def read_chunks(spool: TextIO, limit: int) -> List[Chunk]:
+    """Reads up to `limit` chunks from an open spool file; fewer means the spool is exhausted."""
+    chunks: List[Chunk] = []
+    for _ in range(limit):
+        line = spool.readline()
+        if not line:
+            break
+        text, metadata = json.loads(line)
+        chunks.append((text, metadata))
+    return chunks
+
+
+class DocumentParsingService:
+    """Parses documents in a process pool with per-file time and memory limits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Returns the process pool, started on first use."""
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the parent runs an event loop and worker threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, settings.KNOWLEDGE_PARSE_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(settings.KNOWLEDGE_PARSE_MEMORY_MB,),
+                )
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Kills the processes of a hung or broken pool; the next parse starts a new one."""
+        with self._lock:
+            if self._executor is not executor:
+                return # Already restarted
+            self._executor = None
+        # A running task cannot be cancelled, so its process is terminated (no public API before 3.14)
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse_to_spool(
+        self,
+        path: str,
+        filename: str,
+        metadata: Dict[str, Any],
+        spool_path: str,
+        chunking_options: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Parses and chunks a local file in the pool, writing its chunks to `spool_path`.
+        `chunking_options` come from `chunking_config` (the defaults if omitted). Returns the
+        number of chunks; raises DocumentParsingError if the file cannot be parsed.
+        """
+        timeout = settings.KNOWLEDGE_PARSE_TIMEOUT
+        chunking_options = chunking_options or chunking_config(None)
+        executor = self._pool()
+        future = executor.submit(parse_to_spool, path, filename, metadata, chunking_options, spool_path, timeout)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout + HARD_TIMEOUT_GRACE_SECONDS if timeout > 0 else None
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Parsing {filename} ignored its {timeout}s timeout; restarting the parse pool.")
+            await asyncio.to_thread(self._restart, executor)
+            raise DocumentParsingError(f"Parsing {filename} timed out after {timeout}s.")
+        except BrokenProcessPool as e:
+            logger.error(f"A parse process died while parsing {filename}; restarting the parse pool.")
+            await asyncio.to_thread(self._restart, executor)
+            raise DocumentParsingError(f"The parse process died while parsing {filename}.") from e
+
+    def shutdown(self) -> None:
+        """Stops the parse processes, if they were started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Create a single instance of the service for the process
+document_parsing_service = DocumentParsingService()
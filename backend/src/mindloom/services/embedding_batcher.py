@@ -0,0 +1,234 @@
+"""
+Request packing, concurrency limits and rate-limit pacing for OpenAI-compatible embedders.
+
+`EmbeddingBatcher` splits texts into requests that stay under the provider's item and token
+limits (EMBEDDING_MAX_BATCH_ITEMS, EMBEDDING_MAX_BATCH_TOKENS) and sends them in parallel,
+with at most EMBEDDING_MAX_CONCURRENCY requests in flight per deployment and process. Each
+deployment has an `AdaptiveRateLimiter`: a token bucket that is off until the first 429 (or
+capped at EMBEDDING_TOKENS_PER_MINUTE), halves its rate on every 429, waits out Retry-After,
+and speeds up again as requests succeed.
+
+Token counts come from `chunking.count_tokens`, which uses `tiktoken` (a dependency). Where it is
+not installed, counts are a conservative estimate and requests are packed below the token limit.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import openai
+from agno.embedder.azure_openai import AzureOpenAIEmbedder
+from agno.embedder.openai import OpenAIEmbedder
+
+from mindloom.core.config import settings
+from mindloom.services.chunking import TIKTOKEN_AVAILABLE, count_tokens
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Slowest pace, in tokens per second, the limiter backs off to
+MIN_TOKENS_PER_SECOND = 100.0
+# Longest wait after a 429 without a Retry-After header
+MAX_BACKOFF_SECONDS = 60.0
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket for one deployment, in tokens per second. Thread-safe; `acquire` blocks.
+
+    Unless `tokens_per_minute` sets a ceiling, requests are not paced until the first 429.
+    The rate then starts at half the throughput of the last minute, halves on every further
+    429 and grows by 5% per successful request, up to the ceiling.
+    """
+
+    def __init__(self, tokens_per_minute: int = 0):
+        self._lock = threading.Lock()
+        self.max_rate: Optional[float] = tokens_per_minute / 60 if tokens_per_minute > 0 else None
+        self.rate: Optional[float] = self.max_rate
+        self._available = 0.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_limits = 0
+        self._sent: Deque[Tuple[float, int]] = deque() # (time, tokens) over the last minute
+
+    def _record(self, now: float, tokens: int) -> None:
+        self._sent.append((now, tokens))
+        while self._sent and self._sent[0][0] < now - 60:
+            self._sent.popleft()
+
+    def acquire(self, tokens: int) -> None:
+        """Waits until a request of `tokens` tokens may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate is None:
+                        self._record(now, tokens)
+                        return
+                    self._available = min(self.rate, self._available + (now - self._updated) * self.rate)
+                    self._updated = now
+                    # A request above one second's allowance waits for a full bucket, then goes into debt
+                    needed = min(tokens, self.rate)
+                    if self._available >= needed:
+                        self._available -= tokens
+                        self._record(now, tokens)
+                        return
+                    wait = (needed - self._available) / self.rate
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._consecutive_limits = 0
+            if self.rate is not None:
+                self.rate = min(self.rate * 1.05, self.max_rate or float("inf"))
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> float:
+        """Slows down after a 429 and pauses all requests. Returns the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is None:
+                observed = sum(tokens for _, tokens in self._sent) / 60
+                self.rate = max(observed / 2, MIN_TOKENS_PER_SECOND)
+            else:
+                self.rate = max(self.rate / 2, MIN_TOKENS_PER_SECOND)
+            self._available = 0.0
+            self._updated = now
+            self._consecutive_limits += 1
+            delay = retry_after if retry_after is not None else min(2 ** (self._consecutive_limits - 1), MAX_BACKOFF_SECONDS)
+            self._paused_until = max(self._paused_until, now + delay)
+            logger.warning(f"Embedding rate limited; pacing at {self.rate * 60:.0f} tokens/min, retrying in {delay:.1f}s.")
+            return delay
+
+
+class _DeploymentLimits:
+    """Concurrency slots and rate limiter shared by all embedders of one deployment."""
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(max(1, settings.EMBEDDING_MAX_CONCURRENCY))
+        self.limiter = AdaptiveRateLimiter(settings.EMBEDDING_TOKENS_PER_MINUTE)
+
+
+_limits: Dict[Tuple[Any, ...], _DeploymentLimits] = {}
+_limits_lock = threading.Lock()
+
+
+def _deployment_limits(embedder: OpenAIEmbedder) -> _DeploymentLimits:
+    """Returns the limits for the embedder's deployment (endpoint, model and credentials)."""
+    endpoint = getattr(embedder, "azure_endpoint", None) or embedder.base_url
+    model = getattr(embedder, "azure_deployment", None) or embedder.id
+    key_hash = hashlib.sha256((embedder.api_key or "").encode()).hexdigest()[:16]
+    key = (type(embedder).__name__, str(endpoint), model, key_hash)
+    with _limits_lock:
+        limits = _limits.get(key)
+        if limits is None:
+            limits = _limits[key] = _DeploymentLimits()
+            if not TIKTOKEN_AVAILABLE:
+                logger.warning(f"tiktoken is not installed; estimating token counts for embedding requests to {model}.")
+        return limits
+
+
+def _retry_after(error: openai.RateLimitError) -> Optional[float]:
+    """Seconds from the Retry-After headers of a 429, if present."""
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class EmbeddingBatcher:
+    """Embeds texts with an OpenAI or Azure OpenAI embedder in packed, paced, parallel requests."""
+
+    def __init__(self, embedder: OpenAIEmbedder):
+        if not isinstance(embedder, (OpenAIEmbedder, AzureOpenAIEmbedder)):
+            raise ValueError(f"EmbeddingBatcher does not support {type(embedder).__name__}.")
+        self.embedder = embedder
+        self.max_items = max(1, settings.EMBEDDING_MAX_BATCH_ITEMS)
+        self.max_tokens = max(1, settings.EMBEDDING_MAX_BATCH_TOKENS)
+        self.max_retries = max(0, settings.EMBEDDING_MAX_RETRIES)
+        self.max_concurrency = max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+        self.limits = _deployment_limits(embedder)
+        self._client = None
+
+    @property
+    def client(self):
+        # Retries of 429s are paced here, so the SDK's own retries are turned off
+        if self._client is None:
+            self._client = self.embedder.client.with_options(max_retries=0)
+        return self._client
+
+    def pack(self, texts: List[str]) -> List[Tuple[List[int], int]]:
+        """Groups text indices into requests within the item and token limits: [(indices, tokens)]."""
+        requests: List[Tuple[List[int], int]] = []
+        indices: List[int] = []
+        tokens = 0
+        for index, text in enumerate(texts):
+            text_tokens = count_tokens(text)
+            if indices and (len(indices) >= self.max_items or tokens + text_tokens > self.max_tokens):
+                requests.append((indices, tokens))
+                indices, tokens = [], 0
+            indices.append(index)
+            tokens += text_tokens
+        if indices:
+            requests.append((indices, tokens))
+        return requests
+
+    def _request_params(self, texts: List[str]) -> Dict[str, Any]:
+        # Same request parameters as the embedders' own single-text requests
+        request_params: Dict[str, Any] = {
+            "input": texts,
+            "model": self.embedder.id,
+            "encoding_format": self.embedder.encoding_format,
+        }
+        if self.embedder.user is not None:
+            request_params["user"] = self.embedder.user
+        if self.embedder.id.startswith("text-embedding-3"):
+            request_params["dimensions"] = self.embedder.dimensions
+        if self.embedder.request_params:
+            request_params.update(self.embedder.request_params)
+        return request_params
+
+    def _send(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """Sends one request, pacing it and retrying it on 429s."""
+        limiter = self.limits.limiter
+        attempt = 0
+        while True:
+            limiter.acquire(tokens)
+            try:
+                with self.limits.slots:
+                    response = self.client.embeddings.create(**self._request_params(texts))
+                break
+            except openai.RateLimitError as e:
+                delay = limiter.on_rate_limited(_retry_after(e))
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+        limiter.on_success()
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts, returning one embedding per text in order."""
+        if not texts:
+            return []
+        requests = self.pack(texts)
+        if len(requests) == 1:
+            results = [self._send(texts, requests[0][1])]
+        else:
+            # Requests queue on the deployment's slots, so this pool only bounds this call's threads
+            with ThreadPoolExecutor(max_workers=min(len(requests), self.max_concurrency)) as pool:
+                results = list(pool.map(
+                    lambda request: self._send([texts[index] for index in request[0]], request[1]), requests
+                ))
+        embeddings: List[List[float]] = [None] * len(texts)
+        for (indices, _), vectors in zip(requests, results):
+            for index, vector in zip(indices, vectors):
+                embeddings[index] = vector
+        return embeddings
@@ -0,0 +1,237 @@
+"""
+Persistent, process-shared cache of embeddings.
+
+Embeddings are keyed by the SHA-256 of the embedded text plus the embedder's identity
+(provider, model and dimensions), so the same chunk is embedded once however many buckets,
+teams or re-uploads contain it. Lookups go to Redis first (entries expire after
+EMBEDDING_CACHE_REDIS_TTL) and then to the `embedding_cache` table, whose hits are copied back
+to Redis. Table rows record when they were last used; `prune` evicts rows unused for
+EMBEDDING_CACHE_TTL_DAYS and then the least recently used beyond EMBEDDING_CACHE_MAX_ROWS.
+
+Both tiers are best effort: a tier that fails is skipped for a minute and lookups count as
+misses, so embedding never fails because of the cache. Embedders call the cache from worker
+threads, so it uses blocking clients.
+"""
+import array
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+from sqlalchemy import create_engine, delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import mindloom.services.redis as redis_service
+from mindloom.app.models.embedding_cache import EmbeddingCacheORM
+from mindloom.core.config import settings
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Seconds a failing tier is skipped before it is tried again
+TIER_RETRY_SECONDS = 60
+# Rows per IN (...) list, well below the Postgres bind parameter limit
+_IN_BATCH_SIZE = 1000
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of an embedded text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_embedding(embedding: Sequence[float]) -> bytes:
+    """Serializes an embedding as a float32 array."""
+    return array.array("f", embedding).tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    values = array.array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """Two-tier (Redis, then Postgres) embedding store with hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._redis = None
+        self._engine = None
+        self._retry_at = {"redis": 0.0, "postgres": 0.0}
+        self._stats = {"hits_redis": 0, "hits_postgres": 0, "misses": 0, "stored": 0, "errors": 0}
+
+    def _available(self, tier: str) -> bool:
+        return time.monotonic() >= self._retry_at[tier]
+
+    def _failed(self, tier: str, error: Exception) -> None:
+        logger.warning(f"Embedding cache {tier} tier failed, skipping it for {TIER_RETRY_SECONDS}s: {error}")
+        self._retry_at[tier] = time.monotonic() + TIER_RETRY_SECONDS
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def _redis_client(self):
+        if self._redis is None:
+            with self._lock:
+                if self._redis is None:
+                    self._redis = redis_service.create_sync_client()
+        return self._redis
+
+    def _pg_engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    # Synchronous engine, like PgVector's, since embedders run in worker threads
+                    db_url = settings.DATABASE_URL.unicode_string().replace("+asyncpg", "+psycopg")
+                    self._engine = create_engine(db_url, pool_size=2, max_overflow=2, pool_pre_ping=True)
+        return self._engine
+
+    @staticmethod
+    def _redis_key(embedder_key: str, hash_: str) -> str:
+        return f"{redis_service.EMBEDDING_CACHE_PREFIX}{embedder_key}:{hash_}"
+
+    def _redis_set(self, embedder_key: str, vectors: Dict[str, List[float]]) -> None:
+        pipe = self._redis_client().pipeline(transaction=False)
+        for hash_, embedding in vectors.items():
+            pipe.set(self._redis_key(embedder_key, hash_), pack_embedding(embedding), ex=settings.EMBEDDING_CACHE_REDIS_TTL)
+        pipe.execute()
+
+    def _count(self, **counts: int) -> None:
+        """Adds to the process's counters and, best effort, to the shared ones in Redis."""
+        counts = {name: count for name, count in counts.items() if count}
+        if not counts:
+            return
+        with self._lock:
+            for name, count in counts.items():
+                self._stats[name] += count
+        if self._available("redis"):
+            try:
+                pipe = self._redis_client().pipeline(transaction=False)
+                for name, count in counts.items():
+                    pipe.hincrby(redis_service.EMBEDDING_CACHE_STATS_KEY, name, count)
+                pipe.execute()
+            except Exception as e:
+                self._failed("redis", e)
+
+    def get_many(self, embedder_key: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Returns the cached embeddings among `hashes`, keyed by hash."""
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        if self._available("redis"):
+            try:
+                values = self._redis_client().mget([self._redis_key(embedder_key, hash_) for hash_ in hashes])
+                found = {hash_: unpack_embedding(value) for hash_, value in zip(hashes, values) if value is not None}
+            except Exception as e:
+                self._failed("redis", e)
+        redis_hits = len(found)
+
+        missing = [hash_ for hash_ in hashes if hash_ not in found]
+        postgres_hits: Dict[str, List[float]] = {}
+        if missing and self._available("postgres"):
+            try:
+                with self._pg_engine().begin() as conn:
+                    for start in range(0, len(missing), _IN_BATCH_SIZE):
+                        batch = missing[start:start + _IN_BATCH_SIZE]
+                        rows = conn.execute(
+                            select(EmbeddingCacheORM.text_hash, EmbeddingCacheORM.embedding).where(
+                                EmbeddingCacheORM.embedder_key == embedder_key,
+                                EmbeddingCacheORM.text_hash.in_(batch),
+                            )
+                        ).all()
+                        postgres_hits.update({hash_: unpack_embedding(data) for hash_, data in rows})
+                    if postgres_hits:
+                        # Only table hits refresh the LRU clock; Redis absorbs the hot keys
+                        hit_hashes = list(postgres_hits)
+                        for start in range(0, len(hit_hashes), _IN_BATCH_SIZE):
+                            conn.execute(
+                                update(EmbeddingCacheORM)
+                                .where(
+                                    EmbeddingCacheORM.embedder_key == embedder_key,
+                                    EmbeddingCacheORM.text_hash.in_(hit_hashes[start:start + _IN_BATCH_SIZE]),
+                                )
+                                .values(last_used_at=datetime.utcnow())
+                            )
+            except Exception as e:
+                self._failed("postgres", e)
+        if postgres_hits:
+            found.update(postgres_hits)
+            if self._available("redis"):
+                try:
+                    self._redis_set(embedder_key, postgres_hits)
+                except Exception as e:
+                    self._failed("redis", e)
+
+        self._count(hits_redis=redis_hits, hits_postgres=len(postgres_hits), misses=len(hashes) - len(found))
+        return found
+
+    def put_many(self, embedder_key: str, vectors: Dict[str, List[float]]) -> None:
+        """Stores freshly computed embeddings, keyed by text hash, in both tiers."""
+        if not vectors:
+            return
+        if self._available("redis"):
+            try:
+                self._redis_set(embedder_key, vectors)
+            except Exception as e:
+                self._failed("redis", e)
+        if self._available("postgres"):
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "embedder_key": embedder_key,
+                    "text_hash": hash_,
+                    "embedding": pack_embedding(embedding),
+                    "dimensions": len(embedding),
+                    "created_at": now,
+                    "last_used_at": now,
+                }
+                for hash_, embedding in vectors.items()
+            ]
+            try:
+                with self._pg_engine().begin() as conn:
+                    for start in range(0, len(rows), _IN_BATCH_SIZE):
+                        conn.execute(pg_insert(EmbeddingCacheORM).on_conflict_do_nothing(), rows[start:start + _IN_BATCH_SIZE])
+            except Exception as e:
+                self._failed("postgres", e)
+        self._count(stored=len(vectors))
+
+    def prune(self) -> int:
+        """
+        Evicts table rows unused for EMBEDDING_CACHE_TTL_DAYS, then the least recently used
+        rows beyond EMBEDDING_CACHE_MAX_ROWS. Returns the number of rows removed.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=settings.EMBEDDING_CACHE_TTL_DAYS)
+        with self._pg_engine().begin() as conn:
+            removed = conn.execute(delete(EmbeddingCacheORM).where(EmbeddingCacheORM.last_used_at < cutoff)).rowcount
+            overflow = conn.execute(select(func.count()).select_from(EmbeddingCacheORM)).scalar_one() - settings.EMBEDDING_CACHE_MAX_ROWS
+            if overflow > 0:
+                oldest = (
+                    select(EmbeddingCacheORM.embedder_key, EmbeddingCacheORM.text_hash)
+                    .order_by(EmbeddingCacheORM.last_used_at)
+                    .limit(overflow)
+                )
+                removed += conn.execute(
+                    delete(EmbeddingCacheORM).where(
+                        tuple_(EmbeddingCacheORM.embedder_key, EmbeddingCacheORM.text_hash).in_(oldest)
+                    )
+                ).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Return this process's hit/miss counters for monitoring."""
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        """Closes the cache's Redis and database connections."""
+        with self._lock:
+            redis_client, self._redis = self._redis, None
+            engine, self._engine = self._engine, None
+        if redis_client is not None:
+            redis_client.close()
+        if engine is not None:
+            engine.dispose()
+
+
+# Create a single instance of the cache for the process
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,166 @@
+"""
+Batched and cached embedding.
+
+Agno's vector stores embed documents one request at a time while writing them. Ingestion
+instead embeds chunks in batches with `embed_texts` and hands the vectors to the store through
+`PrecomputedEmbedder`, so writing a batch of N chunks costs one embedding request, not N.
+
+Every embedder the services create goes through `wrap_embedder`: OpenAI-compatible embedders
+are wrapped in `BatchedEmbedder`, which packs, paces and retries their requests (see
+`embedding_batcher`), and the result in `CachedEmbedder`, which serves texts embedded before
+from the shared embedding cache.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.embedder.azure_openai import AzureOpenAIEmbedder
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+
+from mindloom.core.config import settings
+from mindloom.services.embedding_batcher import EmbeddingBatcher
+from mindloom.services.embedding_cache import embedding_cache, text_hash
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+Embedding = Tuple[List[float], Optional[Dict[str, Any]]]
+
+
+def embed_texts(embedder: Embedder, texts: List[str]) -> List[Embedding]:
+    """
+    Embeds several texts, in as few requests as the provider's limits allow for OpenAI-compatible
+    embedders. Returns an (embedding, usage) pair per text, in order; batched requests report no
+    per-text usage.
+    """
+    if not texts:
+        return []
+    if isinstance(embedder, (CachedEmbedder, BatchedEmbedder)):
+        return embedder.embed_batch(texts)
+    if isinstance(embedder, (OpenAIEmbedder, AzureOpenAIEmbedder)):
+        return [(embedding, None) for embedding in EmbeddingBatcher(embedder).embed(texts)]
+    return [embedder.get_embedding_and_usage(text) for text in texts]
+
+
+@dataclass
+class PrecomputedEmbedder(Embedder):
+    """
+    Embedder handed to a vector store while ingesting: returns the vectors registered with
+    `add` for the texts being written, and falls back to `embedder` for anything else
+    (e.g. search queries).
+    """
+    embedder: Optional[Embedder] = None
+    _embeddings: Dict[str, Embedding] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        if self.embedder is not None:
+            self.dimensions = self.embedder.dimensions
+
+    def add(self, text: str, embedding: Embedding) -> None:
+        self._embeddings[text] = embedding
+
+    def discard(self, texts: List[str]) -> None:
+        """Forgets the vectors of texts once they are written (or their write failed)."""
+        for text in texts:
+            self._embeddings.pop(text, None)
+
+    def get_embedding_and_usage(self, text: str) -> Embedding:
+        embedding = self._embeddings.get(text)
+        if embedding is not None:
+            return embedding
+        if self.embedder is None:
+            raise ValueError("No precomputed embedding for text and no fallback embedder configured.")
+        return self.embedder.get_embedding_and_usage(text)
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+
+def embedder_identity(embedder: Embedder) -> str:
+    """
+    Provider, model, dimensions and endpoint of an embedder: the texts it embeds map to the same vectors.
+    The endpoint is included because Azure deployment names are only unique within one resource.
+    """
+    while isinstance(getattr(embedder, "embedder", None), Embedder):
+        embedder = embedder.embedder # Look through wrappers
+    model = getattr(embedder, "azure_deployment", None) or getattr(embedder, "id", None)
+    identity = f"{type(embedder).__name__}:{model}:{embedder.dimensions}"
+    endpoint = getattr(embedder, "azure_endpoint", None) or getattr(embedder, "base_url", None)
+    return f"{identity}@{str(endpoint).rstrip('/')}" if endpoint else identity
+
+
+@dataclass
+class BatchedEmbedder(Embedder):
+    """
+    Sends an OpenAI or Azure OpenAI embedder's requests through an `EmbeddingBatcher`, so that
+    batches respect the provider's limits and every request, single texts included, shares the
+    deployment's concurrency limit and rate-limit pacing.
+    """
+    embedder: Optional[Embedder] = None
+    _batcher: Optional[EmbeddingBatcher] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("BatchedEmbedder needs an embedder to wrap.")
+        self.dimensions = self.embedder.dimensions
+        self._batcher = EmbeddingBatcher(self.embedder)
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        return [(embedding, None) for embedding in self._batcher.embed(texts)]
+
+    def get_embedding_and_usage(self, text: str) -> Embedding:
+        return self._batcher.embed([text])[0], None
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Serves embeddings from the shared embedding cache, embedding only texts it has not seen."""
+    embedder: Optional[Embedder] = None
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("CachedEmbedder needs an embedder to wrap.")
+        self.dimensions = self.embedder.dimensions
+        self.cache_key = embedder_identity(self.embedder)
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        """Embeds several texts, requesting only the cache misses (in one batch)."""
+        hashes = [text_hash(text) for text in texts]
+        found = embedding_cache.get_many(self.cache_key, hashes)
+        missing = {hash_: text for hash_, text in zip(hashes, texts) if hash_ not in found}
+        if missing:
+            computed = embed_texts(self.embedder, list(missing.values()))
+            new_vectors = {hash_: embedding for hash_, (embedding, _) in zip(missing, computed)}
+            embedding_cache.put_many(self.cache_key, new_vectors)
+            found.update(new_vectors)
+        return [(found[hash_], None) for hash_ in hashes]
+
+    def get_embedding_and_usage(self, text: str) -> Embedding:
+        hash_ = text_hash(text)
+        cached = embedding_cache.get_many(self.cache_key, [hash_]).get(hash_)
+        if cached is not None:
+            return cached, None
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        embedding_cache.put_many(self.cache_key, {hash_: embedding})
+        return embedding, usage
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+
+def with_embedding_cache(embedder: Optional[Embedder]) -> Optional[Embedder]:
+    """Wraps an embedder in `CachedEmbedder` unless EMBEDDING_CACHE_ENABLED is off."""
+    if embedder is None or not settings.EMBEDDING_CACHE_ENABLED or isinstance(embedder, CachedEmbedder):
+        return embedder
+    return CachedEmbedder(embedder=embedder)
+
+
+def wrap_embedder(embedder: Optional[Embedder]) -> Optional[Embedder]:
+    """Wraps an embedder created by the services: batched if OpenAI-compatible, then cached."""
+    if isinstance(embedder, (OpenAIEmbedder, AzureOpenAIEmbedder)):
+        embedder = BatchedEmbedder(embedder=embedder)
+    return with_embedding_cache(embedder)
@@ -51,3 +51,11 @@ class StorageCreationError(ServiceError):
 class RunCancelledException(ServiceError):
     """Raised when a run is cancelled."""
     pass
+
+class JobSubmissionError(ServiceError):
+    """Raised when a Kubernetes Job cannot be submitted."""
+    pass
+
+class DocumentParsingError(ServiceError):
+    """Raised when a document cannot be parsed within its time and memory limits."""
+    pass
@@ -0,0 +1,111 @@
+"""
+Background ingestion of Content Bucket documents into their vector stores.
+
+Agents only attach a bucket's vector store when they are created; loading the documents
+(listing S3, downloading, parsing and embedding) happens here instead, driven by the
+`ingestion_queue` Redis stream. Buckets are queued when a file is uploaded or deleted and
+periodically by the ingestion worker (`mindloom.execution.ingestion_worker`), which holds a
+per-bucket lock for the whole of `ingest_bucket`, so a bucket is never synced twice at once.
+
+Setting `recreate_on_load` in a bucket's config requests one full rebuild: the next ingestion
+re-embeds every file and then clears the flag, and later ingestions are incremental again.
+"""
+import logging
+import uuid
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import mindloom.services.redis as redis_service
+from mindloom.app.models.content_bucket import ContentBucketORM
+from mindloom.services.agents import AgentService
+from mindloom.services.exceptions import ConfigurationError, KnowledgeCreationError
+from mindloom.services.knowledge_sync import BucketSyncEngine
+from mindloom.services.team_graph import TeamGraphLoader
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+
+async def request_bucket_ingestion(bucket_id: uuid.UUID, reason: str) -> bool:
+    """
+    Queues a bucket for ingestion. Best effort: a failure is logged and the bucket is picked
+    up by the next scheduled sync instead. Returns True if the bucket was newly queued.
+    """
+    try:
+        entry_id = await redis_service.enqueue_ingestion(bucket_id, reason)
+    except Exception as e:
+        logger.warning(f"Bucket {bucket_id}: Could not queue ingestion ({reason}): {e}")
+        return False
+    if entry_id is None:
+        logger.debug(f"Bucket {bucket_id}: Ingestion already queued.")
+        return False
+    logger.info(f"Bucket {bucket_id}: Queued for ingestion ({reason}).")
+    return True
+
+
+class KnowledgeIngestionService:
+    """Loads the documents of a Content Bucket into the bucket's vector store."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # Embedder and vector store construction is shared with agent instantiation, so
+        # agents query the same store (and embedding model) that ingestion writes to
+        self.agent_service = AgentService(db=db)
+
+    async def ingest_bucket(self, bucket_id: uuid.UUID) -> bool:
+        """
+        Syncs a bucket's vector store with its source files. Only files that changed since the
+        last sync are downloaded, and only their new chunks are embedded (see `BucketSyncEngine`).
+        A `recreate_on_load` flag in the bucket's config forces one full rebuild and is cleared after it.
+
+        Returns False if the bucket no longer exists.
+
+        Raises:
+            KnowledgeCreationError: If the bucket's vector store or source cannot be set up or synced.
+        """
+        buckets = await TeamGraphLoader(self.db).load_buckets([bucket_id])
+        bucket = buckets.get(bucket_id)
+        if bucket is None:
+            logger.warning(f"Bucket {bucket_id}: Not found; nothing to ingest.")
+            return False
+
+        try:
+            if bucket.bucket_type != 'S3':
+                raise ConfigurationError(f"Bucket {bucket.id}: Unsupported bucket_type '{bucket.bucket_type}' for ingestion.")
+            vector_store = self.agent_service.create_bucket_vector_store(bucket)
+            if not vector_store:
+                raise KnowledgeCreationError(f"Bucket {bucket_id}: Vector store could not be created.")
+        except KnowledgeCreationError:
+            raise
+        except Exception as e:
+            raise KnowledgeCreationError(f"Bucket {bucket_id}: Failed to set up ingestion: {e}") from e
+
+        force = bool((bucket.config or {}).get("recreate_on_load", False))
+        logger.info(f"Bucket {bucket_id}: Syncing documents into {type(vector_store).__name__} (force={force}).")
+        try:
+            await BucketSyncEngine(self.db, vector_store).sync(bucket, force=force)
+        except Exception as e:
+            raise KnowledgeCreationError(f"Bucket {bucket_id}: Ingestion failed: {e}") from e
+        if force:
+            await self._clear_recreate_on_load(bucket_id)
+        logger.info(f"Bucket {bucket_id}: Ingestion finished.")
+        return True
+
+    async def _clear_recreate_on_load(self, bucket_id: uuid.UUID) -> None:
+        """Removes the one-shot rebuild flag from a bucket's config once the rebuild has run."""
+        try:
+            # Removed in the database, so a config edited during the sync is kept; updated_at is
+            # left alone because the bucket's settings did not change
+            await self.db.execute(
+                update(ContentBucketORM)
+                .where(ContentBucketORM.id == bucket_id)
+                .values(
+                    config=ContentBucketORM.config.op("-")("recreate_on_load"),
+                    updated_at=ContentBucketORM.updated_at,
+                )
+            )
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.warning(f"Bucket {bucket_id}: Could not clear recreate_on_load; the next sync rebuilds again: {e}")
@@ -0,0 +1,682 @@
+"""
+Incremental sync of a Content Bucket's S3 files into the bucket's vector store.
+
+`BucketSyncEngine` keeps per-file content hashes (`file_metadata.content_hash`) and per-chunk
+hashes (`knowledge_chunks`), so a sync only does work proportional to what changed:
+
+- Files whose S3 ETag matches the last sync are not downloaded at all.
+- Files that are downloaded but hash the same only have their ETag refreshed.
+- Changed files are re-chunked, and only chunks whose hash is new are embedded; chunks that
+  disappeared are deleted from the vector store by ID.
+- Files gone from S3 are tombstoned in bulk, together with their chunks.
+
+A bucket's watermark and counters are recorded in `bucket_sync_state`. When the bucket's
+embedder, vector store or chunking configuration (see `chunking`) change, the whole bucket is re-embedded.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, TextIO, Tuple
+
+from agno.document import Document
+from agno.vectordb.base import VectorDb
+from agno.vectordb.chroma import ChromaDb
+from agno.vectordb.pgvector import PgVector
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from mindloom.app.models.file_metadata import FileMetadataORM
+from mindloom.app.models.knowledge_sync import BucketSyncStateORM, KnowledgeChunkORM
+from mindloom.core.config import settings
+from mindloom.services.chunking import chunking_config
+from mindloom.services.document_parsing import document_parsing_service, read_chunks
+from mindloom.services.embeddings import PrecomputedEmbedder, embed_texts
+from mindloom.services.exceptions import ConfigurationError
+from mindloom.services.team_graph import ContentBucketSnapshot
+from mindloom.services.utils import get_s3_client
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSED = "processed"
+STATUS_ERROR = "error"
+STATUS_DELETED = "deleted_from_s3"
+
+# Rows per IN (...) list, well below the Postgres bind parameter limit
+_IN_BATCH_SIZE = 1000
+
+# Finished files per commit, so the DB keeps up with what is already in the vector store
+_COMMIT_FILE_COUNT = 100
+
+
+@dataclass(frozen=True)
+class S3Object:
+    """An object listed under a bucket's S3 prefix."""
+    key: str
+    etag: str
+    size: int
+    last_modified: datetime
+
+
+@dataclass(frozen=True)
+class ExistingChunk:
+    """A chunk already stored in the vector store for a file."""
+    row_id: uuid.UUID
+    content_hash: str
+    vector_doc_id: str
+
+
+@dataclass
+class _FileWork:
+    """A file moving through the sync pipeline."""
+    file_row: FileMetadataORM
+    s3_object: S3Object
+    existing_chunks: Dict[str, ExistingChunk]
+    content_hash: Optional[str] = None
+    local_dir: Optional[str] = None
+    unchanged: bool = False
+    spool: Optional[TextIO] = None # Parsed chunks, read back in windows
+    next_index: int = 0 # Index of the next chunk read from the spool
+    current_hashes: Set[str] = field(default_factory=set)
+    streamed: bool = False # All chunks were read from the spool
+    new_chunks: List[Tuple[int, str, str]] = field(default_factory=list) # (chunk_index, content_hash, vector_doc_id)
+    removed_chunks: List[ExistingChunk] = field(default_factory=list)
+    unwritten: int = 0 # New chunks read but not yet written to the vector store
+    error: Optional[str] = None
+
+
+@dataclass
+class SyncReport:
+    """Counters of one bucket sync."""
+    files_seen: int = 0
+    files_changed: int = 0
+    files_deleted: int = 0
+    chunks_embedded: int = 0
+    chunks_deleted: int = 0
+    files_failed: int = 0
+
+
+def bucket_s3_location(bucket: ContentBucketSnapshot) -> Tuple[str, str]:
+    """Returns the (bucket name, key prefix) holding a Content Bucket's files."""
+    config = bucket.config or {}
+    # Buckets created through the API keep their files under `s3_path` in S3_BUCKET_NAME
+    bucket_name = config.get('bucket_name') or settings.S3_BUCKET_NAME
+    prefix = config.get('prefix') or config.get('s3_path')
+    if not bucket_name or not prefix:
+        raise ConfigurationError(
+            f"Bucket {bucket.id}: S3 config needs 'bucket_name' (or S3_BUCKET_NAME) and 'prefix' or 's3_path'."
+        )
+    if not prefix.endswith('/'):
+        prefix += '/'
+    return bucket_name, prefix
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_document_id(file_id: uuid.UUID, content_hash: str) -> str:
+    """Deterministic vector store ID of a chunk, so re-inserting a chunk overwrites it."""
+    return f"{file_id.hex}-{content_hash[:32]}"
+
+
+def delete_vector_documents(vector_store: VectorDb, doc_ids: Sequence[str]) -> None:
+    """
+    Deletes documents from a vector store by ID. Agno's VectorDb only deletes whole
+    collections, so this goes to the underlying table or collection.
+    """
+    if not doc_ids:
+        return
+    doc_ids = list(doc_ids)
+    if isinstance(vector_store, PgVector):
+        table = vector_store.table
+        with vector_store.Session() as sess, sess.begin():
+            for start in range(0, len(doc_ids), _IN_BATCH_SIZE):
+                sess.execute(delete(table).where(table.c.id.in_(doc_ids[start:start + _IN_BATCH_SIZE])))
+    elif isinstance(vector_store, ChromaDb):
+        collection = vector_store.client.get_collection(name=vector_store.collection_name)
+        collection.delete(ids=doc_ids)
+    else:
+        raise ConfigurationError(f"Deleting documents by ID is not supported for {type(vector_store).__name__}.")
+
+
+class BucketSyncEngine:
+    """
+    Brings a Content Bucket's vector store in line with the files in its S3 prefix.
+
+    The engine takes over the vector store it is given: its embedder is replaced by a
+    `PrecomputedEmbedder`, so use a store created for the sync.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        vector_store: VectorDb,
+        s3_client=None,
+        concurrency: int = settings.KNOWLEDGE_SYNC_CONCURRENCY,
+    ):
+        self.db = db
+        self.vector_store = vector_store
+        self.s3_client = s3_client
+        self.concurrency = max(1, concurrency)
+        self.chunking: Dict[str, Any] = chunking_config(None) # The bucket's, once a sync starts
+        self.batch_size = max(1, settings.KNOWLEDGE_EMBED_BATCH_SIZE)
+        self.write_concurrency = max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+        # The engine embeds chunks in batches and the store writes the precomputed vectors
+        self.embedder = vector_store.embedder
+        self.precomputed = PrecomputedEmbedder(embedder=self.embedder)
+        vector_store.embedder = self.precomputed
+        self._report = SyncReport()
+        self._chunk_rows: List[Dict[str, Any]] = []
+        self._removed_chunk_ids: List[uuid.UUID] = []
+        self._files_recorded = 0 # Files recorded since the last commit
+
+    def _config_hash(self, bucket: ContentBucketSnapshot) -> str:
+        """Fingerprint of everything that changes a chunk's vectors other than its text."""
+        fingerprint = {
+            "embedder": bucket.embedder_config,
+            "vector_db": bucket.vector_db_config,
+            "chunk_size": self.chunking["chunk_size"],
+            "chunk_overlap": self.chunking["overlap"],
+        }
+        # Other strategies extend the fingerprint, so buckets on the default keep their vectors
+        if self.chunking["strategy"] != "fixed":
+            fingerprint["chunking"] = self.chunking
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _list_objects(self, bucket_name: str, prefix: str) -> Dict[str, S3Object]:
+        """Lists the files under the prefix, skipping directory markers and empty objects."""
+        objects: Dict[str, S3Object] = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith('/') or obj['Size'] == 0:
+                    continue
+                last_modified = obj['LastModified']
+                if last_modified.tzinfo is not None:
+                    # Columns are naive UTC, like the rest of the schema
+                    last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
+                objects[obj['Key']] = S3Object(
+                    key=obj['Key'],
+                    etag=obj['ETag'].strip('"'),
+                    size=obj['Size'],
+                    last_modified=last_modified,
+                )
+        return objects
+
+    def _write_chunks(self, documents: List[Document]) -> None:
+        """Writes embedded chunks; their IDs are deterministic, so a retried write overwrites."""
+        if self.vector_store.upsert_available():
+            self.vector_store.upsert(documents)
+        else:
+            self.vector_store.insert(documents)
+
+    async def _download(self, work: _FileWork, bucket_name: str, workdir: str, rebuild: bool) -> None:
+        """Downloads a file and hashes it; a file whose content is unchanged is marked as such."""
+        work.local_dir = tempfile.mkdtemp(dir=workdir)
+        try:
+            local_path = self._local_path(work)
+            await asyncio.to_thread(self.s3_client.download_file, bucket_name, work.s3_object.key, local_path)
+            work.content_hash = await asyncio.to_thread(hash_file, local_path)
+        except Exception as e:
+            logger.error(f"Failed to download {work.s3_object.key}: {e}", exc_info=True)
+            work.error = f"Failed to download: {str(e)[:250]}"
+        work.unchanged = (
+            work.error is None
+            and not rebuild
+            and work.file_row.processing_status == STATUS_PROCESSED
+            and work.content_hash == work.file_row.content_hash
+        )
+        if work.error or work.unchanged:
+            shutil.rmtree(work.local_dir, ignore_errors=True)
+
+    def _local_path(self, work: _FileWork) -> str:
+        filename = work.file_row.filename or os.path.basename(work.s3_object.key)
+        return os.path.join(work.local_dir, filename.replace('/', '_').replace('\\', '_'))
+
+    async def _parse(self, work: _FileWork, bucket: ContentBucketSnapshot) -> None:
+        """Parses and chunks a downloaded file with the parsing service, spooling its chunks next to it."""
+        metadata = {
+            'source': work.s3_object.key,
+            'content_bucket_id': str(bucket.id),
+            'file_metadata_id': str(work.file_row.id),
+        }
+        local_path = self._local_path(work)
+        spool_path = os.path.join(work.local_dir, "chunks.jsonl")
+        try:
+            count = await document_parsing_service.parse_to_spool(
+                local_path,
+                work.file_row.filename or os.path.basename(work.s3_object.key),
+                metadata,
+                spool_path,
+                chunking_options=self.chunking,
+            )
+            work.spool = open(spool_path, encoding="utf-8")
+        except Exception as e:
+            logger.error(f"Bucket {bucket.id}: Failed to parse {work.s3_object.key}: {e}", exc_info=True)
+            work.error = f"Failed to process: {str(e)[:250]}"
+            self._release_spool(work)
+            return
+        finally:
+            # The spool replaces the download
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+        if not count:
+            logger.warning(f"Bucket {bucket.id}: No content loaded from {work.s3_object.key}. Check loader compatibility.")
+
+    def _read_chunks(self, work: _FileWork, limit: int) -> List[Document]:
+        """
+        Reads up to `limit` chunks from a file's spool and returns those not stored yet. Once the
+        spool is exhausted, works out which stored chunks the file lost.
+        """
+        documents: List[Document] = []
+        chunks = read_chunks(work.spool, limit)
+        for content, chunk_metadata in chunks:
+            index = work.next_index
+            work.next_index += 1
+            content_hash = hash_text(content)
+            # Identical chunks within a file are stored once
+            if content_hash in work.current_hashes:
+                continue
+            work.current_hashes.add(content_hash)
+            if content_hash in work.existing_chunks:
+                continue
+            doc_id = chunk_document_id(work.file_row.id, content_hash)
+            documents.append(Document(
+                content=content,
+                id=doc_id,
+                name=work.file_row.filename,
+                meta_data={**chunk_metadata, 'chunk_hash': content_hash},
+            ))
+            work.new_chunks.append((index, content_hash, doc_id))
+        if len(chunks) < limit:
+            work.streamed = True
+            work.removed_chunks = [
+                chunk for content_hash, chunk in work.existing_chunks.items() if content_hash not in work.current_hashes
+            ]
+            self._release_spool(work)
+        return documents
+
+    @staticmethod
+    def _release_spool(work: _FileWork) -> None:
+        """Closes and removes a file's spool and working directory."""
+        if work.spool is not None:
+            work.spool.close()
+            work.spool = None
+        if work.local_dir:
+            shutil.rmtree(work.local_dir, ignore_errors=True)
+
+    async def _write_batch(self, batch: List[Tuple[_FileWork, Document]]) -> None:
+        """Embeds a batch of chunks (in as few requests as the provider allows) and writes it to the vector store."""
+        documents = [document for _, document in batch]
+        texts = [document.content for document in documents]
+        try:
+            embeddings = await asyncio.to_thread(embed_texts, self.embedder, texts)
+            for text, embedding in zip(texts, embeddings):
+                self.precomputed.add(text, embedding)
+            await asyncio.to_thread(self._write_chunks, documents)
+        except Exception as e:
+            logger.error(f"Failed to embed or write {len(documents)} chunk(s): {e}", exc_info=True)
+            for work, _ in batch:
+                work.error = work.error or f"Vector store update failed: {str(e)[:250]}"
+        finally:
+            self.precomputed.discard(texts)
+        for work, _ in batch:
+            work.unwritten -= 1
+
+    async def _finish_file(self, work: _FileWork) -> None:
+        """Removes the chunks a file lost from the vector store once its new chunks are written."""
+        self._release_spool(work)
+        if work.error is None and work.removed_chunks:
+            try:
+                await asyncio.to_thread(
+                    delete_vector_documents, self.vector_store, [chunk.vector_doc_id for chunk in work.removed_chunks]
+                )
+            except Exception as e:
+                logger.error(f"Failed to delete stale chunks of {work.s3_object.key}: {e}", exc_info=True)
+                work.error = f"Vector store update failed: {str(e)[:250]}"
+        self._record(work)
+
+    def _record(self, work: _FileWork) -> None:
+        """Applies a finished file to its metadata row and queues its chunk rows for writing."""
+        self._files_recorded += 1
+        file_row = work.file_row
+        file_row.s3_etag = work.s3_object.etag
+        file_row.size_bytes = work.s3_object.size
+        file_row.last_modified = work.s3_object.last_modified
+        file_row.deleted_at = None
+        if work.error:
+            # Chunks written before the failure are rewritten (same IDs) by the retry
+            file_row.processing_status = STATUS_ERROR
+            file_row.processing_error = work.error
+            self._report.files_failed += 1
+            return
+        file_row.content_hash = work.content_hash
+        file_row.processing_status = STATUS_PROCESSED
+        file_row.processing_error = None
+        if work.unchanged:
+            return
+        now = datetime.utcnow()
+        file_row.processed_at = now
+        self._report.files_changed += 1
+        self._report.chunks_embedded += len(work.new_chunks)
+        self._report.chunks_deleted += len(work.removed_chunks)
+        self._removed_chunk_ids.extend(chunk.row_id for chunk in work.removed_chunks)
+        self._chunk_rows.extend(
+            {
+                "id": uuid.uuid4(),
+                "bucket_id": file_row.bucket_id,
+                "file_id": file_row.id,
+                "chunk_index": index,
+                "content_hash": content_hash,
+                "vector_doc_id": doc_id,
+                "created_at": now,
+            }
+            for index, content_hash, doc_id in work.new_chunks
+        )
+
+    async def _flush_chunk_rows(self) -> None:
+        """
+        Writes the chunk rows of finished files and commits them with the files' status, so a
+        sync that fails later keeps the files whose vectors are already written.
+        """
+        removed, self._removed_chunk_ids = self._removed_chunk_ids, []
+        rows, self._chunk_rows = self._chunk_rows, []
+        self._files_recorded = 0
+        for start in range(0, len(removed), _IN_BATCH_SIZE):
+            await self.db.execute(
+                delete(KnowledgeChunkORM).where(KnowledgeChunkORM.id.in_(removed[start:start + _IN_BATCH_SIZE]))
+            )
+        for start in range(0, len(rows), _IN_BATCH_SIZE):
+            await self.db.execute(insert(KnowledgeChunkORM), rows[start:start + _IN_BATCH_SIZE])
+        await self.db.commit()
+
+    async def _maybe_flush_chunk_rows(self) -> None:
+        """Commits finished files once enough of them, or of their chunk rows, have accumulated."""
+        if len(self._chunk_rows) >= _IN_BATCH_SIZE or self._files_recorded >= _COMMIT_FILE_COUNT:
+            await self._flush_chunk_rows()
+
+    async def _run_pipeline(
+        self,
+        bucket: ContentBucketSnapshot,
+        bucket_name: str,
+        candidates: List[Tuple[FileMetadataORM, S3Object]],
+        stored_chunks: Dict[uuid.UUID, Dict[str, ExistingChunk]],
+        rebuild: bool,
+    ) -> None:
+        """
+        Streams the candidate files through three stages connected by bounded queues:
+        concurrent downloads, parsing in the process pool, and batched embedding and writing.
+        Files that fail to download or are unchanged skip parsing. Only the write stage records
+        files, so the session is never used while it is committing.
+        Parsed chunks are spooled to disk and read back one batch at a time, and a full queue
+        stalls the stage feeding it, so at most EMBEDDING_MAX_CONCURRENCY batches of chunks are
+        held in memory, however large the files or the bucket.
+        """
+        parse_workers = max(1, settings.KNOWLEDGE_PARSE_WORKERS)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=parse_workers)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=parse_workers)
+        pending = iter(candidates)
+
+        with tempfile.TemporaryDirectory(prefix="mindloom-sync-") as workdir:
+
+            async def download():
+                # Workers share one iterator, so each file is downloaded once
+                for file_row, s3_object in pending:
+                    work = _FileWork(file_row, s3_object, stored_chunks.get(file_row.id, {}))
+                    await self._download(work, bucket_name, workdir, rebuild)
+                    # Only the write stage touches the session, so files with nothing to parse go straight to it
+                    await (write_queue if work.error or work.unchanged else parse_queue).put(work)
+
+            async def parse():
+                while (work := await parse_queue.get()) is not None:
+                    await self._parse(work, bucket)
+                    await write_queue.put(work)
+
+            async def write():
+                batch: List[Tuple[_FileWork, Document]] = []
+                waiting: List[_FileWork] = [] # Files with chunks in unwritten batches
+                in_flight: Set[asyncio.Task] = set()
+
+                async def settle(return_when: str):
+                    done, _ = await asyncio.wait(in_flight, return_when=return_when)
+                    in_flight.difference_update(done)
+                    for task in done:
+                        task.result()
+                    for work in [work for work in waiting if (work.streamed or work.error) and work.unwritten == 0]:
+                        waiting.remove(work)
+                        await self._finish_file(work)
+                    await self._maybe_flush_chunk_rows()
+
+                async def flush():
+                    # Several batches embed at once; the batcher bounds the requests per deployment
+                    if len(in_flight) >= self.write_concurrency:
+                        await settle(asyncio.FIRST_COMPLETED)
+                    in_flight.add(asyncio.create_task(self._write_batch(list(batch))))
+                    batch.clear()
+
+                try:
+                    while (work := await write_queue.get()) is not None:
+                        if work.error or work.unchanged:
+                            await self._finish_file(work)
+                            await self._maybe_flush_chunk_rows()
+                            continue
+                        waiting.append(work)
+                        # Stream the file's chunks into batches; a failed batch stops the file
+                        while not work.streamed and work.error is None:
+                            documents = await asyncio.to_thread(self._read_chunks, work, self.batch_size - len(batch))
+                            work.unwritten += len(documents)
+                            batch.extend((work, document) for document in documents)
+                            if len(batch) >= self.batch_size:
+                                await flush()
+                        if work in waiting and work.unwritten == 0:
+                            waiting.remove(work)
+                            await self._finish_file(work)
+                            await self._maybe_flush_chunk_rows()
+                    if batch:
+                        await flush()
+                    if in_flight:
+                        await settle(asyncio.ALL_COMPLETED)
+                finally:
+                    for task in in_flight:
+                        task.cancel()
+
+            async def close_stages():
+                # Each stage ends once the one before it has drained
+                await asyncio.gather(*downloaders)
+                for _ in parsers:
+                    await parse_queue.put(None)
+                await asyncio.gather(*parsers)
+                await write_queue.put(None)
+
+            downloaders = [asyncio.create_task(download()) for _ in range(self.concurrency)]
+            parsers = [asyncio.create_task(parse()) for _ in range(parse_workers)]
+            stages = [*downloaders, *parsers, asyncio.create_task(write()), asyncio.create_task(close_stages())]
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            failed = [task for task in done if not task.cancelled() and task.exception() is not None]
+            if failed:
+                for task in stages:
+                    task.cancel()
+                await asyncio.gather(*stages, return_exceptions=True)
+                raise failed[0].exception()
+
+    async def _load_chunks(self, file_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, ExistingChunk]]:
+        """Returns the stored chunks of the given files, keyed by file ID and chunk hash."""
+        chunks: Dict[uuid.UUID, Dict[str, ExistingChunk]] = {file_id: {} for file_id in file_ids}
+        file_ids = list(file_ids)
+        for start in range(0, len(file_ids), _IN_BATCH_SIZE):
+            rows = await self.db.execute(
+                select(
+                    KnowledgeChunkORM.id,
+                    KnowledgeChunkORM.file_id,
+                    KnowledgeChunkORM.content_hash,
+                    KnowledgeChunkORM.vector_doc_id,
+                ).where(KnowledgeChunkORM.file_id.in_(file_ids[start:start + _IN_BATCH_SIZE]))
+            )
+            for row_id, file_id, content_hash, vector_doc_id in rows.all():
+                chunks[file_id][content_hash] = ExistingChunk(row_id, content_hash, vector_doc_id)
+        return chunks
+
+    async def _tombstone_files(self, bucket: ContentBucketSnapshot, file_ids: List[uuid.UUID], now: datetime) -> int:
+        """Removes the chunks of files that left S3 and marks the files deleted, in bulk. Returns the chunk count."""
+        if not file_ids:
+            return 0
+        stored = await self._load_chunks(file_ids)
+        doc_ids = [chunk.vector_doc_id for chunks in stored.values() for chunk in chunks.values()]
+        await asyncio.to_thread(delete_vector_documents, self.vector_store, doc_ids)
+        for start in range(0, len(file_ids), _IN_BATCH_SIZE):
+            batch = file_ids[start:start + _IN_BATCH_SIZE]
+            await self.db.execute(delete(KnowledgeChunkORM).where(KnowledgeChunkORM.file_id.in_(batch)))
+            await self.db.execute(
+                update(FileMetadataORM)
+                .where(FileMetadataORM.id.in_(batch))
+                .values(
+                    processing_status=STATUS_DELETED,
+                    processing_error=None,
+                    content_hash=None,
+                    s3_etag=None,
+                    deleted_at=now,
+                )
+            )
+        logger.info(f"Bucket {bucket.id}: Tombstoned {len(file_ids)} file(s) and {len(doc_ids)} chunk(s).")
+        return len(doc_ids)
+
+    async def sync(self, bucket: ContentBucketSnapshot, force: bool = False) -> SyncReport:
+        """
+        Syncs the bucket's vector store with its S3 prefix, committing file and chunk state in
+        batches as files finish, and the sync state at the end. `force` re-embeds every file, as
+        does a change of the bucket's embedder, vector store or chunking settings. A failed sync
+        is recorded in the bucket's sync state and re-raised; files committed before the failure
+        are not synced again next time unless they change (or the sync was a rebuild).
+        """
+        try:
+            return await self._sync(bucket, force)
+        except Exception as e:
+            await self.db.rollback()
+            try:
+                state = await self.db.get(BucketSyncStateORM, bucket.id)
+                if state is None:
+                    state = BucketSyncStateORM(bucket_id=bucket.id)
+                    self.db.add(state)
+                state.last_error = str(e)[:1000]
+                await self.db.commit()
+            except Exception as state_error:
+                await self.db.rollback()
+                logger.warning(f"Bucket {bucket.id}: Could not record sync failure: {state_error}")
+            raise
+
+    async def _sync(self, bucket: ContentBucketSnapshot, force: bool) -> SyncReport:
+        bucket_name, prefix = bucket_s3_location(bucket)
+        self.chunking = chunking_config(bucket.config)
+        if self.s3_client is None:
+            self.s3_client = get_s3_client(bucket.config)
+        report = SyncReport()
+        started_at = datetime.utcnow()
+
+        state = await self.db.get(BucketSyncStateORM, bucket.id)
+        if state is None:
+            state = BucketSyncStateORM(bucket_id=bucket.id)
+            self.db.add(state)
+        state.last_started_at = started_at
+
+        config_hash = self._config_hash(bucket)
+        rebuild = force or state.config_hash != config_hash
+
+        if rebuild:
+            logger.info(f"Bucket {bucket.id}: Settings changed or first sync; re-embedding every file.")
+            # Drops the whole table or collection, so it is created again below
+            await asyncio.to_thread(self.vector_store.delete)
+            await self.db.execute(delete(KnowledgeChunkORM).where(KnowledgeChunkORM.bucket_id == bucket.id))
+        await asyncio.to_thread(self.vector_store.create)
+
+        objects = await asyncio.to_thread(self._list_objects, bucket_name, prefix)
+        report.files_seen = len(objects)
+
+        result = await self.db.execute(
+            select(FileMetadataORM)
+            .where(FileMetadataORM.bucket_id == bucket.id)
+            .order_by(FileMetadataORM.created_at.desc())
+        )
+        files_by_key: Dict[str, FileMetadataORM] = {}
+        to_tombstone: List[uuid.UUID] = []
+        for file_row in result.scalars().all():
+            if file_row.s3_key in objects and file_row.s3_key not in files_by_key:
+                files_by_key[file_row.s3_key] = file_row
+            elif file_row.deleted_at is None:
+                # Gone from S3, or an older row for a key that was uploaded again
+                to_tombstone.append(file_row.id)
+
+        for key, s3_object in objects.items():
+            if key not in files_by_key:
+                # Files that reached S3 without going through the upload endpoint
+                file_row = FileMetadataORM(
+                    id=uuid.uuid4(),
+                    filename=os.path.basename(key),
+                    s3_bucket=bucket_name,
+                    s3_key=key,
+                    size_bytes=s3_object.size,
+                    last_modified=s3_object.last_modified,
+                    bucket_id=bucket.id,
+                    processing_status=STATUS_PENDING,
+                )
+                self.db.add(file_row)
+                files_by_key[key] = file_row
+
+        candidates = [
+            (file_row, objects[key]) for key, file_row in files_by_key.items()
+            if rebuild or file_row.processing_status != STATUS_PROCESSED or file_row.s3_etag != objects[key].etag
+        ]
+        logger.info(
+            f"Bucket {bucket.id}: {len(objects)} file(s) in S3, {len(candidates)} to check, {len(to_tombstone)} to tombstone."
+        )
+
+        stored_chunks = await self._load_chunks([file_row.id for file_row, _ in candidates]) if not rebuild else {}
+        # New file rows must exist before their chunks reference them, and a rebuild's cleared
+        # chunks must stay cleared, as the vector store already is, if the sync fails later
+        await self.db.commit()
+
+        self._report, self._chunk_rows, self._removed_chunk_ids, self._files_recorded = report, [], [], 0
+        await self._run_pipeline(bucket, bucket_name, candidates, stored_chunks, rebuild)
+        await self._flush_chunk_rows()
+
+        now = datetime.utcnow()
+        report.files_deleted = len(to_tombstone)
+        report.chunks_deleted += await self._tombstone_files(bucket, to_tombstone, now)
+
+        if objects:
+            state.watermark = max(s3_object.last_modified for s3_object in objects.values())
+        state.config_hash = config_hash
+        state.last_completed_at = now
+        state.files_seen = report.files_seen
+        state.files_changed = report.files_changed
+        state.files_deleted = report.files_deleted
+        state.chunks_embedded = report.chunks_embedded
+        state.chunks_deleted = report.chunks_deleted
+        state.last_error = f"{report.files_failed} file(s) failed to sync." if report.files_failed else None
+        await self.db.commit()
+
+        logger.info(
+            f"Bucket {bucket.id}: Synced in {(now - started_at).total_seconds():.1f}s; "
+            f"{report.files_changed} file(s) changed, {report.chunks_embedded} chunk(s) embedded, "
+            f"{report.chunks_deleted} deleted, {report.files_deleted} file(s) tombstoned, {report.files_failed} failed."
+        )
+        return report
@@ -0,0 +1,283 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from kubernetes import client, config
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+from mindloom.core.config import settings
+from mindloom.services.exceptions import JobSubmissionError
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Kubernetes client, shared by every submission in this process
+_api_client: Optional[client.ApiClient] = None
+_batch_api: Optional[client.BatchV1Api] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_submit_semaphore: Optional[asyncio.Semaphore] = None
+_init_lock = threading.Lock()
+
+# Constants
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_BASE_DELAY = 0.5  # Seconds, doubled on every attempt
+RETRY_MAX_DELAY = 10.0
+
+
+def initialize() -> client.BatchV1Api:
+    """Load Kubernetes configuration and create the pooled API client and its thread pool."""
+    global _api_client, _batch_api, _executor
+
+    with _init_lock:
+        if _batch_api is not None:
+            return _batch_api
+
+        configuration = client.Configuration()
+        if os.getenv('KUBERNETES_SERVICE_HOST'):
+            config.load_incluster_config(client_configuration=configuration)
+            logger.info("Loaded in-cluster Kubernetes config")
+        else:
+            config.load_kube_config(client_configuration=configuration)
+            logger.info("Loaded local Kube config")
+
+        # One HTTP connection per concurrent submission, reused across requests
+        configuration.connection_pool_maxsize = settings.KUBERNETES_API_CONCURRENCY
+        _api_client = client.ApiClient(configuration)
+        _batch_api = client.BatchV1Api(_api_client)
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.KUBERNETES_API_CONCURRENCY,
+            thread_name_prefix="k8s-api",
+        )
+        logger.info(f"Kubernetes client initialized for namespace: {settings.KUBERNETES_NAMESPACE}")
+        return _batch_api
+
+
+async def initialize_async() -> client.BatchV1Api:
+    """Initialize the Kubernetes client without blocking the event loop on config loading."""
+    global _submit_semaphore
+    if _submit_semaphore is None:
+        _submit_semaphore = asyncio.Semaphore(settings.KUBERNETES_API_CONCURRENCY)
+    if _batch_api is not None:
+        return _batch_api
+    try:
+        return await asyncio.to_thread(initialize)
+    except Exception as e:
+        logger.error(f"Error loading Kubernetes config: {e}")
+        raise JobSubmissionError(f"Kubernetes client not available: {e}") from e
+
+
+async def close():
+    """Close the Kubernetes client and shut down its thread pool."""
+    global _api_client, _batch_api, _executor
+    if _executor:
+        _executor.shutdown(wait=False)
+        _executor = None
+    if _api_client:
+        logger.info("Closing Kubernetes client")
+        await asyncio.to_thread(_api_client.close)
+        _api_client = None
+    _batch_api = None
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Exponential backoff with jitter, honouring Retry-After on throttled responses."""
+    if isinstance(error, client.ApiException) and error.headers:
+        retry_after = error.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+    delay = min(RETRY_BASE_DELAY * (2 ** attempt), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Transient API server errors and connection failures are retried."""
+    if isinstance(error, client.ApiException):
+        return error.status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (Urllib3HTTPError, ConnectionError, TimeoutError))
+
+
+async def _call_api(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking kubernetes-client call on the dedicated thread pool.
+
+    Concurrency is bounded by KUBERNETES_API_CONCURRENCY and transient failures are retried
+    up to KUBERNETES_API_MAX_RETRIES times, so the event loop never waits on the API server.
+    """
+    await initialize_async()
+    loop = asyncio.get_running_loop()
+    kwargs.setdefault("_request_timeout", settings.KUBERNETES_API_TIMEOUT)
+    call = functools.partial(fn, *args, **kwargs)
+
+    attempt = 0
+    while True:
+        try:
+            async with _submit_semaphore:
+                return await loop.run_in_executor(_executor, call)
+        except Exception as e:
+            if not _is_retryable(e) or attempt >= settings.KUBERNETES_API_MAX_RETRIES:
+                raise
+            delay = _retry_delay(attempt, e)
+            attempt += 1
+            logger.warning(
+                f"Transient Kubernetes API error ({e.__class__.__name__}: {getattr(e, 'status', e)}); "
+                f"retrying in {delay:.2f}s (attempt {attempt}/{settings.KUBERNETES_API_MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+
+
+def build_run_job(
+    run_id: uuid.UUID,
+    runnable_type: str,
+    runnable_id: uuid.UUID,
+    input_variables: Optional[Dict[str, Any]] = None,
+) -> client.V1Job:
+    """
+    Builds the Kubernetes Job that executes a single run with run_executor.py.
+
+    Args:
+        run_id: The UUID of the run to execute.
+        runnable_type: The type of runnable ('agent' or 'team').
+        runnable_id: The UUID of the agent or team being run.
+        input_variables: The input data for the run.
+
+    Returns:
+        The V1Job definition, ready to submit.
+    """
+    job_name = f"mindloom-run-{run_id}"
+
+    redis_host = os.getenv('REDIS_HOST', 'redis')
+    redis_port = int(os.getenv('REDIS_PORT', 6379))
+    redis_password = os.getenv('REDIS_PASSWORD', '')
+    redis_url = f"redis://:{redis_password}@{redis_host}:{redis_port}"
+
+    # Prepare environment variables for the executor pod
+    env_vars = [
+        client.V1EnvVar(name="RUN_ID", value=str(run_id)),
+        client.V1EnvVar(name="RUNNABLE_TYPE", value=runnable_type),
+        client.V1EnvVar(name="RUNNABLE_ID", value=str(runnable_id)),
+        client.V1EnvVar(name="INPUT_DATA", value=json.dumps(input_variables or {})),
+        # Assuming DATABASE_URL and REDIS_URL are needed by the executor
+        # These should ideally come from Secrets or a ConfigMap in a real setup
+        client.V1EnvVar(name="DATABASE_URL", value=settings.DATABASE_URL.unicode_string()),
+        client.V1EnvVar(name="REDIS_URL", value=redis_url),
+        client.V1EnvVar(name="OPENAI_API_KEY", value=settings.OPENAI_API_KEY),
+        # Add other necessary env vars (e.g., API keys via Secrets)
+        # client.V1EnvVar(name="OPENAI_API_KEY", value_from=client.V1EnvVarSource(secret_key_ref=client.V1SecretKeySelector(name="mindloom-secrets", key="openai-api-key"))),
+    ]
+
+    # Define the container for the Job
+    container = client.V1Container(
+        name="run-executor",
+        image=settings.KUBERNETES_EXECUTOR_IMAGE, # Use image from settings
+        command=["uv", "run", "/app/src/mindloom/execution/run_executor.py"], # Command to run the script
+        env=env_vars,
+        image_pull_policy="IfNotPresent", # Or "Always" if using :latest tag
+        # Add resource requests/limits
+        # resources=client.V1ResourceRequirements(
+        #     requests={"cpu": "100m", "memory": "256Mi"},
+        #     limits={"cpu": "500m", "memory": "512Mi"},
+        # ),
+    )
+
+    # Define the Pod template spec
+    template = client.V1PodTemplateSpec(
+        metadata=client.V1ObjectMeta(labels={"app": "mindloom-run-executor", "run_id": str(run_id)}),
+        spec=client.V1PodSpec(
+            restart_policy="Never", # Jobs should not restart pods on failure
+            containers=[container],
+            # Add imagePullSecrets for GitHub Container Registry
+            image_pull_secrets=[client.V1LocalObjectReference(name="ghcr-creds")],
+            # Consider serviceAccountName if specific permissions are needed for the pod
+            # service_account_name="mindloom-executor-sa"
+        ),
+    )
+
+    # Define the Job spec
+    job_spec = client.V1JobSpec(
+        template=template,
+        backoff_limit=1, # Number of retries before marking job as failed
+        ttl_seconds_after_finished=3600 # Auto-cleanup finished jobs after 1 hour
+    )
+
+    # Define the Job object
+    return client.V1Job(
+        api_version="batch/v1",
+        kind="Job",
+        metadata=client.V1ObjectMeta(name=job_name, labels={"app": "mindloom-run", "run_id": str(run_id)}),
+        spec=job_spec,
+    )
+
+
+async def submit_job(job: client.V1Job, namespace: Optional[str] = None) -> client.V1Job:
+    """
+    Creates a Job through the pooled client without blocking the event loop.
+
+    A 409 Conflict means an earlier attempt already created the Job (e.g. its response
+    was lost), so the existing Job is returned instead of failing.
+
+    Raises:
+        JobSubmissionError: If the Job could not be created after retries.
+    """
+    namespace = namespace or settings.KUBERNETES_NAMESPACE
+    job_name = job.metadata.name
+    try:
+        logger.info(f"Creating Kubernetes Job '{job_name}' in namespace '{namespace}'...")
+        created = await _call_api(_batch_api_method("create_namespaced_job"), namespace=namespace, body=job)
+        logger.info(f"Kubernetes Job '{job_name}' created successfully.")
+        return created
+    except client.ApiException as e:
+        if e.status == 409:
+            logger.info(f"Kubernetes Job '{job_name}' already exists; treating submission as done.")
+            return await _read_existing_job(job_name, namespace)
+        logger.error(f"Error creating Kubernetes Job '{job_name}': {e.status} - {e.reason}")
+        raise JobSubmissionError(f"Failed to create Kubernetes Job: {e.reason}") from e
+    except JobSubmissionError:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error creating Kubernetes Job '{job_name}': {e}")
+        raise JobSubmissionError(f"Unexpected error during Job creation: {e}") from e
+
+
+async def _read_existing_job(job_name: str, namespace: str) -> client.V1Job:
+    """
+    Reads back a Job whose creation conflicted with an existing one.
+
+    Raises:
+        JobSubmissionError: If the existing Job could not be read.
+    """
+    try:
+        return await _call_api(_batch_api_method("read_namespaced_job"), name=job_name, namespace=namespace)
+    except client.ApiException as e:
+        logger.error(f"Error reading existing Kubernetes Job '{job_name}': {e.status} - {e.reason}")
+        raise JobSubmissionError(f"Failed to read existing Kubernetes Job: {e.reason}") from e
+    except JobSubmissionError:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error reading existing Kubernetes Job '{job_name}': {e}")
+        raise JobSubmissionError(f"Unexpected error reading existing Job: {e}") from e
+
+
+async def submit_jobs(
+    jobs: List[client.V1Job], namespace: Optional[str] = None
+) -> List[Union[client.V1Job, JobSubmissionError]]:
+    """
+    Submits several Jobs concurrently, bounded by KUBERNETES_API_CONCURRENCY.
+
+    Returns one entry per Job in the same order: the created Job, or the JobSubmissionError
+    raised for it, so one failing submission does not abort the rest of the batch.
+    """
+    return await asyncio.gather(*(submit_job(job, namespace) for job in jobs), return_exceptions=True)
+
+
+def _batch_api_method(name: str) -> Callable:
+    """Resolve a BatchV1Api method lazily, once the client has been initialized."""
+    def _call(*args: Any, **kwargs: Any) -> Any:
+        return getattr(_batch_api, name)(*args, **kwargs)
+    return _call
@@ -0,0 +1,187 @@
+"""
+Process-wide pool of LLM API clients shared by every agent model.
+
+Agno models create their own OpenAI client, and with it a new HTTP connection pool, unless
+one is passed in. `llm_client_pool` hands out one sync/async client pair per provider,
+endpoint, deployment and credentials, so all agents and team members on the same deployment
+reuse the same keep-alive (and, with LLM_HTTP2, HTTP/2) connections. Concurrent
+requests per deployment are capped at LLM_MAX_CONCURRENCY_PER_DEPLOYMENT.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import httpx
+from openai import (
+    AsyncAzureOpenAI,
+    AsyncOpenAI,
+    AzureOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+)
+
+from mindloom.core.config import settings
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the `h2` package from the httpx[http2] dependency; without it, clients use HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that releases a concurrency slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _BoundedTransport(httpx.AsyncBaseTransport):
+    """
+    Limits in-flight requests through a transport.
+
+    A slot is held until the response body is closed, so streamed completions count for as
+    long as they are streaming. Needed because with HTTP/2 many requests share one connection,
+    which the connection limits alone would not bound.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_concurrency: int):
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self._semaphore.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+@dataclass
+class LLMClients:
+    """The shared sync and async clients for one deployment."""
+    client: Any
+    async_client: Any
+
+
+class LLMClientPool:
+    """Creates LLM API clients on first use and shares them for the life of the process."""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[Any, ...], LLMClients] = {}
+        self._lock = threading.Lock()
+
+    def _http_clients(self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """Builds the HTTP clients for one deployment, sized by LLM_MAX_CONCURRENCY_PER_DEPLOYMENT."""
+        max_concurrency = settings.LLM_MAX_CONCURRENCY_PER_DEPLOYMENT
+        http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        async_transport = _BoundedTransport(
+            httpx.AsyncHTTPTransport(http2=http2, limits=limits), max_concurrency
+        )
+        return (
+            DefaultHttpxClient(http2=http2, limits=limits),
+            DefaultAsyncHttpxClient(transport=async_transport),
+        )
+
+    def get_clients(
+        self,
+        provider: str,
+        *,
+        api_key: str,
+        endpoint: Optional[str] = None,
+        deployment: Optional[str] = None,
+        api_version: Optional[str] = None,
+    ) -> LLMClients:
+        """
+        Returns the shared clients for a deployment, creating them on first use.
+
+        Args:
+            provider: 'azure_openai' or 'openai'.
+            api_key: API key; only a hash of it is kept in the pool key.
+            endpoint: Azure endpoint, or base URL for OpenAI-compatible APIs (optional).
+            deployment: Azure deployment name (optional).
+            api_version: Azure API version (optional).
+        """
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        pool_key = (provider, endpoint, deployment, api_version, key_hash)
+        clients = self._clients.get(pool_key)
+        if clients is not None:
+            return clients
+
+        with self._lock:
+            clients = self._clients.get(pool_key)
+            if clients is not None:
+                return clients
+
+            http_client, async_http_client = self._http_clients()
+            if provider == "azure_openai":
+                azure_params = {
+                    "api_key": api_key,
+                    "azure_endpoint": endpoint,
+                    "azure_deployment": deployment,
+                    "api_version": api_version,
+                }
+                clients = LLMClients(
+                    client=AzureOpenAI(**azure_params, http_client=http_client),
+                    async_client=AsyncAzureOpenAI(**azure_params, http_client=async_http_client),
+                )
+            elif provider == "openai":
+                openai_params = {"api_key": api_key, "base_url": endpoint}
+                clients = LLMClients(
+                    client=OpenAI(**openai_params, http_client=http_client),
+                    async_client=AsyncOpenAI(**openai_params, http_client=async_http_client),
+                )
+            else:
+                raise ValueError(f"Unsupported LLM provider for client pool: {provider}")
+
+            self._clients[pool_key] = clients
+            logger.info(
+                f"Created shared {provider} client for endpoint={endpoint or 'default'}, "
+                f"deployment={deployment or '-'} (http2={settings.LLM_HTTP2 and HTTP2_AVAILABLE})"
+            )
+            return clients
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of pooled deployments for monitoring."""
+        return {"deployments": len(self._clients)}
+
+    async def close(self):
+        """Closes every pooled client and its connections."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for pooled in clients:
+            try:
+                pooled.client.close()
+                await pooled.async_client.close()
+            except Exception as e:
+                logger.warning(f"Error closing LLM client: {e}")
+
+
+# Create a single instance of the pool for the process
+llm_client_pool = LLMClientPool()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+import mindloom.services.redis as redis_service
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Slow-consumer policies, applied when a subscriber's queue is full
+DROP_OLDEST = "drop_oldest"   # Discard the oldest queued message to make room (live tails)
+DROP_NEWEST = "drop_newest"   # Discard the incoming message (wake-up notifications)
+DISCONNECT = "disconnect"     # Close the subscription; the client must reconnect and catch up
+
+# Sentinel queued when a subscription is closed by the multiplexer
+_CLOSED = object()
+
+
+class SubscriptionClosed(Exception):
+    """Raised when reading from a subscription the multiplexer has closed."""
+    pass
+
+
+class Subscription:
+    """A single client's view of a channel, with its own bounded queue."""
+
+    def __init__(self, channel: str, max_queue: int, policy: str):
+        self.channel = channel
+        self.policy = policy
+        self.dropped = 0 # Messages discarded because this client fell behind
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def _deliver(self, message: str) -> None:
+        """Queues a message without ever waiting; applies the slow-consumer policy when full."""
+        if self.closed:
+            return
+        if self._queue.full():
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            if self.policy == DISCONNECT:
+                self._close()
+                return
+            self._queue.get_nowait() # DROP_OLDEST
+        self._queue.put_nowait(message)
+
+    def _close(self) -> None:
+        """Marks the subscription closed and wakes up a reader blocked on `get`."""
+        if self.closed:
+            return
+        self.closed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Returns the next message, or None if `timeout` seconds pass without one.
+
+        Raises:
+            SubscriptionClosed: If the subscription was closed (e.g. by the DISCONNECT policy).
+        """
+        try:
+            message = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is _CLOSED:
+            raise SubscriptionClosed(f"Subscription to {self.channel} was closed")
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self.get()
+        except SubscriptionClosed:
+            raise StopAsyncIteration
+
+
+class PubSubMultiplexer:
+    """
+    Process-wide Redis Pub/Sub subscriber shared by every SSE and WebSocket client.
+
+    Holds a single Pub/Sub connection, subscribes a channel when its first client arrives and
+    unsubscribes it when the last one leaves, and fans each message out to per-client queues.
+    Delivery never waits on a client, so one stalled browser cannot hold up the others.
+    """
+
+    def __init__(self):
+        self._pubsub = None
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = asyncio.Lock()
+        self._has_channels: Optional[asyncio.Event] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def _ensure_started(self):
+        """Creates the shared Pub/Sub connection and reader task on first use."""
+        if self._pubsub is None:
+            redis_client = await redis_service.get_client()
+            self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        if self._has_channels is None:
+            self._has_channels = asyncio.Event()
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._reader())
+
+    async def subscribe(self, channel: str, max_queue: int = 1000, policy: str = DROP_OLDEST) -> Subscription:
+        """Registers a client on `channel`, subscribing in Redis if it is the channel's first client."""
+        async with self._lock:
+            await self._ensure_started()
+            subscription = Subscription(channel, max_queue, policy)
+            clients = self._subscriptions.setdefault(channel, set())
+            if not clients:
+                await self._pubsub.subscribe(channel)
+                logger.info(f"Subscribed to Redis channel: {channel}")
+            clients.add(subscription)
+            self._has_channels.set()
+            return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes a client, unsubscribing in Redis once the channel has no clients left."""
+        subscription._close()
+        async with self._lock:
+            clients = self._subscriptions.get(subscription.channel)
+            if clients is None:
+                return
+            clients.discard(subscription)
+            if not clients:
+                del self._subscriptions[subscription.channel]
+                try:
+                    await self._pubsub.unsubscribe(subscription.channel)
+                    logger.info(f"Unsubscribed from Redis channel: {subscription.channel}")
+                except Exception as e:
+                    logger.error(f"Error unsubscribing from channel {subscription.channel}: {e}")
+            if not self._subscriptions:
+                self._has_channels.clear()
+
+    async def _resubscribe(self):
+        """Replaces a broken Pub/Sub connection and resubscribes every active channel."""
+        async with self._lock:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            redis_client = await redis_service.get_client()
+            self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            if self._subscriptions:
+                await self._pubsub.subscribe(*self._subscriptions.keys())
+
+    async def _reader(self):
+        """Reads from the shared connection and fans messages out to subscribers."""
+        while not self._closing:
+            await self._has_channels.wait()
+            if self._closing:
+                break
+            try:
+                # Timeout keeps the read below the client's socket_timeout
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading from shared Pub/Sub connection: {e}")
+                await asyncio.sleep(1)
+                try:
+                    await self._resubscribe()
+                except Exception as resub_err:
+                    logger.error(f"Error re-establishing Pub/Sub subscriptions: {resub_err}")
+                continue
+            if message is None or message.get("type") != "message":
+                continue
+            for subscription in list(self._subscriptions.get(message["channel"], ())):
+                subscription._deliver(message["data"])
+
+    def stats(self) -> Dict[str, int]:
+        """Return channel and client counts for monitoring."""
+        return {
+            "channels": len(self._subscriptions),
+            "clients": sum(len(clients) for clients in self._subscriptions.values()),
+        }
+
+    async def close(self):
+        """Stops the reader and closes the shared connection."""
+        # The flag stops the reader even if a cancellation is swallowed inside redis-py
+        self._closing = True
+        if self._has_channels is not None:
+            self._has_channels.set()
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        for clients in self._subscriptions.values():
+            for subscription in clients:
+                subscription._close()
+        self._subscriptions.clear()
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing shared Pub/Sub connection: {e}")
+            self._pubsub = None
+        self._has_channels = None
+        self._closing = False
+
+
+# Create a single instance of the multiplexer for the process
+pubsub_multiplexer = PubSubMultiplexer()
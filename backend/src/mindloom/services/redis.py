@@ -1,9 +1,11 @@
+import redis as sync_redis
 import redis.asyncio as redis
 import os
+import json
 from dotenv import load_dotenv
 import asyncio
 import logging
-from typing import List, Any
+from typing import List, Any, Dict, Optional, Set, Tuple
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
@@ -12,44 +14,62 @@ logger = logging.getLogger(__name__)
 client = None
 _initialized = False
 _init_lock = asyncio.Lock()
+_consumer_groups: Set[Tuple[str, str]] = set()  # (stream, group) pairs known to exist
 
 # Constants
 REDIS_KEY_TTL = 3600 * 24  # 24 hour TTL as safety mechanism
+RUN_QUEUE_KEY = "run_queue"  # Stream of runs waiting to be claimed by an executor worker
+RUN_QUEUE_GROUP = "run_executors"  # Consumer group shared by all executor workers
+RUN_RESULTS_MAXLEN = 10000  # Cap on result chunks kept per run (approximate trimming)
+INGESTION_QUEUE_KEY = "ingestion_queue"  # Stream of content buckets waiting to be ingested
+INGESTION_QUEUE_GROUP = "ingestion_workers"  # Consumer group shared by all ingestion workers
+INGESTION_SCHEDULE_KEY = "ingestion:schedule"  # Held by the worker that enqueues the periodic sync
+EMBEDDING_CACHE_PREFIX = "embedding:"  # Cached embeddings, keyed by embedder identity and text hash
+EMBEDDING_CACHE_STATS_KEY = "embedding_cache:stats"  # Hit/miss counters shared by all processes
+
+
+def connection_kwargs() -> Dict[str, Any]:
+    """Return the Redis connection settings read from environment variables."""
+    # Load environment variables if not already loaded
+    load_dotenv()
+
+    # Convert string 'True'/'False' to boolean
+    redis_ssl_str = os.getenv('REDIS_SSL', 'False')
+    return {
+        "host": os.getenv('REDIS_HOST', 'mindloom-redis-headless'),
+        "port": int(os.getenv('REDIS_PORT', 6379)),
+        "password": os.getenv('REDIS_PASSWORD', 'changeme-redis'),
+        "ssl": redis_ssl_str.lower() == 'true',
+        "socket_timeout": 5.0,
+        "socket_connect_timeout": 5.0,
+        "retry_on_timeout": True,
+        "health_check_interval": 30,
+    }
 
 
 def initialize():
     """Initialize Redis connection using environment variables."""
     global client
 
-    # Load environment variables if not already loaded
-    load_dotenv()
-
     # Get Redis configuration
-    redis_host = os.getenv('REDIS_HOST', 'mindloom-redis-headless')
-    redis_port = int(os.getenv('REDIS_PORT', 6379))
-    redis_password = os.getenv('REDIS_PASSWORD', 'changeme-redis')
-    # Convert string 'True'/'False' to boolean
-    redis_ssl_str = os.getenv('REDIS_SSL', 'False')
-    redis_ssl = redis_ssl_str.lower() == 'true'
+    redis_kwargs = connection_kwargs()
 
-    logger.info(f"Initializing Redis connection to {redis_host}:{redis_port}")
+    logger.info(f"Initializing Redis connection to {redis_kwargs['host']}:{redis_kwargs['port']}")
 
     # Create Redis client with basic configuration
-    client = redis.Redis(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        ssl=redis_ssl,
-        decode_responses=True,
-        socket_timeout=5.0,
-        socket_connect_timeout=5.0,
-        retry_on_timeout=True,
-        health_check_interval=30
-    )
+    client = redis.Redis(**redis_kwargs, decode_responses=True)
 
     return client
 
 
+def create_sync_client(decode_responses: bool = False) -> sync_redis.Redis:
+    """
+    Create a blocking Redis client with the same settings, for code that runs in worker
+    threads (e.g. embedders called by Agno's synchronous vector stores).
+    """
+    return sync_redis.Redis(**connection_kwargs(), decode_responses=decode_responses)
+
+
 async def initialize_async():
     """Initialize Redis connection asynchronously."""
     global client, _initialized
@@ -104,12 +124,58 @@ async def get(key: str, default: str = None):
     return result if result is not None else default
 
 
+async def set_if_absent(key: str, value: str, ex: int = None) -> bool:
+    """Set a Redis key only if it does not exist. Returns True if it was set."""
+    redis_client = await get_client()
+    return bool(await redis_client.set(key, value, ex=ex, nx=True))
+
+
 async def delete(key: str):
     """Delete a Redis key."""
     redis_client = await get_client()
     return await redis_client.delete(key)
 
 
+async def exists(key: str) -> bool:
+    """Check whether a Redis key exists."""
+    redis_client = await get_client()
+    return bool(await redis_client.exists(key))
+
+
+# Lock operations
+_RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+async def acquire_lock(key: str, token: str, ttl_ms: int) -> bool:
+    """Take a lock that expires after `ttl_ms` unless renewed. Returns True if it was taken."""
+    redis_client = await get_client()
+    return bool(await redis_client.set(key, token, px=ttl_ms, nx=True))
+
+
+async def renew_lock(key: str, token: str, ttl_ms: int) -> bool:
+    """Extend a lock held with `token` by `ttl_ms`. Returns False if the lock was lost."""
+    redis_client = await get_client()
+    return bool(await redis_client.eval(_RENEW_LOCK_SCRIPT, 1, key, token, ttl_ms))
+
+
+async def release_lock(key: str, token: str) -> bool:
+    """Release a lock, only if it is still held with `token`."""
+    redis_client = await get_client()
+    return bool(await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
+
+
 async def publish(channel: str, message: str):
     """Publish a message to a Redis channel."""
     redis_client = await get_client()
@@ -151,4 +217,254 @@ async def expire(key: str, time: int):
 async def keys(pattern: str) -> List[str]:
     """Get keys matching a pattern."""
     redis_client = await get_client()
-    return await redis_client.keys(pattern)
\ No newline at end of file
+    return await redis_client.keys(pattern)
+
+
+# Stream operations
+async def xadd(stream: str, fields: Dict[str, Any], maxlen: Optional[int] = None) -> str:
+    """Append an entry to a stream, optionally capping its length (approximately)."""
+    redis_client = await get_client()
+    return await redis_client.xadd(stream, fields, maxlen=maxlen, approximate=True)
+
+
+async def ensure_consumer_group(stream: str, group: str) -> None:
+    """Create a consumer group (and the stream) if it does not exist yet."""
+    if (stream, group) in _consumer_groups:
+        return
+    redis_client = await get_client()
+    try:
+        # Start from the beginning so entries added before the group existed are delivered
+        await redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+        logger.info(f"Created consumer group '{group}' on stream '{stream}'")
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    _consumer_groups.add((stream, group))
+
+
+async def xreadgroup(
+    stream: str, group: str, consumer: str, count: int = 1, block_ms: Optional[int] = None
+) -> List[Tuple[str, Dict[str, str]]]:
+    """Read new entries for `consumer` from a consumer group. Returns (entry_id, fields) pairs."""
+    await ensure_consumer_group(stream, group)
+    redis_client = await get_client()
+    try:
+        response = await redis_client.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms)
+    except redis.ResponseError as e:
+        if "NOGROUP" not in str(e):
+            raise
+        # Stream or group was removed underneath us (e.g. key deleted); recreate on next read
+        _consumer_groups.discard((stream, group))
+        return []
+    if not response:
+        return []
+    _, entries = response[0]
+    return entries
+
+
+async def xautoclaim(
+    stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 1
+) -> List[Tuple[str, Dict[str, str]]]:
+    """Take over pending entries idle for at least `min_idle_ms`. Returns (entry_id, fields) pairs."""
+    await ensure_consumer_group(stream, group)
+    redis_client = await get_client()
+    response = await redis_client.xautoclaim(stream, group, consumer, min_idle_ms, start_id="0-0", count=count)
+    # Entries deleted while pending come back as None
+    return [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+
+async def xclaim_touch(stream: str, group: str, consumer: str, entry_ids: List[str]) -> None:
+    """Reset the idle time of entries still being processed so they are not reclaimed."""
+    if not entry_ids:
+        return
+    redis_client = await get_client()
+    await redis_client.xclaim(stream, group, consumer, 0, entry_ids, justid=True)
+
+
+async def xdelivery_count(stream: str, group: str, entry_id: str) -> int:
+    """Return how many times a pending entry has been delivered (0 if it is not pending)."""
+    redis_client = await get_client()
+    pending = await redis_client.xpending_range(stream, group, min=entry_id, max=entry_id, count=1)
+    return pending[0]["times_delivered"] if pending else 0
+
+
+async def xack_delete(stream: str, group: str, entry_id: str) -> None:
+    """Acknowledge an entry and delete it so the stream length reflects outstanding work."""
+    redis_client = await get_client()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.xack(stream, group, entry_id)
+        pipe.xdel(stream, entry_id)
+        await pipe.execute()
+
+
+async def stream_stats(stream: str, group: str) -> Dict[str, Any]:
+    """Return length, pending and consumer counts for a stream consumer group."""
+    await ensure_consumer_group(stream, group)
+    redis_client = await get_client()
+    length = await redis_client.xlen(stream)
+    pending = await redis_client.xpending(stream, group)
+    groups = await redis_client.xinfo_groups(stream)
+    group_info = next((g for g in groups if g.get("name") == group), {})
+    return {
+        "length": length,
+        "pending": pending.get("pending", 0),
+        "waiting": max(length - pending.get("pending", 0), 0),
+        "consumers": group_info.get("consumers", 0),
+    }
+
+
+# Run queue operations
+async def enqueue_run(payload: Dict[str, Any]) -> str:
+    """Add a run payload to the run queue stream for the executor workers."""
+    return await xadd(RUN_QUEUE_KEY, {"payload": json.dumps(payload)})
+
+
+async def run_queue_length() -> int:
+    """Return the number of runs queued or in flight on the run queue."""
+    redis_client = await get_client()
+    return await redis_client.xlen(RUN_QUEUE_KEY)
+
+
+async def claim_runs(consumer: str, count: int = 1, block_ms: int = 1000) -> List[Tuple[str, Dict[str, Any]]]:
+    """Claim new runs for `consumer`. Keep `block_ms` below the client's socket_timeout."""
+    entries = await xreadgroup(RUN_QUEUE_KEY, RUN_QUEUE_GROUP, consumer, count=count, block_ms=block_ms)
+    return [(entry_id, json.loads(fields["payload"])) for entry_id, fields in entries]
+
+
+async def reclaim_stale_runs(consumer: str, min_idle_ms: int, count: int = 1) -> List[Tuple[str, Dict[str, Any]]]:
+    """Take over runs claimed by executors that stopped heartbeating (e.g. crashed pods)."""
+    entries = await xautoclaim(RUN_QUEUE_KEY, RUN_QUEUE_GROUP, consumer, min_idle_ms, count=count)
+    return [(entry_id, json.loads(fields["payload"])) for entry_id, fields in entries]
+
+
+async def heartbeat_runs(consumer: str, entry_ids: List[str]) -> None:
+    """Mark runs as still in progress by `consumer`."""
+    await xclaim_touch(RUN_QUEUE_KEY, RUN_QUEUE_GROUP, consumer, entry_ids)
+
+
+async def run_delivery_count(entry_id: str) -> int:
+    """Return how many times a queued run has been delivered to an executor."""
+    return await xdelivery_count(RUN_QUEUE_KEY, RUN_QUEUE_GROUP, entry_id)
+
+
+async def ack_run(entry_id: str) -> None:
+    """Acknowledge and remove a finished run from the run queue."""
+    await xack_delete(RUN_QUEUE_KEY, RUN_QUEUE_GROUP, entry_id)
+
+
+async def run_queue_stats() -> Dict[str, Any]:
+    """Return depth and consumer statistics for the run queue."""
+    return await stream_stats(RUN_QUEUE_KEY, RUN_QUEUE_GROUP)
+
+
+# Ingestion queue operations
+def ingestion_pending_key(bucket_id: Any) -> str:
+    """Return the key marking a bucket as already queued for ingestion."""
+    return f"ingestion:pending:{bucket_id}"
+
+
+def ingestion_lock_key(bucket_id: Any) -> str:
+    """Return the key held by the worker currently syncing a bucket."""
+    return f"ingestion:lock:{bucket_id}"
+
+
+def ingestion_resync_key(bucket_id: Any) -> str:
+    """Return the key asking the worker syncing a bucket to queue it again when it finishes."""
+    return f"ingestion:resync:{bucket_id}"
+
+
+async def enqueue_ingestion(bucket_id: Any, reason: str) -> Optional[str]:
+    """
+    Queue a content bucket for ingestion unless it is already waiting in the queue, so a
+    burst of uploads to one bucket results in a single ingestion. Returns the entry ID, or
+    None if the bucket was already queued.
+    """
+    pending_key = ingestion_pending_key(bucket_id)
+    if not await set_if_absent(pending_key, reason, ex=REDIS_KEY_TTL):
+        return None
+    payload = {"bucket_id": str(bucket_id), "reason": reason}
+    try:
+        return await xadd(INGESTION_QUEUE_KEY, {"payload": json.dumps(payload)})
+    except Exception:
+        # Nothing was queued, so the marker would only block the bucket's next ingestions
+        try:
+            await delete(pending_key)
+        except Exception as e:
+            logger.error(f"Failed to clear the ingestion pending marker of bucket {bucket_id}: {e}")
+        raise
+
+
+async def claim_ingestions(consumer: str, count: int = 1, block_ms: int = 1000) -> List[Tuple[str, Dict[str, Any]]]:
+    """Claim queued buckets for `consumer`. Keep `block_ms` below the client's socket_timeout."""
+    entries = await xreadgroup(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP, consumer, count=count, block_ms=block_ms)
+    return [(entry_id, json.loads(fields["payload"])) for entry_id, fields in entries]
+
+
+async def reclaim_stale_ingestions(consumer: str, min_idle_ms: int, count: int = 1) -> List[Tuple[str, Dict[str, Any]]]:
+    """Take over ingestions claimed by workers that stopped heartbeating."""
+    entries = await xautoclaim(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP, consumer, min_idle_ms, count=count)
+    return [(entry_id, json.loads(fields["payload"])) for entry_id, fields in entries]
+
+
+async def heartbeat_ingestions(consumer: str, entry_ids: List[str]) -> None:
+    """Mark ingestions as still in progress by `consumer`."""
+    await xclaim_touch(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP, consumer, entry_ids)
+
+
+async def ingestion_delivery_count(entry_id: str) -> int:
+    """Return how many times a queued ingestion has been delivered to a worker."""
+    return await xdelivery_count(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP, entry_id)
+
+
+async def ack_ingestion(entry_id: str) -> None:
+    """Acknowledge and remove a finished ingestion from the queue."""
+    await xack_delete(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP, entry_id)
+
+
+async def ingestion_queue_stats() -> Dict[str, Any]:
+    """Return depth and consumer statistics for the ingestion queue."""
+    return await stream_stats(INGESTION_QUEUE_KEY, INGESTION_QUEUE_GROUP)
+
+
+# Embedding cache operations
+async def embedding_cache_stats() -> Dict[str, int]:
+    """Return the embedding cache hit/miss counters of all processes."""
+    redis_client = await get_client()
+    counters = await redis_client.hgetall(EMBEDDING_CACHE_STATS_KEY)
+    return {name: int(value) for name, value in counters.items()}
+
+
+# Run result operations
+def run_results_key(run_id: Any) -> str:
+    """Return the stream key holding a run's result chunks."""
+    return f"run_results:{run_id}"
+
+
+async def append_run_result(run_id: Any, data: Dict[str, Any]) -> str:
+    """
+    Append a result chunk to the run's capped result stream and refresh its TTL.
+    Also publishes a wake-up on the channel of the same name for tailing readers.
+    """
+    redis_client = await get_client()
+    key = run_results_key(run_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.xadd(key, {"data": json.dumps(data, default=str)}, maxlen=RUN_RESULTS_MAXLEN, approximate=True)
+        pipe.expire(key, REDIS_KEY_TTL)
+        pipe.publish(key, "1")
+        entry_id, _, _ = await pipe.execute()
+    return entry_id
+
+
+async def read_run_results(
+    run_id: Any, last_id: str = "0", count: int = 100, block_ms: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    """
+    Read result chunks after `last_id` ("0" for the whole stream), blocking up to `block_ms`.
+    Keep `block_ms` below the client's socket_timeout. Returns (entry_id, json_data) pairs.
+    """
+    redis_client = await get_client()
+    response = await redis_client.xread({run_results_key(run_id): last_id}, count=count, block=block_ms)
+    if not response:
+        return []
+    _, entries = response[0]
+    return [(entry_id, fields["data"]) for entry_id, fields in entries]
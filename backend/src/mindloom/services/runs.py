@@ -1,11 +1,42 @@
+import base64
+import json
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import AsyncGenerator, Optional, Dict, Any, List, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import Select, select, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from mindloom.app.models.run import RunORM, RunStatus, RunLogORM, LogLevel
+
+# Columns returned by run listings; input and output payloads are left out
+RUN_SUMMARY_COLUMNS = (
+    RunORM.id,
+    RunORM.runnable_id,
+    RunORM.runnable_type,
+    RunORM.status,
+    RunORM.created_at,
+    RunORM.started_at,
+    RunORM.ended_at,
+    RunORM.user_id,
+)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) for a SELECT, used to read the planner's row estimate."""
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
 
-from mindloom.app.models.run import RunORM, RunStatus
 # TODO: Adjust if your Pydantic create schema is named differently or located elsewhere
 # from mindloom.app.schemas.run import RunCreate 
 
@@ -101,5 +132,195 @@ class RunService:
         await db.refresh(run)
         return run
 
+    @staticmethod
+    def _filter_runs(
+        query: Select,
+        *,
+        runnable_id: Optional[uuid.UUID] = None,
+        runnable_type: Optional[str] = None,
+        status: Optional[RunStatus] = None,
+        user_id: Optional[uuid.UUID] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Select:
+        """Applies the run search filters shared by `get_runs` and `estimate_run_count`."""
+        if runnable_id is not None:
+            query = query.where(RunORM.runnable_id == runnable_id)
+        if runnable_type is not None:
+            query = query.where(RunORM.runnable_type == runnable_type)
+        if status is not None:
+            query = query.where(RunORM.status == status)
+        if user_id is not None:
+            query = query.where(RunORM.user_id == user_id)
+        if created_after is not None:
+            query = query.where(RunORM.created_at >= created_after)
+        if created_before is not None:
+            query = query.where(RunORM.created_at < created_before)
+        return query
+
+    async def get_runs(
+        self,
+        db: AsyncSession,
+        *,
+        before: Optional[Tuple[datetime, uuid.UUID]] = None,
+        limit: int = 100,
+        runnable_id: Optional[uuid.UUID] = None,
+        runnable_type: Optional[str] = None,
+        status: Optional[RunStatus] = None,
+        user_id: Optional[uuid.UUID] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Searches runs, newest first, returning one page of summaries using keyset pagination.
+
+        Only the summary columns are selected, so no ORM objects, payloads or relationships
+        are loaded. Ordering happens in the database on (created_at, id); filtering by
+        runnable, status or user is served by the matching (<column>, created_at, id) index
+        on RunORM, and time ranges by the created_at index.
+
+        Args:
+            db: The AsyncSession for database interaction.
+            before: The (created_at, id) of the last run of the previous page, if any.
+            limit: Maximum number of runs to return.
+            runnable_id: Only return runs of this agent or team (optional).
+            runnable_type: Only return runs of this type, 'agent' or 'team' (optional).
+            status: Only return runs with this status (optional).
+            user_id: Only return runs started by this user (optional).
+            created_after: Only return runs created at or after this time (optional).
+            created_before: Only return runs created before this time (optional).
+
+        Returns:
+            A list of mappings with the RUN_SUMMARY_COLUMNS of each run.
+        """
+        query = self._filter_runs(
+            select(*RUN_SUMMARY_COLUMNS),
+            runnable_id=runnable_id,
+            runnable_type=runnable_type,
+            status=status,
+            user_id=user_id,
+            created_after=created_after,
+            created_before=created_before,
+        )
+        if before is not None:
+            query = query.where(tuple_(RunORM.created_at, RunORM.id) < tuple_(*before))
+        query = query.order_by(RunORM.created_at.desc(), RunORM.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
+    async def estimate_run_count(self, db: AsyncSession, **filters: Any) -> int:
+        """
+        Estimates how many runs match `filters` (see `get_runs`) without running COUNT(*).
+
+        Without filters this reads the table's row estimate from pg_class statistics; with
+        filters it asks the planner for its row estimate of the filtered query. Both are only
+        as fresh as the last ANALYZE, which is fine for showing an approximate total.
+        """
+        active_filters = {key: value for key, value in filters.items() if value is not None}
+        if not active_filters:
+            result = await db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {"table": RunORM.__tablename__},
+            )
+            reltuples = result.scalar_one_or_none()
+            # reltuples is -1 until the table has been vacuumed or analyzed for the first time
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+        query = self._filter_runs(select(RunORM.id), **active_filters)
+        result = await db.execute(_Explain(query))
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def run_exists(self, db: AsyncSession, run_id: uuid.UUID) -> bool:
+        """Checks that a run exists without loading the run or any of its relationships."""
+        result = await db.execute(select(RunORM.id).where(RunORM.id == run_id))
+        return result.scalar_one_or_none() is not None
+
+    async def get_run_status(self, db: AsyncSession, run_id: uuid.UUID) -> Optional[RunStatus]:
+        """Returns a run's status without loading the run, or None if the run does not exist."""
+        result = await db.execute(select(RunORM.status).where(RunORM.id == run_id))
+        return result.scalar_one_or_none()
+
+    async def get_run_logs(
+        self,
+        db: AsyncSession,
+        run_id: uuid.UUID,
+        *,
+        after: Optional[Tuple[datetime, uuid.UUID]] = None,
+        levels: Optional[Sequence[LogLevel]] = None,
+        limit: int = 500,
+    ) -> List[RunLogORM]:
+        """
+        Fetches one page of a run's logs in (timestamp, id) order, using keyset pagination.
+
+        Queries run_logs directly (never through RunORM.logs), so the cost of a page depends
+        only on `limit` and the index on (run_id, timestamp, id), not on how many logs the run has.
+
+        Args:
+            db: The AsyncSession for database interaction.
+            run_id: The UUID of the run whose logs to fetch.
+            after: The (timestamp, id) of the last entry of the previous page, if any.
+            levels: Only return entries with one of these levels (optional).
+            limit: Maximum number of entries to return.
+
+        Returns:
+            A list of RunLogORM objects.
+        """
+        query = select(RunLogORM).where(RunLogORM.run_id == run_id)
+        if after is not None:
+            query = query.where(tuple_(RunLogORM.timestamp, RunLogORM.id) > tuple_(*after))
+        if levels:
+            query = query.where(RunLogORM.level.in_(levels))
+        query = query.order_by(RunLogORM.timestamp, RunLogORM.id).limit(limit)
+        result = await db.execute(query)
+        return list(result.scalars().all())
+
+    async def iter_run_logs(
+        self,
+        db: AsyncSession,
+        run_id: uuid.UUID,
+        *,
+        after: Optional[Tuple[datetime, uuid.UUID]] = None,
+        levels: Optional[Sequence[LogLevel]] = None,
+        page_size: int = 1000,
+    ) -> AsyncGenerator[RunLogORM, None]:
+        """
+        Yields every log entry of a run after `after`, reading one keyset page at a time.
+
+        Only a single page is held in memory, and loaded rows are expunged from the session
+        after each page so long runs do not accumulate in its identity map.
+        """
+        while True:
+            page = await self.get_run_logs(db, run_id, after=after, levels=levels, limit=page_size)
+            for log in page:
+                yield log
+            if len(page) < page_size:
+                return
+            after = (page[-1].timestamp, page[-1].id)
+            db.expunge_all()
+
+
+def encode_keyset_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    """Encodes a (timestamp, id) keyset position as an opaque pagination cursor."""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decodes a cursor produced by `encode_keyset_cursor` into (timestamp, id).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 # You might want a singleton instance or use dependency injection
 run_service = RunService()
@@ -0,0 +1,256 @@
+"""
+Loads a team, or a set of agents, with everything needed to instantiate them.
+
+`TeamGraphLoader` fetches the team, its member agents, their variables, the team's and
+agents' content buckets and the buckets' files in a fixed number of queries (one per
+relationship level, however many members and buckets there are) and returns detached,
+frozen snapshots. Unrelated relationships, several of which are `lazy="selectin"` on the
+models (runs, owners, bucket back-references), are not loaded. Snapshots hold no session,
+so they can be cached and handed between services and tasks.
+"""
+import copy
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+
+from mindloom.app.models.agent import AgentORM
+from mindloom.app.models.content_bucket import ContentBucketORM
+from mindloom.app.models.team import TeamORM
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FileSnapshot:
+    """A file registered in a content bucket."""
+    id: uuid.UUID
+    bucket_id: uuid.UUID
+    filename: str
+    s3_bucket: str
+    s3_key: str
+    content_type: Optional[str]
+    size_bytes: Optional[int]
+    last_modified: datetime
+
+
+@dataclass(frozen=True)
+class ContentBucketSnapshot:
+    """A content bucket and its files. Config dicts are private copies; treat them as read-only."""
+    id: uuid.UUID
+    name: str
+    description: Optional[str]
+    bucket_type: str
+    config: Dict[str, Any]
+    embedder_config: Dict[str, Any]
+    vector_db_config: Dict[str, Any]
+    updated_at: Optional[datetime]
+    files: Tuple[FileSnapshot, ...] = ()
+
+
+@dataclass(frozen=True)
+class AgentVariableSnapshot:
+    """A variable defined on an agent."""
+    key: str
+    value: Any
+    is_secret: bool
+
+
+@dataclass(frozen=True)
+class AgentSnapshot:
+    """An agent's configuration with its variables and content buckets."""
+    id: uuid.UUID
+    name: str
+    description: Optional[str]
+    instructions: Optional[str]
+    llm_config: Optional[Dict[str, Any]]
+    tools: Optional[List[Dict[str, Any]]]
+    knowledge_config: Optional[Dict[str, Any]]
+    storage_config: Optional[Dict[str, Any]]
+    agent_config: Optional[Dict[str, Any]]
+    updated_at: Optional[datetime] # Version used by the agent blueprint cache
+    variables: Tuple[AgentVariableSnapshot, ...] = ()
+    content_buckets: Tuple[ContentBucketSnapshot, ...] = ()
+
+
+@dataclass(frozen=True)
+class TeamSnapshot:
+    """A team's configuration with its member agents and content buckets."""
+    id: uuid.UUID
+    name: str
+    description: Optional[str]
+    mode: Optional[List[str]]
+    instructions: Optional[str]
+    llm_config: Optional[Dict[str, Any]]
+    knowledge_config: Optional[Dict[str, Any]]
+    storage_config: Optional[Dict[str, Any]]
+    team_config: Optional[Dict[str, Any]]
+    enable_memory: bool
+    history_length: int
+    updated_at: Optional[datetime]
+    agents: Tuple[AgentSnapshot, ...] = ()
+    content_buckets: Tuple[ContentBucketSnapshot, ...] = ()
+
+    @property
+    def agent_ids(self) -> List[uuid.UUID]:
+        return [agent.id for agent in self.agents]
+
+
+def _bucket_loader(relationship) -> Any:
+    """Loader option for a content bucket relationship: buckets and their files, nothing else."""
+    return selectinload(relationship).options(
+        selectinload(ContentBucketORM.files).raiseload("*"),
+        raiseload("*"),
+    )
+
+
+def _agent_loader_options() -> Tuple[Any, ...]:
+    """Loader options for AgentORM rows: variables and content buckets (with files), nothing else."""
+    return (
+        selectinload(AgentORM.variables).raiseload("*"),
+        _bucket_loader(AgentORM.content_buckets),
+        raiseload("*"),
+    )
+
+
+def team_graph_statement(team_id: uuid.UUID):
+    """SELECT for a team and its graph; issues 7 queries in total whatever the team's size."""
+    return (
+        select(TeamORM)
+        .where(TeamORM.id == team_id)
+        .options(
+            selectinload(TeamORM.agents).options(*_agent_loader_options()),
+            _bucket_loader(TeamORM.content_buckets),
+            raiseload("*"),
+        )
+    )
+
+
+def agent_graph_statement(agent_ids: Sequence[uuid.UUID]):
+    """SELECT for several agents and their graphs; issues 4 queries in total."""
+    return (
+        select(AgentORM)
+        .where(AgentORM.id.in_(agent_ids))
+        .options(*_agent_loader_options())
+    )
+
+
+def bucket_graph_statement(bucket_ids: Sequence[uuid.UUID]):
+    """SELECT for content buckets and their files; issues 2 queries in total."""
+    return (
+        select(ContentBucketORM)
+        .where(ContentBucketORM.id.in_(bucket_ids))
+        .options(selectinload(ContentBucketORM.files).raiseload("*"), raiseload("*"))
+    )
+
+
+class TeamGraphLoader:
+    """Loads team and agent graphs from the database as immutable snapshots."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        # Buckets shared between a team and its agents become one snapshot object
+        self._buckets: Dict[uuid.UUID, ContentBucketSnapshot] = {}
+
+    async def load_team(self, team_id: uuid.UUID) -> Optional[TeamSnapshot]:
+        """Returns the team's snapshot, or None if the team does not exist."""
+        result = await self.session.execute(team_graph_statement(team_id))
+        team_orm = result.scalars().first()
+        if team_orm is None:
+            return None
+        snapshot = self._team_snapshot(team_orm)
+        logger.debug(
+            f"Team {team_id}: Loaded graph with {len(snapshot.agents)} agent(s) "
+            f"and {len(self._buckets)} content bucket(s)."
+        )
+        return snapshot
+
+    async def load_agents(self, agent_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, AgentSnapshot]:
+        """Returns snapshots of the agents in `agent_ids` that exist, keyed by ID."""
+        if not agent_ids:
+            return {}
+        result = await self.session.execute(agent_graph_statement(agent_ids))
+        return {agent_orm.id: self._agent_snapshot(agent_orm) for agent_orm in result.scalars().all()}
+
+    async def load_buckets(self, bucket_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, ContentBucketSnapshot]:
+        """Returns snapshots of the content buckets in `bucket_ids` that exist, keyed by ID."""
+        if not bucket_ids:
+            return {}
+        result = await self.session.execute(bucket_graph_statement(bucket_ids))
+        return {bucket_orm.id: self._bucket_snapshot(bucket_orm) for bucket_orm in result.scalars().all()}
+
+    def _bucket_snapshot(self, bucket_orm: ContentBucketORM) -> ContentBucketSnapshot:
+        snapshot = self._buckets.get(bucket_orm.id)
+        if snapshot is None:
+            snapshot = ContentBucketSnapshot(
+                id=bucket_orm.id,
+                name=bucket_orm.name,
+                description=bucket_orm.description,
+                bucket_type=bucket_orm.bucket_type,
+                config=copy.deepcopy(bucket_orm.config),
+                embedder_config=copy.deepcopy(bucket_orm.embedder_config),
+                vector_db_config=copy.deepcopy(bucket_orm.vector_db_config),
+                updated_at=bucket_orm.updated_at,
+                files=tuple(
+                    FileSnapshot(
+                        id=file_orm.id,
+                        bucket_id=file_orm.bucket_id,
+                        filename=file_orm.filename,
+                        s3_bucket=file_orm.s3_bucket,
+                        s3_key=file_orm.s3_key,
+                        content_type=file_orm.content_type,
+                        size_bytes=file_orm.size_bytes,
+                        last_modified=file_orm.last_modified,
+                    )
+                    for file_orm in bucket_orm.files
+                ),
+            )
+            self._buckets[bucket_orm.id] = snapshot
+        return snapshot
+
+    def _agent_snapshot(self, agent_orm: AgentORM) -> AgentSnapshot:
+        return AgentSnapshot(
+            id=agent_orm.id,
+            name=agent_orm.name,
+            description=agent_orm.description,
+            instructions=agent_orm.instructions,
+            llm_config=copy.deepcopy(agent_orm.llm_config),
+            tools=copy.deepcopy(agent_orm.tools),
+            knowledge_config=copy.deepcopy(agent_orm.knowledge_config),
+            storage_config=copy.deepcopy(agent_orm.storage_config),
+            agent_config=copy.deepcopy(agent_orm.agent_config),
+            updated_at=agent_orm.updated_at,
+            variables=tuple(
+                AgentVariableSnapshot(
+                    key=variable.key,
+                    value=copy.deepcopy(variable.value),
+                    is_secret=variable.is_secret,
+                )
+                for variable in agent_orm.variables
+            ),
+            content_buckets=tuple(self._bucket_snapshot(bucket) for bucket in agent_orm.content_buckets),
+        )
+
+    def _team_snapshot(self, team_orm: TeamORM) -> TeamSnapshot:
+        return TeamSnapshot(
+            id=team_orm.id,
+            name=team_orm.name,
+            description=team_orm.description,
+            mode=copy.deepcopy(team_orm.mode),
+            instructions=team_orm.instructions,
+            llm_config=copy.deepcopy(team_orm.llm_config),
+            knowledge_config=copy.deepcopy(team_orm.knowledge_config),
+            storage_config=copy.deepcopy(team_orm.storage_config),
+            team_config=copy.deepcopy(team_orm.team_config),
+            enable_memory=team_orm.enable_memory,
+            history_length=team_orm.history_length,
+            updated_at=team_orm.updated_at,
+            agents=tuple(self._agent_snapshot(agent) for agent in team_orm.agents),
+            content_buckets=tuple(self._bucket_snapshot(bucket) for bucket in team_orm.content_buckets),
+        )
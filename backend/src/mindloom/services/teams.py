@@ -3,11 +3,14 @@ import uuid
 import asyncio
 import logging
 import os
+import tempfile
+from datetime import timezone
 from typing import List, Optional, Dict, Any, TYPE_CHECKING, Tuple
 import agno
 from agno.memory.team import TeamMemory as AgnoMemory
 from agno.memory.v2.db.postgres import PostgresMemoryDb
 from agno.memory.v2.db.redis import RedisMemoryDb # <-- Import RedisMemory
+from langchain_core.documents import Document as LangchainDocument
 from langchain_core.language_models.chat_models import BaseChatModel
 from agno.embedder.base import Embedder # Added
 
@@ -25,11 +28,17 @@ from mindloom.app.models.team import TeamORM
 from mindloom.app.models.agent import AgentORM
 from mindloom.core.config import settings
 from mindloom.services.agents import AgentService # Import AgentService
+from mindloom.services.embeddings import wrap_embedder
+from mindloom.services.llm_clients import llm_client_pool
+from mindloom.services.team_graph import TeamGraphLoader, TeamSnapshot
+from mindloom.services.chunking import chunking_config
+from mindloom.services.document_parsing import document_parsing_service, read_chunks
 from mindloom.services.exceptions import ( # Import custom exceptions
     TeamCreationError,
     AgentCreationError,
     KnowledgeCreationError,
     StorageCreationError,
+    ModelCreationError,
     ServiceError,
     ConfigurationError
 )
@@ -41,9 +50,10 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 class TeamService:
-    def __init__(self, db: AsyncSession, agent_service: "AgentService"): # Type hint AgentService
+    def __init__(self, db: AsyncSession, agent_service: Optional["AgentService"] = None): # Type hint AgentService
         self.db = db
-        self.agent_service = agent_service
+        # Member agents are created through the AgentService; defaults to one on the same session
+        self.agent_service = agent_service or AgentService(db=db)
         # Store the engine for potential use by Agno components
         self.engine: AsyncEngine = db.bind
         if not self.engine:
@@ -64,7 +74,7 @@ class TeamService:
 
     # --- Team-specific Component Creation --- 
 
-    def _create_team_embedder(self, knowledge_config: Optional[Dict[str, Any]]) -> Optional[AzureOpenAIEmbedder]:
+    def _create_team_embedder(self, knowledge_config: Optional[Dict[str, Any]]) -> Optional[Embedder]:
         """Creates the embedding model instance based on team's knowledge config."""
         # This logic is similar to AgentService._create_embedder
         if not knowledge_config or 'embedder' not in knowledge_config:
@@ -111,7 +121,7 @@ class TeamService:
             
             try:
                 logger.info(f"Instantiating AzureOpenAIEmbedder for team with endpoint: {azure_endpoint}, deployment: {deployment_name}")
-                return AzureOpenAIEmbedder(**embedder_params)
+                return wrap_embedder(AzureOpenAIEmbedder(**embedder_params))
             except Exception as e:
                 logger.error(f"Failed to instantiate team AzureOpenAIEmbedder: {e}", exc_info=True)
                 # Wrap instantiation errors
@@ -120,26 +130,26 @@ class TeamService:
              logger.error(f"Unsupported team embedder provider specified: {provider}")
              raise ConfigurationError(f"Unsupported team embedder provider: {provider}")
 
-    async def _create_team_knowledge(self, team_orm: TeamORM, db: AsyncSession) -> Optional[PgVector]:
+    async def _create_team_knowledge(self, team: TeamSnapshot, db: AsyncSession) -> Optional[PgVector]:
         """Creates the Agno Vector Store instance for the team and triggers sync.
         
         Returns the initialized (but potentially still syncing) VectorStore.
         """
-        if not team_orm.knowledge_config:
-            logger.info(f"Team {team_orm.id}: No knowledge_config provided. No vector store created.")
+        if not team.knowledge_config:
+            logger.info(f"Team {team.id}: No knowledge_config provided. No vector store created.")
             return None
         
         # --- 1. Create Embedder --- #
-        embedder = self._create_team_embedder(team_orm.knowledge_config)
+        embedder = self._create_team_embedder(team.knowledge_config)
         if not embedder:
-             logger.error(f"Team {team_orm.id}: Cannot create vector store without embedder.")
+             logger.error(f"Team {team.id}: Cannot create vector store without embedder.")
              # Raise specific error for clarity
-             raise KnowledgeCreationError(f"Team {team_orm.id}: Cannot create vector store without embedder.")
+             raise KnowledgeCreationError(f"Team {team.id}: Cannot create vector store without embedder.")
 
         # --- 2. Initialize Vector Store --- #
-        vector_store_config = team_orm.knowledge_config.get("vector_store", {})
+        vector_store_config = team.knowledge_config.get("vector_store", {})
         # Use team ID for table name to avoid conflicts
-        collection_name = vector_store_config.get("collection_name_prefix", "team_knowledge") + f"_{str(team_orm.id).replace('-', '_')}"
+        collection_name = vector_store_config.get("collection_name_prefix", "team_knowledge") + f"_{str(team.id).replace('-', '_')}"
         connection_string = vector_store_config.get("connection_string", settings.DATABASE_URL_PSYCOPG)
 
         try:
@@ -151,42 +161,42 @@ class TeamService:
                 # Add other PgVector specific params if needed from vector_store_config
                 logger=logger
             )
-            logger.info(f"Team {team_orm.id}: Initialized PgVector store '{collection_name}'.")
+            logger.info(f"Team {team.id}: Initialized PgVector store '{collection_name}'.")
             
             # --- 3. Trigger Background Sync (Placeholder) --- #
             # This part needs to be implemented to run potentially in background
             # For now, we'll call a synchronous placeholder
             # Ensure content_buckets are loaded before calling this
-            await self._sync_team_vector_store(team_orm, vector_store, db)
+            await self._sync_team_vector_store(team, vector_store, db)
             
             return vector_store
         except KnowledgeCreationError: # Propagate specific errors
              raise
         except Exception as e:
-            logger.error(f"Team {team_orm.id}: Failed to instantiate or sync PgVector store '{collection_name}': {e}", exc_info=True)
-            raise KnowledgeCreationError(f"Team {team_orm.id}: Failed to instantiate PgVector store '{collection_name}': {e}") from e
+            logger.error(f"Team {team.id}: Failed to instantiate or sync PgVector store '{collection_name}': {e}", exc_info=True)
+            raise KnowledgeCreationError(f"Team {team.id}: Failed to instantiate PgVector store '{collection_name}': {e}") from e
 
-    async def _sync_team_vector_store(self, team_orm: TeamORM, vector_store: PgVector, db: AsyncSession):
+    async def _sync_team_vector_store(self, team: TeamSnapshot, vector_store: PgVector, db: AsyncSession):
         """Placeholder: Orchestrates syncing all associated S3 buckets to the team's vector store."""
-        logger.info(f"Team {team_orm.id}: Starting vector store sync for collection '{vector_store.collection_name}'.")
-        # TODO: Implement iteration over team_orm.content_buckets and call _sync_single_bucket_to_team_store
-        if not team_orm.content_buckets:
-            logger.info(f"Team {team_orm.id}: No content buckets associated, sync skipped.")
+        logger.info(f"Team {team.id}: Starting vector store sync for collection '{vector_store.collection_name}'.")
+        # TODO: Implement iteration over team.content_buckets and call _sync_single_bucket_to_team_store
+        if not team.content_buckets:
+            logger.info(f"Team {team.id}: No content buckets associated, sync skipped.")
             return
             
-        for bucket in team_orm.content_buckets:
+        for bucket in team.content_buckets:
             if bucket.bucket_type.lower() == 's3':
                 try:
                      # TODO: Implement _sync_single_bucket_to_team_store
-                     # await self._sync_single_bucket_to_team_store(team_orm, bucket, vector_store, db)
-                     logger.info(f"Team {team_orm.id}: Placeholder sync for bucket {bucket.id}.") # Placeholder log
+                     # await self._sync_single_bucket_to_team_store(team, bucket, vector_store, db)
+                     logger.info(f"Team {team.id}: Placeholder sync for bucket {bucket.id}.") # Placeholder log
                 except Exception as e:
-                    logger.error(f"Team {team_orm.id}: Error syncing bucket {bucket.id} ('{bucket.name}'): {e}", exc_info=True)
+                    logger.error(f"Team {team.id}: Error syncing bucket {bucket.id} ('{bucket.name}'): {e}", exc_info=True)
                     # Decide whether to continue syncing other buckets or raise
             else:
-                logger.warning(f"Team {team_orm.id}: Skipping sync for non-S3 bucket {bucket.id} ('{bucket.name}') type '{bucket.bucket_type}'.")
+                logger.warning(f"Team {team.id}: Skipping sync for non-S3 bucket {bucket.id} ('{bucket.name}') type '{bucket.bucket_type}'.")
 
-        logger.info(f"Team {team_orm.id}: Finished vector store sync process.")
+        logger.info(f"Team {team.id}: Finished vector store sync process.")
 
     # Placeholder for the detailed sync logic per bucket
     async def _sync_single_bucket_to_team_store(self, db: AsyncSession, team_orm: TeamORM, bucket: ContentBucketORM, s3_client, team_vector_store: PgVector):
@@ -215,7 +225,6 @@ class TeamService:
         db_files_for_this_bucket = {f.s3_key: f for f in bucket.files if f.s3_key}
         logger.debug(f"Team {team_orm.id}, Bucket {bucket.id}: Found {len(db_files_for_this_bucket)} file metadata records linked.")
 
-        added_or_updated_docs = []
         processed_s3_keys = set()
         # Files in DB metadata (for this bucket) presumed deleted unless found in S3 list
         keys_to_delete_from_vector_store = set(db_files_for_this_bucket.keys())
@@ -314,10 +323,14 @@ class TeamService:
                                     'mindloom_content_bucket_id': str(bucket.id),
                                     'mindloom_s3_key': s3_key,
                                 }
-                                loaded_docs = load_document_from_file(local_file_path, existing_metadata.filename, doc_metadata_base)
-
-                                if loaded_docs:
-                                    logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: Loaded {len(loaded_docs)} doc(s) from {s3_key}")
+                                # Parse and chunk in the parsing service's processes, off the event loop
+                                spool_path = os.path.join(tmpdir, "chunks.jsonl")
+                                chunk_count = await document_parsing_service.parse_to_spool(
+                                    local_file_path, local_filename, doc_metadata_base, spool_path,
+                                    chunking_options=chunking_config(bucket.config),
+                                )
+
+                                if chunk_count:
                                     # Delete existing docs for this *specific file* from *this bucket* before adding new/updated ones
                                     delete_filter = {
                                         'mindloom_content_bucket_id': str(bucket.id),
@@ -331,7 +344,13 @@ class TeamService:
                                         # Log deletion error but proceed with adding docs if possible
                                         logger.error(f"Team {team_orm.id}, Bucket {bucket.id}: Failed to delete existing vector docs for {s3_key}: {del_exc}", exc_info=True)
                                     
-                                    added_or_updated_docs.extend(loaded_docs)
+                                    # Add the chunks in bounded windows read back from the spool
+                                    with open(spool_path, encoding="utf-8") as spool:
+                                        while window := read_chunks(spool, settings.KNOWLEDGE_EMBED_BATCH_SIZE):
+                                            team_vector_store.add_documents(
+                                                [LangchainDocument(page_content=text, metadata=metadata) for text, metadata in window]
+                                            )
+                                    logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: Loaded {chunk_count} chunk(s) from {s3_key} into collection '{collection_name}'.")
                                 else:
                                     logger.warning(f"Team {team_orm.id}, Bucket {bucket.id}: No documents were loaded from file {s3_key}. Check loader compatibility.")
                                 current_file_processed = True # Mark as successfully loaded/parsed
@@ -351,23 +370,6 @@ class TeamService:
                                 # Update metadata status regardless of success/failure during processing step
                                 await db.flush([existing_metadata]) # Ensure status update is flushed
 
-            # --- Add loaded documents in batches (if any) --- # 
-            if added_or_updated_docs:
-                try:
-                    logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: Adding/updating {len(added_or_updated_docs)} documents in vector store collection '{collection_name}'.")
-                    team_vector_store.add_documents(added_or_updated_docs)
-                    logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: Successfully added/updated documents.")
-                except Exception as add_exc:
-                    logger.error(f"Team {team_orm.id}, Bucket {bucket.id}: Error adding documents to vector store: {add_exc}", exc_info=True)
-                    # Mark relevant metadata as error?
-                    for meta in metadata_to_update:
-                         if meta.processing_status == 'processing': # Only mark those we tried to process in this batch
-                              meta.processing_status = 'error'
-                              meta.processing_error = f"Vector store add failed: {str(add_exc)[:200]}"
-                    await db.flush(metadata_to_update) # Flush error status
-            else:
-                logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: No new or updated documents to add to vector store.")
-
             # --- Delete documents for files no longer in S3 (for this bucket) --- #
             if keys_to_delete_from_vector_store:
                 logger.info(f"Team {team_orm.id}, Bucket {bucket.id}: Deleting documents for {len(keys_to_delete_from_vector_store)} keys not found in S3 listing: {keys_to_delete_from_vector_store}")
@@ -438,12 +440,12 @@ class TeamService:
 
     def _create_team_storage(
         self,
-        team_orm: TeamORM,
+        team: TeamSnapshot,
         embedder: Optional[Embedder] = None # Added embedder parameter
     ) -> Optional[AgnoMemory]:
         """Creates the Agno Storage instance for the team. Defaults to RedisMemory if no config is provided."""
-        storage_config = team_orm.storage_config
-        team_id = team_orm.id # Use team ID for storage identification
+        storage_config = team.storage_config
+        team_id = team.id # Use team ID for storage identification
 
         if not storage_config:
             logger.info(f"No storage_config for team {team_id}. Defaulting to Redis memory.")
@@ -542,9 +544,9 @@ class TeamService:
                 
                 embedder = AzureOpenAIEmbedder(
                     azure_deployment=deployment_name,
-                    openai_api_key=api_key,
+                    api_key=api_key,
                     azure_endpoint=endpoint,
-                    openai_api_version=api_version,
+                    api_version=api_version,
                     # Add other params like chunk_size if needed
                 )
             # Add other embedder types here (e.g., OpenAIEmbedder)
@@ -563,12 +565,22 @@ class TeamService:
                      missing = [p for p, v in zip(['key', 'endpoint', 'deployment', 'version'], [api_key, endpoint, deployment_name, api_version]) if not v]
                      raise ConfigurationError(f"Team {team_id}: Missing Azure OpenAI chat model configuration: {', '.join(missing)}")
 
+                # Reuse the process-wide clients (and connections) for this deployment, like member agents
+                clients = llm_client_pool.get_clients(
+                    "azure_openai",
+                    api_key=api_key,
+                    endpoint=endpoint,
+                    deployment=deployment_name,
+                    api_version=api_version,
+                )
                 chat_model = AzureOpenAI(
                     azure_deployment=deployment_name,
-                    openai_api_key=api_key,
+                    api_key=api_key,
                     azure_endpoint=endpoint,
-                    openai_api_version=api_version,
+                    api_version=api_version,
                     temperature=azure_params.get("temperature", 0.7), # Example param
+                    client=clients.client,
+                    async_client=clients.async_client,
                     # Add other AzureOpenAI specific params
                 )
             # Add other model types here (e.g., OpenAI)
@@ -584,31 +596,36 @@ class TeamService:
             logger.error(f"Team {team_id}: Failed to instantiate leader model '{model_type}' or embedder '{embedder_type}': {e}", exc_info=True)
             raise ModelCreationError(f"Team {team_id}: Failed to instantiate leader model/embedder: {e}") from e
 
-    async def create_agno_team_instance(self, team_id: uuid.UUID) -> Team:
+    async def create_agno_team_instance(self, team_id: uuid.UUID, session_id: Optional[uuid.UUID] = None) -> Team:
         """
         Fetches team config from DB, creates member agent instances, 
         and dynamically creates an Agno Team instance.
+        The team and its members are bound to `session_id` (a new one if not given).
+        Member agents are created concurrently from one batched config load, so startup
+        takes about as long as the slowest member rather than the sum of all of them.
         Raises ValueError if team not found.
         Raises AgentCreationError if member agents cannot be instantiated.
         Raises TeamCreationError for issues during team component setup or instantiation.
          """
         logger.info(f"Creating Agno Team instance for ID: {team_id}")
-        team_orm = await self.get_team_config_from_db(team_id)
-        if not team_orm:
+        session_id = session_id or uuid.uuid4()
+        # The team, members, buckets and files in a fixed number of queries
+        team = await TeamGraphLoader(self.db).load_team(team_id)
+        if not team:
             logger.error(f"Team with ID {team_id} not found.")
             raise ValueError(f"Team with ID {team_id} not found.")
         
         # Use the correct relationship name
-        if not team_orm.agents:
+        if not team.agents:
             logger.warning(f"Team with ID {team_id} has no member agents defined.")
             # Allow team creation with no agents for now
 
         # --- Instantiate Team Components --- #
-        team_config_params = team_orm.team_config or {}
+        team_config_params = team.team_config or {}
 
         # 1. Team Leader Model (Using refactored method)
         try:
-            leader_model, leader_embedder = self._create_team_leader_model(team_orm.leader_model_config, team_id)
+            leader_model, leader_embedder = self._create_team_leader_model(team.llm_config, team_id)
             if not leader_model:
                 # Error logged in _create_leader_model
                 raise TeamCreationError(f"Failed to create leader model for team {team_id}.")
@@ -622,14 +639,14 @@ class TeamService:
 
         # 2. Team Shared Knowledge (Vector Store)
         try:
-            team_knowledge = await self._create_team_knowledge(team_orm, self.db)
+            team_knowledge = await self._create_team_knowledge(team, self.db)
         except KnowledgeCreationError as kce:
             logger.error(f"Team {team_id}: Failed to create team knowledge: {kce}")
             raise TeamCreationError(f"Failed to create knowledge for team {team_id}: {kce}") from kce
         
         # 3. Team Storage (Using refactored method)
         try:
-            team_storage = self._create_team_storage(team_orm, embedder=leader_embedder) # Pass leader's embedder
+            team_storage = self._create_team_storage(team, embedder=leader_embedder) # Pass leader's embedder
         except StorageCreationError as sce:
             logger.error(f"Team {team_id}: Failed to create team storage: {sce}")
             raise TeamCreationError(f"Failed to create storage for team {team_id}: {sce}") from sce
@@ -637,32 +654,26 @@ class TeamService:
         # --- Create Member Agent Instances --- 
         member_agents: List[Agent] = []
         failed_agent_ids = []
-        if team_orm.agents:
-            member_creation_tasks = []
-            for member_agent_orm in team_orm.agents:
-                # Pass the db session to the agent service method
-                member_creation_tasks.append(
-                    self.agent_service.create_agno_agent_instance(member_agent_orm.id, self.db)
-                )
-        
-            # Execute tasks and handle exceptions
-            results = await asyncio.gather(*member_creation_tasks, return_exceptions=True)
+        if team.agents:
+            member_ids = team.agent_ids
+            # Member configs are already in the snapshot; the AgentService builds any missing
+            # blueprints concurrently without touching the database
+            results = await self.agent_service.create_agno_agent_instances_from_snapshots(team.agents, session_id)
         
             # Process results, separating successes from failures
-            for i, result in enumerate(results):
+            for member_id in member_ids:
+                result = results.get(member_id)
                 if isinstance(result, Agent):
                     member_agents.append(result)
                 elif isinstance(result, Exception):
-                    failed_agent_id = team_orm.agents[i].id
-                    failed_agent_ids.append(str(failed_agent_id))
+                    failed_agent_ids.append(str(member_id))
                     logger.error(f"Failed to create member agent instance for team {team_id}: {result}", exc_info=result)
                 else:
-                    failed_agent_id = team_orm.agents[i].id
-                    failed_agent_ids.append(str(failed_agent_id))
+                    failed_agent_ids.append(str(member_id))
                     logger.warning(f"Got unexpected result type when creating member agent: {type(result)}")
         
             # If any agent creation failed, raise a specific error
-            if len(member_agents) != len(team_orm.agents):
+            if failed_agent_ids:
                 logger.warning(f"Team {team_id}: Not all member agents could be instantiated.")
                 error_msg = f"Failed to instantiate some member agents for team {team_id}. Failed IDs: {', '.join(failed_agent_ids)}"
                 raise AgentCreationError(error_msg)
@@ -670,14 +681,15 @@ class TeamService:
 
         # --- Prepare Agno Team Constructor Args --- 
         team_constructor_args = {
-            "name": team_orm.name,
+            "name": team.name,
+            "session_id": str(session_id),
             "members": member_agents, # List of created Agent instances
             "model": leader_model,
-            "mode": team_orm.mode, # Should be List[str]
+            "mode": team.mode, # Should be List[str]
             "knowledge": team_knowledge,
             "storage": team_storage,
-            "description": team_orm.description,
-            "instructions": team_orm.instructions,
+            "description": team.description,
+            "instructions": team.instructions,
             # Map params from team_config_params to Agno Team args
             'show_tool_calls': team_config_params.get('show_tool_calls', True),
             'markdown': team_config_params.get('markdown', False),
@@ -734,6 +746,6 @@ class TeamService:
 #     team_service: TeamService = Depends(get_team_service)
 # ):
 #     session_id = uuid.uuid4() # Generate a unique session ID for this run
-#     agno_team = await team_service.create_agno_team_instance(team_id)
+#     agno_team = await team_service.create_agno_team_instance(team_id, session_id=session_id)
 #     # result = await agno_team.arun("User query")
 #     # ...
\ No newline at end of file
@@ -1,7 +1,7 @@
 import re
 import os
 import logging
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, Iterator, List, Optional
 
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
@@ -18,6 +18,8 @@ from mindloom.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+TEXT_EXTENSIONS = ['.txt', '.md', '.py', '.json', '.yaml', '.html', '.xml', '.js', '.ts']
+
 # Helper function to convert CamelCase to snake_case
 def camel_to_snake(name):
     name = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
@@ -39,18 +41,15 @@ def get_s3_client(storage_config: Optional[Dict[str, Any]] = None):
                 region_name=storage_config.get('region_name') # Optional
             )
         # Fallback to global settings if bucket config incomplete or absent
-        elif settings.S3_ENDPOINT_URL:
-            logger.debug("Using global S3 configuration from settings.")
-            return boto3.client(
-                's3',
-                endpoint_url=settings.S3_ENDPOINT_URL,
-                aws_access_key_id=settings.S3_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
-                region_name=settings.S3_REGION_NAME # Optional
-            )
-        else:
-            logger.error("No S3 endpoint configuration found in bucket config or global settings.")
-            return None
+        # (no S3_ENDPOINT_URL means the default AWS endpoint, as in ContentBucketService)
+        logger.debug("Using global S3 configuration from settings.")
+        return boto3.client(
+            's3',
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION # Optional
+        )
     except NoCredentialsError:
         logger.error("AWS credentials not found. S3 client cannot be created.")
         return None
@@ -60,52 +59,63 @@ def get_s3_client(storage_config: Optional[Dict[str, Any]] = None):
 
 # --- Helper Function for Document Loading ---
 
-def load_document_from_file(file_path: str, original_filename: Optional[str], metadata_base: Optional[Dict] = None) -> List[Document]:
-    """Loads documents from a local file path using appropriate Langchain loader."""
+def _iter_text_file(file_path: str, original_filename: str) -> Iterator[Document]:
+    """Text files load as a single section; falls back to latin-1 if the file is not UTF-8."""
+    try:
+        yield from list(TextLoader(file_path, encoding='utf-8').lazy_load())
+    except RuntimeError as text_load_error:
+        if not isinstance(text_load_error.__cause__, UnicodeDecodeError):
+            raise
+        logger.warning(f"UTF-8 loading failed for {original_filename}, trying fallback encoding: {text_load_error}")
+        yield from TextLoader(file_path, encoding='latin-1').lazy_load()
+
+
+def iter_document_sections(file_path: str, original_filename: Optional[str], metadata_base: Optional[Dict] = None) -> Iterator[Document]:
+    """
+    Yields a file's sections (PDF pages, document elements, ...) one at a time using the Langchain
+    loader's `lazy_load`, so a large file is never held in memory as a whole. Unsupported file types
+    yield nothing; loader errors propagate to the caller, possibly after some sections were yielded.
+    """
     if not original_filename:
         original_filename = os.path.basename(file_path)
     _, ext = os.path.splitext(original_filename)
     ext = ext.lower()
-    loader = None
-    documents = []
     base_metadata = metadata_base or {}
 
-    try:
-        if ext == '.pdf':
-            loader = PyPDFLoader(file_path)
-        elif ext == '.docx':
-             loader = UnstructuredWordDocumentLoader(file_path)
-        elif ext == '.pptx':
-             loader = UnstructuredPowerPointLoader(file_path)
-        elif ext == '.csv':
-             loader = UnstructuredCSVLoader(file_path, mode="elements") # Or mode="single"
-        elif ext in ['.txt', '.md', '.py', '.json', '.yaml', '.html', '.xml', '.js', '.ts']:
-            try:
-                 loader = TextLoader(file_path, encoding='utf-8')
-            except Exception as text_load_error:
-                 logger.warning(f"UTF-8 loading failed for {original_filename}, trying fallback encoding: {text_load_error}")
-                 # Add fallback encodings if needed, e.g., 'latin-1'
-                 try:
-                     loader = TextLoader(file_path, encoding='latin-1')
-                 except Exception as fallback_load_error:
-                     logger.error(f"Fallback encoding failed for {original_filename}: {fallback_load_error}", exc_info=True)
-                     return [] # Failed to load
-        else:
-            logger.warning(f"No specific Langchain loader for extension '{ext}' in file '{original_filename}'. Skipping.")
-            return [] # Skip unsupported types
+    if ext == '.pdf':
+        sections = PyPDFLoader(file_path).lazy_load()
+    elif ext == '.docx':
+        sections = UnstructuredWordDocumentLoader(file_path).lazy_load()
+    elif ext == '.pptx':
+        sections = UnstructuredPowerPointLoader(file_path).lazy_load()
+    elif ext == '.csv':
+        sections = UnstructuredCSVLoader(file_path, mode="elements").lazy_load() # Or mode="single"
+    elif ext in TEXT_EXTENSIONS:
+        sections = _iter_text_file(file_path, original_filename)
+    else:
+        logger.warning(f"No specific Langchain loader for extension '{ext}' in file '{original_filename}'. Skipping.")
+        return
 
-        if loader:
-            logger.debug(f"Loading document: {original_filename} using {type(loader).__name__}")
-            loaded_docs = loader.load() # Load documents
-            # Merge base metadata with any metadata from the loader
-            for doc in loaded_docs:
-                doc.metadata = {**base_metadata, **doc.metadata}
-            documents.extend(loaded_docs)
-            logger.debug(f"Successfully loaded {len(documents)} document sections from {original_filename}.")
+    logger.debug(f"Streaming document sections of {original_filename} from {file_path}")
+    count = 0
+    for doc in sections:
+        # Merge base metadata with any metadata from the loader
+        doc.metadata = {**base_metadata, **doc.metadata}
+        count += 1
+        yield doc
+    logger.debug(f"Loaded {count} document sections from {original_filename}.")
 
+
+def load_document_from_file(file_path: str, original_filename: Optional[str], metadata_base: Optional[Dict] = None) -> List[Document]:
+    """
+    Loads all sections of a local file into a list, logging (not raising) load errors. Holds the
+    whole file in memory: stream large files with `iter_document_sections` instead.
+    """
+    documents = []
+    try:
+        documents.extend(iter_document_sections(file_path, original_filename, metadata_base))
     except FileNotFoundError:
         logger.error(f"File not found during loading: {file_path}")
     except Exception as e:
         logger.error(f"Error loading document {original_filename} from {file_path}: {e}", exc_info=True)
-
     return documents
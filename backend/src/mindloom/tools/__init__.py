@@ -1 +1,3 @@
+from mindloom.tools.registry import ToolParameter, ToolRegistry, ToolSpec, tool_registry
 
+__all__ = ["ToolParameter", "ToolRegistry", "ToolSpec", "tool_registry"]
@@ -0,0 +1,207 @@
+"""
+Registry of the Agno toolkits agents can use.
+
+Toolkits are discovered once per process: every `Toolkit` subclass defined in a module of
+the `mindloom.tools` package, plus any class published under the `mindloom.tools` entry
+point group by an installed distribution. Constructor signatures are captured at discovery,
+so tool configs can be validated when an agent is saved and resolved with a dictionary
+lookup when it runs.
+"""
+import importlib
+import inspect
+import logging
+import pkgutil
+import threading
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Optional
+
+from agno.tools.toolkit import Toolkit
+
+from mindloom.services.exceptions import ConfigurationError
+
+# Get a logger instance for this module
+logger = logging.getLogger(__name__)
+
+# Entry point group third-party packages use to register toolkits
+ENTRY_POINT_GROUP = "mindloom.tools"
+
+
+@dataclass(frozen=True)
+class ToolParameter:
+    """A keyword argument of a toolkit's constructor."""
+    name: str
+    annotation: Optional[str]
+    required: bool
+    default: Any = None
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A discovered toolkit class and its constructor signature."""
+    name: str
+    cls: type
+    source: str # Module or entry point the toolkit was loaded from
+    description: Optional[str]
+    parameters: Dict[str, ToolParameter] = field(default_factory=dict)
+    accepts_extra_kwargs: bool = False # True when the constructor takes **kwargs
+
+    def validate(self, params: Optional[Dict[str, Any]]) -> None:
+        """
+        Checks `params` against the constructor signature.
+
+        Raises:
+            ConfigurationError: If a parameter is unknown or a required one is missing.
+        """
+        params = params or {}
+        if not isinstance(params, dict):
+            raise ConfigurationError(f"Configuration for tool '{self.name}' must be an object.")
+        if not self.accepts_extra_kwargs:
+            unknown = sorted(set(params) - set(self.parameters))
+            if unknown:
+                raise ConfigurationError(f"Unknown parameter(s) for tool '{self.name}': {', '.join(unknown)}")
+        missing = sorted(p.name for p in self.parameters.values() if p.required and p.name not in params)
+        if missing:
+            raise ConfigurationError(f"Missing required parameter(s) for tool '{self.name}': {', '.join(missing)}")
+
+    def create(self, params: Optional[Dict[str, Any]] = None) -> Toolkit:
+        """Validates `params` and instantiates the toolkit."""
+        self.validate(params)
+        return self.cls(**(params or {}))
+
+
+def _build_spec(cls: type, source: str) -> ToolSpec:
+    """Captures a toolkit's constructor signature."""
+    parameters: Dict[str, ToolParameter] = {}
+    accepts_extra_kwargs = False
+    for name, param in inspect.signature(cls.__init__).parameters.items():
+        if name == "self" or param.kind == param.VAR_POSITIONAL:
+            continue
+        if param.kind == param.VAR_KEYWORD:
+            accepts_extra_kwargs = True
+            continue
+        annotation = None
+        if param.annotation is not param.empty:
+            annotation = param.annotation if isinstance(param.annotation, str) else inspect.formatannotation(param.annotation)
+        required = param.default is param.empty
+        parameters[name] = ToolParameter(
+            name=name,
+            annotation=annotation,
+            required=required,
+            default=None if required else param.default,
+        )
+    doc = inspect.getdoc(cls)
+    # Toolkit's own docstring is not a useful description of a subclass
+    if doc and doc == inspect.getdoc(Toolkit):
+        doc = None
+    return ToolSpec(
+        name=cls.__name__,
+        cls=cls,
+        source=source,
+        description=doc.splitlines()[0] if doc else None,
+        parameters=parameters,
+        accepts_extra_kwargs=accepts_extra_kwargs,
+    )
+
+
+class ToolRegistry:
+    """Process-wide catalog of available toolkits, keyed by class name (e.g. 'GithubTools')."""
+
+    def __init__(self, package: str = __package__):
+        self.package = package
+        self._tools: Dict[str, ToolSpec] = {}
+        self._unavailable: Dict[str, str] = {} # Module or entry point -> reason it could not be loaded
+        self._discovered = False
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type, source: str) -> None:
+        if cls.__name__ in self._tools and self._tools[cls.__name__].cls is not cls:
+            logger.warning(
+                f"Tool '{cls.__name__}' from {source} shadows the one from {self._tools[cls.__name__].source}."
+            )
+        self._tools[cls.__name__] = _build_spec(cls, source)
+
+    def _discover_package(self) -> None:
+        """Registers Toolkit subclasses defined in the modules of the tools package."""
+        package = importlib.import_module(self.package)
+        for module_info in pkgutil.iter_modules(package.__path__):
+            module_name = f"{self.package}.{module_info.name}"
+            if module_name == __name__:
+                continue
+            try:
+                module = importlib.import_module(module_name)
+            except Exception as e:
+                # Usually a missing optional client library, e.g. PyGithub for GithubTools
+                logger.warning(f"Tool module '{module_name}' is unavailable: {e}")
+                self._unavailable[module_name] = str(e)
+                continue
+            for _, obj in inspect.getmembers(module, inspect.isclass):
+                if obj.__module__ == module.__name__ and issubclass(obj, Toolkit) and obj is not Toolkit:
+                    self._register(obj, module_name)
+
+    def _discover_entry_points(self) -> None:
+        """Registers Toolkit subclasses published by installed packages."""
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            source = f"entry point {entry_point.name} ({entry_point.value})"
+            try:
+                obj = entry_point.load()
+            except Exception as e:
+                logger.warning(f"Tool {source} could not be loaded: {e}")
+                self._unavailable[source] = str(e)
+                continue
+            if not (inspect.isclass(obj) and issubclass(obj, Toolkit)):
+                logger.warning(f"Tool {source} is not a Toolkit subclass; skipping.")
+                self._unavailable[source] = "not a Toolkit subclass"
+                continue
+            self._register(obj, source)
+
+    def discover(self) -> None:
+        """Discovers toolkits once; later calls return immediately."""
+        if self._discovered:
+            return
+        with self._lock:
+            if self._discovered:
+                return
+            self._discover_package()
+            self._discover_entry_points()
+            self._discovered = True
+            logger.info(f"Tool registry loaded {len(self._tools)} tool(s): {', '.join(sorted(self._tools)) or 'none'}")
+
+    def get(self, name: str) -> ToolSpec:
+        """
+        Returns the spec of the toolkit called `name`.
+
+        Raises:
+            ConfigurationError: If no such toolkit is available.
+        """
+        self.discover()
+        spec = self._tools.get(name)
+        if spec is None:
+            raise ConfigurationError(f"Unknown tool '{name}'. Available tools: {', '.join(sorted(self._tools)) or 'none'}")
+        return spec
+
+    def validate(self, name: str, params: Optional[Dict[str, Any]] = None) -> ToolSpec:
+        """
+        Checks that `name` is an available toolkit and `params` match its constructor.
+
+        Raises:
+            ConfigurationError: If the tool is unknown or the parameters are invalid.
+        """
+        spec = self.get(name)
+        spec.validate(params)
+        return spec
+
+    def list_tools(self) -> List[ToolSpec]:
+        """All available toolkits, sorted by name."""
+        self.discover()
+        return [self._tools[name] for name in sorted(self._tools)]
+
+    @property
+    def unavailable(self) -> Dict[str, str]:
+        """Tool modules and entry points that failed to load, with the reason."""
+        self.discover()
+        return dict(self._unavailable)
+
+
+# Create a single instance of the registry for the process
+tool_registry = ToolRegistry()
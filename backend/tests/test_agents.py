@@ -0,0 +1,81 @@
+import uuid
+from typing import List
+
+from agno.document import Document
+from agno.knowledge.agent import AgentKnowledge
+from agno.models.openai import OpenAIChat
+from agno.tools.toolkit import Toolkit
+
+from mindloom.services.agents import AgentBlueprint
+
+
+class EchoTools(Toolkit):
+    def __init__(self):
+        super().__init__(name="echo_tools")
+        self.register(self.echo)
+
+    def echo(self, text: str) -> str:
+        """Returns the text it is given."""
+        return text
+
+
+class FixedKnowledge(AgentKnowledge):
+    """Returns the same documents for every search."""
+    documents: List[Document] = []
+
+    def search(self, query, num_documents=None, filters=None):
+        return self.documents[:num_documents]
+
+
+def blueprint(knowledge_bases=()):
+    return AgentBlueprint(
+        agent_id=uuid.uuid4(),
+        version=None,
+        name="helper",
+        agent_params={},
+        model=OpenAIChat(id="gpt-4o", api_key="test-key"),
+        tools=[EchoTools()],
+        knowledge_bases=list(knowledge_bases),
+    )
+
+
+def test_instances_get_their_own_toolkit_functions():
+    template = blueprint()
+
+    first = template.instantiate(uuid.uuid4())
+    second = template.instantiate(uuid.uuid4())
+
+    first_echo = first.tools[0].functions["echo"]
+    second_echo = second.tools[0].functions["echo"]
+    assert first_echo is not second_echo
+    assert first_echo is not template.tools[0].functions["echo"]
+    assert first_echo.parameters is not second_echo.parameters
+    # The copies still call the shared toolkit
+    assert first_echo.entrypoint(text="hi") == "hi"
+
+
+def test_an_agent_with_one_knowledge_base_searches_it_directly():
+    knowledge = FixedKnowledge(documents=[Document(content="one")])
+
+    agent = blueprint([knowledge]).instantiate(uuid.uuid4())
+
+    assert agent.knowledge is knowledge
+    assert agent.retriever is None
+
+
+def test_an_agent_with_several_knowledge_bases_searches_them_all():
+    first = FixedKnowledge(documents=[Document(content="a1"), Document(content="a2")])
+    second = FixedKnowledge(documents=[Document(content="b1")])
+
+    agent = blueprint([first, second]).instantiate(uuid.uuid4())
+    references = agent.get_relevant_docs_from_knowledge("question", num_documents=1)
+
+    assert agent.knowledge is None
+    assert [reference["content"] for reference in references] == ["a1", "b1"]
+
+
+def test_an_agent_without_knowledge_bases_has_no_retriever():
+    agent = blueprint().instantiate(uuid.uuid4())
+
+    assert agent.knowledge is None
+    assert agent.retriever is None
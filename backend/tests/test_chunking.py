@@ -0,0 +1,158 @@
+import pytest
+from agno.document import Document
+
+import mindloom.services.chunking as chunking
+from mindloom.core.config import settings
+from mindloom.services.chunking import (
+    CHARS_PER_TOKEN_ESTIMATE,
+    MarkdownChunking,
+    TokenChunking,
+    chunking_config,
+    count_tokens,
+    create_chunking,
+)
+from mindloom.services.exceptions import ConfigurationError
+
+requires_tiktoken = pytest.mark.skipif(not chunking.TIKTOKEN_AVAILABLE, reason="tiktoken is not installed")
+without_tiktoken = pytest.mark.skipif(chunking.TIKTOKEN_AVAILABLE, reason="tiktoken is installed")
+
+
+# --- chunking_config ---
+
+def test_chunking_config_defaults():
+    assert chunking_config(None) == {
+        "strategy": settings.KNOWLEDGE_CHUNKING_STRATEGY,
+        "chunk_size": settings.KNOWLEDGE_CHUNK_SIZE,
+        "overlap": settings.KNOWLEDGE_CHUNK_OVERLAP,
+    }
+
+
+def test_chunking_config_token_strategy_uses_token_defaults():
+    config = chunking_config({"chunking": {"strategy": "token"}})
+
+    assert config["chunk_size"] == settings.KNOWLEDGE_CHUNK_TOKENS
+    assert config["tokenizer"] == ("cl100k_base" if chunking.TIKTOKEN_AVAILABLE else "estimate")
+
+
+def test_chunking_config_reads_bucket_values():
+    config = chunking_config({"chunking": {"strategy": "markdown", "chunk_size": "2000", "overlap": 200}})
+
+    assert config == {"strategy": "markdown", "chunk_size": 2000, "overlap": 200}
+
+
+@pytest.mark.parametrize("raw", [
+    "markdown",
+    {"strategy": "semantic"},
+    {"chunk_size": "large"},
+    {"chunk_size": 0},
+    {"overlap": -1},
+    {"chunk_size": 100, "overlap": 100},
+])
+def test_chunking_config_rejects_invalid_config(raw):
+    with pytest.raises(ConfigurationError):
+        chunking_config({"chunking": raw})
+
+
+@pytest.mark.parametrize("strategy", ["fixed", "recursive", "token", "markdown"])
+def test_create_chunking(strategy):
+    strategy_config = chunking_config({"chunking": {"strategy": strategy, "chunk_size": 500, "overlap": 50}})
+
+    created = create_chunking(strategy_config)
+
+    assert isinstance(created, chunking.CHUNKING_STRATEGIES[strategy])
+    assert (created.chunk_size, created.overlap) == (500, 50)
+
+
+# --- TokenChunking ---
+
+@pytest.mark.parametrize("chunk_size, overlap", [(0, 0), (10, 10), (10, -1)])
+def test_token_chunking_rejects_invalid_sizes(chunk_size, overlap):
+    with pytest.raises(ValueError):
+        TokenChunking(chunk_size=chunk_size, overlap=overlap)
+
+
+def test_token_chunking_keeps_short_text_whole():
+    chunks = TokenChunking(chunk_size=100).chunk(Document(name="doc", content="A short sentence.", meta_data={"source": "s3"}))
+
+    assert [chunk.content for chunk in chunks] == ["A short sentence."]
+    assert chunks[0].meta_data["source"] == "s3"
+
+
+@requires_tiktoken
+def test_token_chunking_windows_with_overlap():
+    text = " ".join(f"word{index}" for index in range(500))
+    tokenizer = chunking.get_tokenizer()
+
+    chunks = TokenChunking(chunk_size=50, overlap=10).chunk(Document(content=text))
+
+    windows = [tokenizer.encode(chunk.content) for chunk in chunks]
+    assert all(len(window) <= 50 for window in windows)
+    assert all(previous[-10:] == current[:10] for previous, current in zip(windows, windows[1:]))
+    assert [chunk.meta_data["chunk"] for chunk in chunks] == list(range(1, len(chunks) + 1))
+
+
+@without_tiktoken
+def test_token_chunking_approximates_tokens_with_characters():
+    text = "\n".join(f"Sentence number {index} of the document." for index in range(200))
+
+    chunks = TokenChunking(chunk_size=50).chunk(Document(content=text))
+
+    assert len(chunks) > 1
+    assert all(len(chunk.content) <= 50 * CHARS_PER_TOKEN_ESTIMATE for chunk in chunks)
+
+
+def test_count_tokens_counts_more_for_longer_text():
+    assert 0 < count_tokens("word") < count_tokens("word " * 100)
+
+
+# --- MarkdownChunking ---
+
+MARKDOWN = """# Guide
+Intro paragraph.
+
+## Install
+Run the installer.
+
+```bash
+# not a heading
+make install
+```
+
+## Usage
+Call the API.
+"""
+
+
+def test_markdown_chunking_merges_small_sections_and_records_headings():
+    chunks = MarkdownChunking(chunk_size=1000).chunk(Document(content=MARKDOWN))
+
+    assert len(chunks) == 1
+    assert chunks[0].content == MARKDOWN.strip()
+    assert chunks[0].meta_data["headings"] == "Guide"
+
+
+def test_markdown_chunking_splits_at_headings():
+    chunks = MarkdownChunking(chunk_size=80).chunk(Document(content=MARKDOWN))
+
+    assert [chunk.meta_data.get("headings") for chunk in chunks] == ["Guide", "Guide > Install", "Guide > Usage"]
+    # Headings inside code fences do not start a section
+    assert "# not a heading" in chunks[1].content
+
+
+def test_markdown_chunking_splits_large_sections():
+    body = "\n".join(f"Line {index} of a long section." for index in range(100))
+    content = f"# Big\n{body}\n# Small\nTail."
+
+    chunks = MarkdownChunking(chunk_size=300).chunk(Document(content=content))
+
+    big = [chunk for chunk in chunks if chunk.meta_data.get("headings") == "Big"]
+    assert len(big) > 1
+    assert all(len(chunk.content) <= 300 for chunk in chunks)
+    assert chunks[-1].meta_data["headings"] == "Small"
+
+
+def test_markdown_chunking_without_headings():
+    chunks = MarkdownChunking(chunk_size=1000).chunk(Document(content="Just text.\nMore text."))
+
+    assert [chunk.content for chunk in chunks] == ["Just text.\nMore text."]
+    assert "headings" not in chunks[0].meta_data
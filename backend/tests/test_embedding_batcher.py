@@ -0,0 +1,194 @@
+import httpx
+import openai
+import pytest
+from agno.embedder.openai import OpenAIEmbedder
+
+import mindloom.services.embedding_batcher as embedding_batcher
+from mindloom.core.config import settings
+from mindloom.services.embedding_batcher import MIN_TOKENS_PER_SECOND, AdaptiveRateLimiter, EmbeddingBatcher
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_batcher.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(embedding_batcher.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def batcher(monkeypatch):
+    # One token per character keeps the packing arithmetic readable
+    monkeypatch.setattr(embedding_batcher, "count_tokens", len)
+    batcher = EmbeddingBatcher(OpenAIEmbedder(api_key="test-key"))
+    batcher.max_items = 3
+    batcher.max_tokens = 10
+    return batcher
+
+
+def rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return openai.RateLimitError("Rate limited", response=response, body=None)
+
+
+# --- EmbeddingBatcher.pack ---
+
+def test_pack_empty(batcher):
+    assert batcher.pack([]) == []
+
+
+def test_pack_respects_item_limit(batcher):
+    assert batcher.pack(["a", "b", "c", "d", "e"]) == [([0, 1, 2], 3), ([3, 4], 2)]
+
+
+def test_pack_respects_token_limit(batcher):
+    assert batcher.pack(["aaaa", "bbbb", "cccc"]) == [([0, 1], 8), ([2], 4)]
+
+
+def test_pack_sends_oversized_text_alone(batcher):
+    assert batcher.pack(["a", "x" * 25, "b"]) == [([0], 1), ([1], 25), ([2], 1)]
+
+
+def test_embed_with_zero_max_concurrency(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "count_tokens", len)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_CONCURRENCY", 0)
+    batcher = EmbeddingBatcher(OpenAIEmbedder(api_key="test-key-zero-concurrency"))
+    batcher.max_items = 1
+    monkeypatch.setattr(batcher, "_send", lambda texts, tokens: [[float(len(text))] for text in texts])
+
+    assert batcher.embed(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+
+
+# --- EmbeddingBatcher._send ---
+
+class FakeEmbeddings:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise rate_limit_error({"retry-after": "2"})
+        data = [type("Item", (), {"index": index, "embedding": [float(index)]}) for index in range(len(params["input"]))]
+        return type("Response", (), {"data": list(reversed(data))})
+
+
+@pytest.fixture
+def fake_client(batcher):
+    def install(failures):
+        embeddings = FakeEmbeddings(failures)
+        batcher._client = type("Client", (), {"embeddings": embeddings})
+        batcher.limits = embedding_batcher._DeploymentLimits()
+        return embeddings
+    return install
+
+
+def test_send_retries_rate_limited_requests(batcher, fake_client, clock):
+    embeddings = fake_client(failures=2)
+    batcher.max_retries = 3
+
+    assert batcher._send(["a", "b"], 2) == [[0.0], [1.0]]
+    assert embeddings.calls == 3
+    assert clock.sleeps.count(2.0) >= 2
+
+
+def test_send_raises_after_max_retries(batcher, fake_client, clock):
+    embeddings = fake_client(failures=5)
+    batcher.max_retries = 2
+
+    with pytest.raises(openai.RateLimitError):
+        batcher._send(["a"], 1)
+    assert embeddings.calls == 3
+
+
+# --- AdaptiveRateLimiter ---
+
+def test_limiter_without_ceiling_does_not_pace(clock):
+    limiter = AdaptiveRateLimiter()
+
+    for _ in range(100):
+        limiter.acquire(10000)
+
+    assert limiter.rate is None
+    assert clock.sleeps == []
+
+
+def test_limiter_starts_at_half_the_observed_rate_after_a_429(clock):
+    limiter = AdaptiveRateLimiter()
+    limiter.acquire(60000) # 1000 tokens/s over the last minute
+
+    delay = limiter.on_rate_limited(retry_after=5.0)
+
+    assert limiter.rate == 500
+    assert delay == 5.0
+
+
+def test_limiter_halves_on_each_429_down_to_the_floor(clock):
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60000)
+
+    rates = []
+    for _ in range(6):
+        limiter.on_rate_limited(retry_after=0)
+        rates.append(limiter.rate)
+
+    assert rates == [500, 250, 125, MIN_TOKENS_PER_SECOND, MIN_TOKENS_PER_SECOND, MIN_TOKENS_PER_SECOND]
+
+
+def test_limiter_backs_off_exponentially_without_retry_after(clock):
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60000)
+
+    delays = [limiter.on_rate_limited(retry_after=None) for _ in range(4)]
+    limiter.on_success()
+
+    assert delays == [1, 2, 4, 8]
+    assert limiter.on_rate_limited(retry_after=None) == 1
+
+
+def test_limiter_recovers_up_to_the_ceiling(clock):
+    limiter = AdaptiveRateLimiter(tokens_per_minute=6000)
+    limiter.rate = 50.0
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(52.5)
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 100
+
+
+def test_limiter_paces_requests_to_its_rate(clock):
+    limiter = AdaptiveRateLimiter(tokens_per_minute=6000) # 100 tokens/s
+    started = clock.now
+
+    for _ in range(5):
+        limiter.acquire(100)
+
+    # The bucket starts empty, so each second's allowance is waited for
+    assert clock.now - started == pytest.approx(5.0)
+
+
+def test_limiter_waits_out_the_pause_after_a_429(clock):
+    limiter = AdaptiveRateLimiter(tokens_per_minute=600000)
+    limiter.on_rate_limited(retry_after=30.0)
+    paused_at = clock.now
+
+    limiter.acquire(1)
+
+    assert clock.now - paused_at >= 30.0
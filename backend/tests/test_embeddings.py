@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from typing import List
+
+import pytest
+from agno.embedder.azure_openai import AzureOpenAIEmbedder
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+
+from mindloom.services.embeddings import BatchedEmbedder, PrecomputedEmbedder, embed_texts, embedder_identity
+
+
+@dataclass
+class RecordingEmbedder(Embedder):
+    """Embeds a text as [len(text)] and records what it was asked to embed."""
+    dimensions: int = 1
+    calls: List[str] = field(default_factory=list)
+
+    def get_embedding_and_usage(self, text):
+        self.calls.append(text)
+        return [float(len(text))], {"tokens": len(text)}
+
+    def get_embedding(self, text):
+        return self.get_embedding_and_usage(text)[0]
+
+
+# --- embedder_identity ---
+
+def test_embedder_identity_names_provider_model_and_dimensions():
+    embedder = OpenAIEmbedder(id="text-embedding-3-small", dimensions=512, api_key="test-key")
+
+    assert embedder_identity(embedder) == "OpenAIEmbedder:text-embedding-3-small:512"
+
+
+def test_embedder_identity_prefers_azure_deployment():
+    embedder = AzureOpenAIEmbedder(azure_deployment="team-embeddings", api_key="test-key", azure_endpoint="https://example.openai.azure.com")
+
+    assert embedder_identity(embedder) == f"AzureOpenAIEmbedder:team-embeddings:{embedder.dimensions}@https://example.openai.azure.com"
+
+
+def test_embedder_identity_distinguishes_endpoints():
+    first = AzureOpenAIEmbedder(azure_deployment="team-embeddings", api_key="test-key", azure_endpoint="https://east.openai.azure.com")
+    second = AzureOpenAIEmbedder(azure_deployment="team-embeddings", api_key="test-key", azure_endpoint="https://west.openai.azure.com")
+
+    assert embedder_identity(first) != embedder_identity(second)
+
+
+def test_embedder_identity_includes_openai_base_url():
+    default = OpenAIEmbedder(id="text-embedding-3-small", api_key="test-key")
+    proxied = OpenAIEmbedder(id="text-embedding-3-small", api_key="test-key", base_url="https://proxy.example.com/v1/")
+
+    assert embedder_identity(proxied) == f"{embedder_identity(default)}@https://proxy.example.com/v1"
+
+
+def test_embedder_identity_ignores_credentials():
+    first = OpenAIEmbedder(id="text-embedding-3-small", api_key="key-one")
+    second = OpenAIEmbedder(id="text-embedding-3-small", api_key="key-two")
+
+    assert embedder_identity(first) == embedder_identity(second)
+
+
+def test_embedder_identity_distinguishes_models_and_dimensions():
+    identities = {
+        embedder_identity(OpenAIEmbedder(id="text-embedding-3-small", dimensions=1536, api_key="test-key")),
+        embedder_identity(OpenAIEmbedder(id="text-embedding-3-small", dimensions=512, api_key="test-key")),
+        embedder_identity(OpenAIEmbedder(id="text-embedding-3-large", dimensions=1536, api_key="test-key")),
+    }
+
+    assert len(identities) == 3
+
+
+def test_embedder_identity_looks_through_wrappers():
+    embedder = OpenAIEmbedder(id="text-embedding-3-small", api_key="test-key")
+    wrapped = PrecomputedEmbedder(embedder=BatchedEmbedder(embedder=embedder))
+
+    assert embedder_identity(wrapped) == embedder_identity(embedder)
+
+
+# --- PrecomputedEmbedder ---
+
+def test_precomputed_embedder_returns_registered_vectors():
+    fallback = RecordingEmbedder()
+    embedder = PrecomputedEmbedder(embedder=fallback)
+    embedder.add("chunk", ([0.5, 0.25], None))
+
+    assert embedder.get_embedding("chunk") == [0.5, 0.25]
+    assert embedder.get_embedding_and_usage("chunk") == ([0.5, 0.25], None)
+    assert fallback.calls == []
+
+
+def test_precomputed_embedder_falls_back_for_other_texts():
+    fallback = RecordingEmbedder()
+    embedder = PrecomputedEmbedder(embedder=fallback)
+
+    assert embedder.get_embedding("a query") == [7.0]
+    assert fallback.calls == ["a query"]
+
+
+def test_precomputed_embedder_discard_forgets_vectors():
+    fallback = RecordingEmbedder()
+    embedder = PrecomputedEmbedder(embedder=fallback)
+    embedder.add("chunk", ([0.5], None))
+
+    embedder.discard(["chunk", "never added"])
+
+    assert embedder.get_embedding("chunk") == [5.0]
+    assert fallback.calls == ["chunk"]
+
+
+def test_precomputed_embedder_without_fallback_raises():
+    with pytest.raises(ValueError):
+        PrecomputedEmbedder().get_embedding("unknown")
+
+
+def test_precomputed_embedder_takes_the_fallbacks_dimensions():
+    assert PrecomputedEmbedder(embedder=RecordingEmbedder(dimensions=384)).dimensions == 384
+
+
+# --- embed_texts ---
+
+def test_embed_texts_embeds_one_by_one_for_other_embedders():
+    fallback = RecordingEmbedder()
+
+    assert embed_texts(fallback, ["a", "bb"]) == [([1.0], {"tokens": 1}), ([2.0], {"tokens": 2})]
+    assert embed_texts(fallback, []) == []
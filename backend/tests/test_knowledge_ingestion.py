@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+
+import pytest
+
+import mindloom.app.models # noqa: F401 Configures every mapper the ingestion's ORM rows relate to
+import mindloom.services.knowledge_ingestion as knowledge_ingestion
+from mindloom.services.knowledge_ingestion import KnowledgeIngestionService
+from mindloom.services.team_graph import ContentBucketSnapshot
+
+BUCKET_ID = uuid.uuid4()
+
+
+class FakeSession:
+    """Records the statements executed and the commits."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+def bucket(config):
+    return ContentBucketSnapshot(
+        id=BUCKET_ID,
+        name="docs",
+        description=None,
+        bucket_type="S3",
+        config=config,
+        embedder_config={"provider": "openai", "model": "text-embedding-3-small"},
+        vector_db_config={"provider": "pgvector", "table_name": "docs"},
+        updated_at=None,
+    )
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    """Ingests a bucket with the given config over a fake session, recording the sync's `force`."""
+    forced = []
+    loaded = {}
+
+    class FakeLoader:
+        def __init__(self, db):
+            pass
+
+        async def load_buckets(self, bucket_ids):
+            return {BUCKET_ID: loaded["bucket"]}
+
+    class FakeSyncEngine:
+        def __init__(self, db, vector_store):
+            pass
+
+        async def sync(self, bucket, force=False):
+            forced.append(force)
+
+    monkeypatch.setattr(knowledge_ingestion, "TeamGraphLoader", FakeLoader)
+    monkeypatch.setattr(knowledge_ingestion, "BucketSyncEngine", FakeSyncEngine)
+
+    def run(config):
+        loaded["bucket"] = bucket(config)
+        session = FakeSession()
+        service = KnowledgeIngestionService(session)
+        monkeypatch.setattr(service.agent_service, "create_bucket_vector_store", lambda bucket: object())
+        assert asyncio.run(service.ingest_bucket(BUCKET_ID)) is True
+        return session
+
+    run.forced = forced
+    return run
+
+
+def test_ingestion_is_incremental_by_default(ingest):
+    session = ingest({"bucket_name": "mindloom-test"})
+
+    assert ingest.forced == [False]
+    assert session.statements == []
+
+
+def test_recreate_on_load_forces_one_rebuild_and_is_cleared(ingest):
+    session = ingest({"bucket_name": "mindloom-test", "recreate_on_load": True})
+
+    assert ingest.forced == [True]
+    [statement] = session.statements
+    assert statement.is_update
+    assert "config - " in str(statement)
+    assert statement.compile().params["config_1"] == "recreate_on_load"
+    assert session.commits == 1
@@ -0,0 +1,339 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+import mindloom.app.models # noqa: F401 Configures every mapper the sync's ORM rows relate to
+import mindloom.services.knowledge_sync as knowledge_sync
+from mindloom.app.models.file_metadata import FileMetadataORM
+from mindloom.app.models.knowledge_sync import BucketSyncStateORM
+from mindloom.services.knowledge_sync import (
+    STATUS_DELETED,
+    STATUS_ERROR,
+    STATUS_PENDING,
+    STATUS_PROCESSED,
+    BucketSyncEngine,
+    ExistingChunk,
+)
+from mindloom.services.team_graph import ContentBucketSnapshot
+
+BUCKET_ID = uuid.uuid4()
+MODIFIED = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeS3:
+    """Lists a fixed set of objects: {key: (etag, size)}."""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        contents = [
+            {"Key": key, "ETag": f'"{etag}"', "Size": size, "LastModified": MODIFIED}
+            for key, (etag, size) in self.objects.items()
+            if key.startswith(Prefix)
+        ]
+        # Two pages, like a real listing of a larger prefix
+        yield {"Contents": contents[:1]}
+        yield {"Contents": contents[1:]}
+
+    def download_file(self, bucket_name, key, path):
+        if key not in self.objects:
+            raise FileNotFoundError(key)
+        with open(path, "w") as f:
+            f.write(key)
+
+
+class FakeVectorStore:
+    """Records the calls the sync makes on its vector store."""
+
+    def __init__(self):
+        self.embedder = None
+        self.calls = []
+
+    def create(self):
+        self.calls.append("create")
+
+    def delete(self):
+        self.calls.append("delete")
+        return True
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class FakeSession:
+    """Serves the bucket's file rows (newest first) and sync state, and records writes."""
+
+    def __init__(self, files, state=None):
+        self.files = files
+        self.state = state
+        self.added = []
+        self.statements = []
+        self.commits = 0
+        self.committing = False
+
+    async def get(self, model, key):
+        assert model is BucketSyncStateORM
+        return self.state
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return FakeResult(self.files if statement.is_select else [])
+
+    async def commit(self):
+        # Yields like a real commit, so other tasks can run while it is in progress
+        self.committing = True
+        await asyncio.sleep(0)
+        self.committing = False
+        self.commits += 1
+
+    async def flush(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def bucket():
+    return ContentBucketSnapshot(
+        id=BUCKET_ID,
+        name="docs",
+        description=None,
+        bucket_type="S3",
+        config={"bucket_name": "mindloom-test", "prefix": "docs"},
+        embedder_config={"provider": "openai", "model": "text-embedding-3-small"},
+        vector_db_config={"provider": "pgvector", "table_name": "docs"},
+        updated_at=None,
+    )
+
+
+def file_row(key, etag="etag-1", status=STATUS_PROCESSED, created_at=datetime(2024, 1, 1), deleted_at=None):
+    return FileMetadataORM(
+        id=uuid.uuid4(),
+        filename=key.rsplit("/", 1)[-1],
+        s3_bucket="mindloom-test",
+        s3_key=key,
+        size_bytes=10,
+        last_modified=datetime(2024, 1, 1),
+        bucket_id=BUCKET_ID,
+        processing_status=status,
+        s3_etag=etag,
+        content_hash="hash",
+        created_at=created_at,
+        deleted_at=deleted_at,
+    )
+
+
+@pytest.fixture
+def sync_engine(monkeypatch):
+    """
+    Builds an engine over fake S3, DB and vector store whose pipeline and tombstoning only
+    record what they are given.
+    """
+    recorded = {}
+
+    def build(objects, files, state=None):
+        session = FakeSession(files, state)
+        vector_store = FakeVectorStore()
+        engine = BucketSyncEngine(session, vector_store, s3_client=FakeS3(objects))
+
+        async def run_pipeline(bucket, bucket_name, candidates, stored_chunks, rebuild):
+            recorded["candidates"] = {file.s3_key: s3_object for file, s3_object in candidates}
+            recorded["stored_chunks"] = stored_chunks
+            recorded["rebuild"] = rebuild
+
+        async def tombstone_files(bucket, file_ids, now):
+            recorded["tombstoned"] = list(file_ids)
+            return 0
+
+        async def load_chunks(file_ids):
+            return {file_id: {} for file_id in file_ids}
+
+        monkeypatch.setattr(engine, "_run_pipeline", run_pipeline)
+        monkeypatch.setattr(engine, "_tombstone_files", tombstone_files)
+        monkeypatch.setattr(engine, "_load_chunks", load_chunks)
+        return engine, session, vector_store
+
+    build.recorded = recorded
+    return build
+
+
+def synced_state(engine):
+    return BucketSyncStateORM(bucket_id=BUCKET_ID, config_hash=engine._config_hash(bucket()))
+
+
+def test_first_sync_rebuilds_and_recreates_the_store_after_dropping_it(sync_engine):
+    objects = {"docs/a.pdf": ("etag-a", 10)}
+    engine, session, vector_store = sync_engine(objects, files=[])
+
+    report = asyncio.run(engine.sync(bucket()))
+
+    assert sync_engine.recorded["rebuild"] is True
+    # delete() drops the table or collection, so it must come before create()
+    assert vector_store.calls == ["delete", "create"]
+    assert report.files_seen == 1
+    # The S3-only key got a pending metadata row, and is synced
+    new_rows = [obj for obj in session.added if isinstance(obj, FileMetadataORM)]
+    assert [(row.s3_key, row.processing_status) for row in new_rows] == [("docs/a.pdf", STATUS_PENDING)]
+    assert list(sync_engine.recorded["candidates"]) == ["docs/a.pdf"]
+    state = next(obj for obj in session.added if isinstance(obj, BucketSyncStateORM))
+    assert state.config_hash == engine._config_hash(bucket())
+    assert state.last_error is None
+
+
+def test_incremental_sync_only_checks_changed_files(sync_engine):
+    unchanged = file_row("docs/unchanged.pdf", etag="etag-1")
+    changed = file_row("docs/changed.pdf", etag="etag-old")
+    failed = file_row("docs/failed.pdf", etag="etag-1", status=STATUS_ERROR)
+    objects = {
+        "docs/unchanged.pdf": ("etag-1", 10),
+        "docs/changed.pdf": ("etag-new", 10),
+        "docs/failed.pdf": ("etag-1", 10),
+        "docs/new.pdf": ("etag-1", 10),
+    }
+    engine, session, vector_store = sync_engine(objects, files=[unchanged, changed, failed])
+    session.state = synced_state(engine)
+
+    asyncio.run(engine.sync(bucket()))
+
+    recorded = sync_engine.recorded
+    assert recorded["rebuild"] is False
+    assert vector_store.calls == ["create"]
+    assert set(recorded["candidates"]) == {"docs/changed.pdf", "docs/failed.pdf", "docs/new.pdf"}
+    assert recorded["candidates"]["docs/changed.pdf"].etag == "etag-new"
+    assert recorded["tombstoned"] == []
+
+
+def test_force_sync_checks_every_file(sync_engine):
+    files = [file_row("docs/a.pdf"), file_row("docs/b.pdf")]
+    objects = {"docs/a.pdf": ("etag-1", 10), "docs/b.pdf": ("etag-1", 10)}
+    engine, session, vector_store = sync_engine(objects, files=files)
+    session.state = synced_state(engine)
+
+    asyncio.run(engine.sync(bucket(), force=True))
+
+    assert sync_engine.recorded["rebuild"] is True
+    assert set(sync_engine.recorded["candidates"]) == {"docs/a.pdf", "docs/b.pdf"}
+    assert sync_engine.recorded["stored_chunks"] == {}
+
+
+def test_sync_tombstones_files_gone_from_s3_and_superseded_rows(sync_engine):
+    kept = file_row("docs/kept.pdf", created_at=datetime(2024, 2, 1))
+    superseded = file_row("docs/kept.pdf", created_at=datetime(2024, 1, 1))
+    gone = file_row("docs/gone.pdf")
+    already_tombstoned = file_row("docs/old.pdf", status=STATUS_DELETED, deleted_at=datetime(2024, 1, 2))
+    objects = {"docs/kept.pdf": ("etag-1", 10)}
+    # Rows come newest first, as the sync's query orders them
+    engine, session, _ = sync_engine(objects, files=[kept, superseded, gone, already_tombstoned])
+    session.state = synced_state(engine)
+
+    report = asyncio.run(engine.sync(bucket()))
+
+    assert set(sync_engine.recorded["tombstoned"]) == {superseded.id, gone.id}
+    assert sync_engine.recorded["candidates"] == {}
+    assert report.files_deleted == 2
+
+
+def test_sync_skips_directory_markers_and_empty_objects(sync_engine):
+    objects = {"docs/folder/": ("etag-dir", 0), "docs/empty.txt": ("etag-empty", 0), "docs/a.pdf": ("etag-a", 10)}
+    engine, session, _ = sync_engine(objects, files=[])
+
+    report = asyncio.run(engine.sync(bucket()))
+
+    assert report.files_seen == 1
+    assert list(sync_engine.recorded["candidates"]) == ["docs/a.pdf"]
+
+
+def test_failed_sync_is_recorded_and_reraised(sync_engine, monkeypatch):
+    engine, session, _ = sync_engine({"docs/a.pdf": ("etag-a", 10)}, files=[])
+    state = BucketSyncStateORM(bucket_id=BUCKET_ID)
+    session.state = state
+
+    async def failing_pipeline(*args):
+        raise RuntimeError("vector store unavailable")
+
+    monkeypatch.setattr(engine, "_run_pipeline", failing_pipeline)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.sync(bucket()))
+    assert state.last_error == "vector store unavailable"
+    assert state.config_hash is None
+
+
+def test_tombstone_files_removes_chunks_and_marks_files_deleted(monkeypatch):
+    session = FakeSession(files=[])
+    engine = BucketSyncEngine(session, FakeVectorStore(), s3_client=FakeS3({}))
+    file_ids = [uuid.uuid4(), uuid.uuid4()]
+    stored = {
+        file_ids[0]: {"h1": ExistingChunk(uuid.uuid4(), "h1", "doc-1"), "h2": ExistingChunk(uuid.uuid4(), "h2", "doc-2")},
+        file_ids[1]: {"h3": ExistingChunk(uuid.uuid4(), "h3", "doc-3")},
+    }
+    deleted_docs = []
+
+    async def load_chunks(ids):
+        return {file_id: stored[file_id] for file_id in ids}
+
+    monkeypatch.setattr(engine, "_load_chunks", load_chunks)
+    monkeypatch.setattr(knowledge_sync, "delete_vector_documents", lambda store, doc_ids: deleted_docs.extend(doc_ids))
+
+    count = asyncio.run(engine._tombstone_files(bucket(), file_ids, datetime(2024, 3, 2)))
+
+    assert count == 3
+    assert sorted(deleted_docs) == ["doc-1", "doc-2", "doc-3"]
+    kinds = [(statement.is_delete, statement.is_update) for statement in session.statements]
+    assert kinds == [(True, False), (False, True)]
+    update_values = session.statements[1].compile().params
+    assert update_values["processing_status"] == STATUS_DELETED
+    assert update_values["deleted_at"] == datetime(2024, 3, 2)
+
+
+def test_tombstone_files_without_files_does_nothing(monkeypatch):
+    session = FakeSession(files=[])
+    engine = BucketSyncEngine(session, FakeVectorStore(), s3_client=FakeS3({}))
+
+    assert asyncio.run(engine._tombstone_files(bucket(), [], datetime(2024, 3, 2))) == 0
+    assert session.statements == []
+
+
+def test_pipeline_records_skipped_files_only_between_commits(monkeypatch):
+    # Unchanged files (their content hash is their key's) and files that fail to download
+    unchanged = [file_row(f"docs/{index}.pdf") for index in range(20)]
+    for row in unchanged:
+        row.content_hash = knowledge_sync.hash_text(row.s3_key)
+    missing = [file_row(f"docs/missing-{index}.pdf") for index in range(20)]
+    s3 = FakeS3({row.s3_key: ("etag-1", 10) for row in unchanged})
+    session = FakeSession(files=[])
+    engine = BucketSyncEngine(session, FakeVectorStore(), s3_client=s3, concurrency=4)
+    monkeypatch.setattr(knowledge_sync, "_COMMIT_FILE_COUNT", 1)
+    record = engine._record
+
+    def checked_record(work):
+        assert not session.committing, "a file was recorded while the session was committing"
+        record(work)
+
+    monkeypatch.setattr(engine, "_record", checked_record)
+    candidates = [(row, knowledge_sync.S3Object(row.s3_key, "etag-1", 10, MODIFIED)) for row in unchanged + missing]
+
+    asyncio.run(engine._run_pipeline(bucket(), "mindloom-test", candidates, {}, rebuild=False))
+
+    assert all(row.processing_status == STATUS_PROCESSED for row in unchanged)
+    assert all(row.processing_status == STATUS_ERROR for row in missing)
+    assert engine._report.files_failed == len(missing)
+    assert session.commits == len(candidates)
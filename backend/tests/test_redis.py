@@ -0,0 +1,54 @@
+import asyncio
+import uuid
+
+import pytest
+
+import mindloom.services.redis as redis_service
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Replaces the key and stream helpers enqueue_ingestion uses with an in-memory store."""
+    store = {"keys": {}, "stream": []}
+
+    async def set_if_absent(key, value, ex=None):
+        if key in store["keys"]:
+            return False
+        store["keys"][key] = value
+        return True
+
+    async def delete(key):
+        return 1 if store["keys"].pop(key, None) is not None else 0
+
+    async def xadd(stream, fields):
+        store["stream"].append(fields)
+        return f"{len(store['stream'])}-0"
+
+    monkeypatch.setattr(redis_service, "set_if_absent", set_if_absent)
+    monkeypatch.setattr(redis_service, "delete", delete)
+    monkeypatch.setattr(redis_service, "xadd", xadd)
+    return store
+
+
+def test_enqueue_ingestion_queues_a_bucket_once_while_pending(fake_redis):
+    bucket_id = uuid.uuid4()
+
+    first = asyncio.run(redis_service.enqueue_ingestion(bucket_id, "upload"))
+    second = asyncio.run(redis_service.enqueue_ingestion(bucket_id, "upload"))
+
+    assert first == "1-0"
+    assert second is None
+    assert len(fake_redis["stream"]) == 1
+
+
+def test_enqueue_ingestion_clears_the_pending_marker_when_queueing_fails(fake_redis, monkeypatch):
+    bucket_id = uuid.uuid4()
+
+    async def failing_xadd(stream, fields):
+        raise ConnectionError("stream unavailable")
+
+    monkeypatch.setattr(redis_service, "xadd", failing_xadd)
+    with pytest.raises(ConnectionError):
+        asyncio.run(redis_service.enqueue_ingestion(bucket_id, "upload"))
+
+    assert redis_service.ingestion_pending_key(bucket_id) not in fake_redis["keys"]
@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from mindloom.services.runs import decode_keyset_cursor, encode_keyset_cursor
+
+
+def test_keyset_cursor_round_trip():
+    timestamp = datetime(2024, 5, 17, 12, 30, 45, 123456)
+    row_id = uuid.uuid4()
+
+    cursor = encode_keyset_cursor(timestamp, row_id)
+
+    assert decode_keyset_cursor(cursor) == (timestamp, row_id)
+
+
+def test_keyset_cursor_is_url_safe():
+    cursor = encode_keyset_cursor(datetime(2024, 1, 1), uuid.uuid4())
+
+    assert all(char.isalnum() or char in "-_=" for char in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "bm90LWEtY3Vyc29y", encode_keyset_cursor(datetime(2024, 1, 1), uuid.uuid4())[:-8]])
+def test_decode_keyset_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_keyset_cursor(cursor)
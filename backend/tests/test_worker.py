@@ -0,0 +1,170 @@
+import asyncio
+import uuid
+
+import pytest
+
+import mindloom.execution.worker as worker_module
+import mindloom.services.redis as redis_service
+from mindloom.app.models.run import RunStatus
+from mindloom.execution.stream_consumer import StreamQueue
+from mindloom.execution.worker import RunWorker
+
+
+class FakeRunQueue:
+    """Serves queued and stale run entries like the run queue stream, and records acks."""
+
+    def __init__(self, entries, stale=(), deliveries=None):
+        self.entries = list(entries)
+        self.stale = list(stale)
+        self.deliveries = deliveries or {}
+        self.acked = []
+        self.on_empty = None
+
+    def stream_queue(self):
+        return StreamQueue(
+            name="run queue",
+            claim=self.claim,
+            reclaim=self.reclaim,
+            heartbeat=self.heartbeat,
+            delivery_count=self.delivery_count,
+            ack=self.ack,
+        )
+
+    async def claim(self, consumer, count, block_ms):
+        if self.entries:
+            return [self.entries.pop(0)]
+        if self.on_empty:
+            self.on_empty()
+        await asyncio.sleep(0.01) # Stands in for the blocking read
+        return []
+
+    async def reclaim(self, consumer, min_idle_ms, count):
+        return [self.stale.pop(0)] if self.stale else []
+
+    async def heartbeat(self, consumer, entry_ids):
+        pass
+
+    async def delivery_count(self, entry_id):
+        return self.deliveries.get(entry_id, 1)
+
+    async def ack(self, entry_id):
+        self.acked.append(entry_id)
+
+
+def run_entry(entry_id, run_id=None, **overrides):
+    payload = {
+        "run_id": str(run_id or uuid.uuid4()),
+        "runnable_id": str(uuid.uuid4()),
+        "runnable_type": "agent",
+        "input_data": {"input": "hello"},
+    }
+    payload.update(overrides)
+    return entry_id, payload
+
+
+@pytest.fixture
+def run_worker(monkeypatch):
+    """Builds a RunWorker over a fake run queue that stops once the queue is empty."""
+    async def noop():
+        pass
+
+    monkeypatch.setattr(redis_service, "initialize_async", noop)
+    monkeypatch.setattr(redis_service, "close", noop)
+    monkeypatch.setattr(worker_module.llm_client_pool, "close", noop)
+
+    def build(queue, concurrency=2):
+        worker = RunWorker(concurrency=concurrency, consumer_name="test-worker")
+        worker.queue = queue.stream_queue()
+        queue.on_empty = worker.stop
+        return worker
+
+    return build
+
+
+def test_worker_executes_runs_concurrently_up_to_its_limit(run_worker, monkeypatch):
+    queue = FakeRunQueue([run_entry(f"{index}-0") for index in range(5)])
+    executed = []
+    running = 0
+    peak = 0
+
+    async def execute_run(run_id, runnable_id, runnable_type, input_data, redelivered=False):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        executed.append((runnable_type, input_data, redelivered))
+
+    monkeypatch.setattr(worker_module, "execute_run", execute_run)
+
+    asyncio.run(run_worker(queue, concurrency=2).run())
+
+    assert len(executed) == 5
+    assert peak == 2
+    assert all(call == ("agent", {"input": "hello"}, False) for call in executed)
+    # Every run is acknowledged once it has finished, including those in flight at stop
+    assert sorted(queue.acked) == [f"{index}-0" for index in range(5)]
+
+
+def test_worker_flags_reclaimed_runs_as_redelivered(run_worker, monkeypatch):
+    queue = FakeRunQueue([], stale=[run_entry("1-0")], deliveries={"1-0": 2})
+    executed = []
+
+    async def execute_run(run_id, runnable_id, runnable_type, input_data, redelivered=False):
+        executed.append(redelivered)
+
+    monkeypatch.setattr(worker_module, "execute_run", execute_run)
+
+    asyncio.run(run_worker(queue).run())
+
+    assert executed == [True]
+    assert queue.acked == ["1-0"]
+
+
+def test_worker_fails_runs_delivered_too_often_instead_of_executing_them(run_worker, monkeypatch):
+    run_id = uuid.uuid4()
+    queue = FakeRunQueue([], stale=[run_entry("1-0", run_id=run_id)], deliveries={"1-0": 99})
+    run = type("Run", (), {"status": RunStatus.RUNNING, "ended_at": None, "output_data": None})()
+    committed = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def get(self, model, key):
+            assert key == run_id
+            return run
+
+        def add(self, obj):
+            pass
+
+        async def commit(self):
+            committed.append(run.status)
+
+    async def execute_run(*args, **kwargs):
+        raise AssertionError("an undeliverable run was executed")
+
+    monkeypatch.setattr(worker_module, "execute_run", execute_run)
+    monkeypatch.setattr(worker_module, "async_session_maker", FakeSession)
+
+    asyncio.run(run_worker(queue).run())
+
+    assert committed == [RunStatus.FAILED]
+    assert "99 delivery attempts" in run.output_data["error"]
+    assert queue.acked == ["1-0"]
+
+
+def test_worker_acknowledges_malformed_payloads(run_worker, monkeypatch):
+    queue = FakeRunQueue([("1-0", {"runnable_type": "agent"}), run_entry("2-0", run_id="not-a-uuid")])
+
+    async def execute_run(*args, **kwargs):
+        raise AssertionError("a malformed run was executed")
+
+    monkeypatch.setattr(worker_module, "execute_run", execute_run)
+
+    asyncio.run(run_worker(queue).run())
+
+    assert queue.acked == ["1-0", "2-0"]